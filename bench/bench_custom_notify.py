@@ -0,0 +1,107 @@
+"""
+对比自定义通知（custom_notify）每次推送时解析配置的原方式和预编译模板的耗时，
+并检查两种方式在各种标题/内容下生成的请求地址、请求头和请求体完全一致。
+
+用法：python bench/bench_custom_notify.py [-n 次数]
+"""
+import argparse
+import os
+import sys
+import timeit
+import urllib.parse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import notify
+
+CONFIGS = {
+    "json": {
+        "WEBHOOK_URL": "https://example.com/push?title=$title",
+        "WEBHOOK_METHOD": "POST",
+        "WEBHOOK_CONTENT_TYPE": "application/json",
+        "WEBHOOK_BODY": 'title: "$title"\ncontent: "$content"\nsource: moeshare\npriority: 5\ntags: ["daysign", "bbs"]',
+        "WEBHOOK_HEADERS": "Authorization: Bearer abc\nX-Source: daysign\nX-Source: qinglong",
+    },
+    "form": {
+        "WEBHOOK_URL": "https://example.com/push",
+        "WEBHOOK_METHOD": "POST",
+        "WEBHOOK_CONTENT_TYPE": "application/x-www-form-urlencoded",
+        "WEBHOOK_BODY": "text: $title\ndesp: $content\nchannel: 9",
+        "WEBHOOK_HEADERS": "",
+    },
+    "plain": {
+        "WEBHOOK_URL": "https://example.com/$title/$content",
+        "WEBHOOK_METHOD": "GET",
+        "WEBHOOK_CONTENT_TYPE": "text/plain",
+        "WEBHOOK_BODY": "$title\n$content",
+        "WEBHOOK_HEADERS": "",
+    },
+    "multipart": {
+        "WEBHOOK_URL": "https://example.com/push",
+        "WEBHOOK_METHOD": "POST",
+        "WEBHOOK_CONTENT_TYPE": "multipart/form-data",
+        "WEBHOOK_BODY": "msg: {\"t\": \"$title\", \"c\": \"$content\"}\nraw: $con$titletent",
+        "WEBHOOK_HEADERS": "A: 1",
+    },
+}
+
+# 包含引号、换行、占位符本身、$ 等特殊字符的消息，用于检查结果一致
+MESSAGES = [
+    ("萌享社签到通知", "[MOESHARE_DAYSIGN_1] 每日打卡成功！"),
+    ("标题", "第一行\n第二行"),
+    ('带"引号"的标题', "内容"),
+    ("$content", "$title"),
+    ("tent", "x"),
+    ("a$", "content"),
+    ("", ""),
+    ("123", "45.6"),
+    ("null", "true"),
+]
+
+
+def legacy_render(title: str, content: str):
+    """
+    原 custom_notify 中每次推送时的解析方式。
+    """
+    config = notify.push_config
+    headers = notify.parse_headers(config.get("WEBHOOK_HEADERS"))
+    body = notify.parse_body(
+        config.get("WEBHOOK_BODY"),
+        config.get("WEBHOOK_CONTENT_TYPE"),
+        lambda v: v.replace("$title", title.replace("\n", "\\n")).replace(
+            "$content", content.replace("\n", "\\n")
+        ),
+    )
+    url = config.get("WEBHOOK_URL").replace(
+        "$title", urllib.parse.quote_plus(title)
+    ).replace("$content", urllib.parse.quote_plus(content))
+    return url, headers, body
+
+
+def template_render(title: str, content: str):
+    template = notify.webhook_template()
+    return template.render_url(title, content), template.headers, template.render_body(title, content)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-n", "--number", type=int, default=20000, help="每种配置渲染的次数")
+    args = parser.parse_args()
+
+    for name, config in CONFIGS.items():
+        notify.push_config.update(config)
+        for title, content in MESSAGES:
+            expected, actual = legacy_render(title, content), template_render(title, content)
+            if expected != actual:
+                raise SystemExit(f"{name} 配置下结果不一致：{title!r} {content!r}\n{expected}\n{actual}")
+
+        title, content = MESSAGES[0]
+        legacy = timeit.timeit(lambda: legacy_render(title, content), number=args.number)
+        template = timeit.timeit(lambda: template_render(title, content), number=args.number)
+        print(f"{name:<10} 原方式 {legacy / args.number * 1e6:7.2f} us  预编译模板 {template / args.number * 1e6:7.2f} us  "
+              f"({legacy / template:.1f}x)")
+    print(f"全部 {len(CONFIGS) * len(MESSAGES)} 组结果一致。")
+
+
+if __name__ == "__main__":
+    main()
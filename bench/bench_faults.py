@@ -0,0 +1,158 @@
+"""
+重试/超时策略的故障注入基准测试：在 bench/fake_phpwind.py 本地服务器前插入 bench/fault_transport.py 的故障注入传输层，
+对每一组 (超时, 重试次数) 策略用同一个种子、同样的故障计划运行多账号签到，
+报告签到完成率和单个账号耗时的分布，用数据确定 DAYSIGN_HTTP_TIMEOUT / DAYSIGN_HTTP_RETRIES。
+
+用法：
+    python bench/bench_faults.py
+    python bench/bench_faults.py --timeouts 1,3,10 --retries 0,2,4 --faults "spike=0.1:5,503=0.05"
+    python bench/bench_faults.py --faults "503=1@50-120" --accounts 30   # 一段时间的整体故障
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BENCH = os.path.join(ROOT, "bench")
+sys.path.insert(0, ROOT)
+sys.path.insert(0, BENCH)
+
+import httpx
+
+import fake_phpwind
+import fault_transport
+import load_daysign
+
+DEFAULT_FAULTS = "spike=0.04:4,drop=0.03,refuse=0.02,503=0.05,429=0.02:1,slow=0.03:3"
+
+
+async def run_policy(accounts: int, concurrency: int) -> list[float]:
+    """
+    运行所有账号，返回每个账号的耗时秒数。是否完成由 completed() 按服务器端的账号状态判断。
+    """
+    import moeshare_daysign
+    import site_client
+
+    semaphore = asyncio.Semaphore(concurrency)
+    pool = site_client.HostPool()
+
+    async def run_one(i: int) -> float:
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                await moeshare_daysign.daysign_async({"pw_winduser": f"fault{i}", "lastvisit": "1"}, pool)
+            except Exception:
+                pass
+            return time.perf_counter() - start
+
+    try:
+        return await asyncio.gather(*(run_one(i) for i in range(accounts)))
+    finally:
+        await pool.aclose()
+
+
+def completed(upstream: str, accounts: int) -> list[bool]:
+    """
+    daysign_async 的返回值只表示脚本自己认为成功，这里以 fake PHPWind 服务器上的状态为准：
+    账号已打卡且活跃度达到 TARGET_ACTIVITY 才算完成。
+    """
+    import moeshare_daysign
+
+    state = httpx.get(f"{upstream}/__accounts").json()
+    done = []
+    for i in range(accounts):
+        account = state.get(f"moeshare fault{i}")
+        done.append(bool(account) and account["punched"]
+                    and account["activity"] >= moeshare_daysign.TARGET_ACTIVITY)
+    return done
+
+
+@contextlib.contextmanager
+def _silenced():
+    """
+    签到脚本的输出和 traceback（写到 stderr）都丢弃。
+    """
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull), contextlib.redirect_stderr(devnull):
+        yield
+
+
+def percentile(values: list[float], q: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--accounts", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--faults", default=DEFAULT_FAULTS, help="故障计划，格式见 bench/fault_transport.py")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--timeouts", default="2,5,30", help="要比较的请求超时（秒），逗号分隔")
+    parser.add_argument("--retries", default="0,1,3", help="要比较的重试次数，逗号分隔")
+    parser.add_argument("--backoff", type=float, default=0.2, help="第一次重试前等待的秒数")
+    parser.add_argument("--reply-interval", default="0,0")
+    parser.add_argument("--json", metavar="PATH", help="把结果写入 JSON 文件")
+    parser.add_argument("-v", "--verbose", action="store_true", help="显示签到脚本的输出")
+    fake_phpwind.add_options(parser)
+    args = parser.parse_args()
+    fault_transport.FaultSchedule.parse(args.faults)  # 提前检查格式
+
+    server, upstream = load_daysign.start_server(args)
+    report = []
+    try:
+        with tempfile.TemporaryDirectory(prefix="bench_faults_") as workdir:
+            load_daysign.configure_environment(args, upstream, workdir)
+            import site_client
+
+            print(f"故障计划：{args.faults}（种子 {args.seed}），{args.accounts} 个账号，并发 {args.concurrency}")
+            print(f"{'超时':>6} {'重试':>4} {'完成率':>8} {'中位数':>8} {'p95':>8} {'最长':>8} {'总耗时':>8}  注入的故障")
+            for timeout in (float(t) for t in args.timeouts.split(",")):
+                for retries in (int(r) for r in args.retries.split(",")):
+                    httpx.post(f"{upstream}/__reset")
+                    schedule = fault_transport.FaultSchedule.parse(args.faults, seed=args.seed)
+                    site_client.transport_wrapper = schedule.wrap
+                    site_client.DEFAULT_TIMEOUT = httpx.Timeout(timeout)
+                    site_client.HTTP_RETRIES = retries
+                    site_client.HTTP_BACKOFF = args.backoff
+
+                    output = contextlib.nullcontext() if args.verbose else _silenced()
+                    start = time.perf_counter()
+                    with output:
+                        latencies = asyncio.run(run_policy(args.accounts, args.concurrency))
+                    wall = time.perf_counter() - start
+                    done = completed(upstream, args.accounts)
+
+                    row = {
+                        "timeout": timeout,
+                        "retries": retries,
+                        "completion_rate": sum(done) / len(done),
+                        "median_seconds": statistics.median(latencies),
+                        "p95_seconds": percentile(latencies, 0.95),
+                        "max_seconds": max(latencies),
+                        "wall_seconds": wall,
+                        "faults": schedule.stats.as_dict(),
+                    }
+                    report.append(row)
+                    injected = ", ".join(f"{kind} {count}" for kind, count in row["faults"]["injected"].items())
+                    print(f"{timeout:6g} {retries:4d} {row['completion_rate']:8.0%} {row['median_seconds']:8.2f} "
+                          f"{row['p95_seconds']:8.2f} {row['max_seconds']:8.2f} {wall:8.2f}  "
+                          f"{row['faults']['requests']} 次请求：{injected}，超时 {row['faults']['timeouts']}")
+            with _silenced():
+                site_client.flush_notifications(1)
+    finally:
+        server.terminate()
+        server.wait()
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"faults": args.faults, "seed": args.seed, "results": report}, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
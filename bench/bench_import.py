@@ -0,0 +1,79 @@
+"""
+测量各脚本模块的导入耗时（python -X importtime），以及 notify 渠道解析的耗时。
+这些脚本由青龙面板定时启动，每次都是新进程，启动耗时直接计入每次运行时间。
+
+用法：python bench/bench_import.py [-n 次数] [模块 ...]
+"""
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+import timeit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_MODULES = ("notify", "site_client", "html_extract", "moeshare_daysign", "manhuabudang")
+
+_IMPORTTIME_RE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def import_time(module: str) -> tuple[int, list[tuple[int, str]]]:
+    """
+    在新进程中导入 module，返回 (总耗时 us, [(耗时 us, 直接依赖模块名), ...])。
+    """
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                            cwd=ROOT, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"导入 {module} 失败：\n{result.stderr[-500:]}")
+    total, children = 0, []
+    for line in result.stderr.splitlines():
+        match = _IMPORTTIME_RE.match(line)
+        if not match:
+            continue
+        cumulative, indent, name = int(match.group(2)), len(match.group(3)), match.group(4)
+        if name == module:
+            total = cumulative
+        elif indent == 3:  # 由 module 直接导入的顶层依赖
+            children.append((cumulative, name))
+    return total, sorted(children, reverse=True)
+
+
+def bench_channel_resolution() -> tuple[float, float]:
+    """
+    返回 (首次解析渠道耗时 us, 配置未变化时再次解析耗时 us)。
+    """
+    sys.path.insert(0, ROOT)
+    import notify
+
+    notify.push_config["CONSOLE"] = "true"
+    number = 10000
+    cold = timeit.timeit("notify._resolved_channels = (None, []); notify.add_notify_function()",
+                         globals={"notify": notify}, number=number)
+    notify.add_notify_function()
+    warm = timeit.timeit("notify.add_notify_function()", globals={"notify": notify}, number=number)
+    return cold / number * 1e6, warm / number * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-n", "--repeat", type=int, default=5, help="每个模块测量的次数，取中位数")
+    parser.add_argument("modules", nargs="*", default=DEFAULT_MODULES)
+    args = parser.parse_args()
+
+    for module in args.modules:
+        samples, children = [], []
+        for _ in range(args.repeat):
+            total, children = import_time(module)
+            samples.append(total)
+        print(f"{module:<20} 中位数 {statistics.median(samples) / 1000:8.2f} ms  "
+              f"(最小 {min(samples) / 1000:.2f} ms, 最大 {max(samples) / 1000:.2f} ms)")
+        for cumulative, name in children[:5]:
+            print(f"    {name:<24} {cumulative / 1000:8.2f} ms")
+
+    cold, warm = bench_channel_resolution()
+    print(f"notify 渠道解析：首次 {cold:.2f} us，配置未变化时 {warm:.2f} us")
+
+
+if __name__ == "__main__":
+    main()
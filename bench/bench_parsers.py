@@ -0,0 +1,282 @@
+"""
+页面解析的离线基准测试：用 bench/fixtures 中保存的页面代替真实请求，
+测量各签到函数和 html_extract 各后端的解析耗时，并把解析结果与保存的基准结果对比，
+页面结构变化或解析逻辑改动导致结果不同时以非零状态退出。
+
+除了固定页面，还会生成包含数千行帖子的版块页面和很长的个人中心页面，观察解析耗时随页面大小的变化。
+
+用法：
+    python bench/bench_parsers.py                 # 测量并与基准结果对比
+    python bench/bench_parsers.py -k forum        # 只运行名字包含 forum 的用例
+    python bench/bench_parsers.py --update-baseline
+    python bench/bench_parsers.py --json timings.json
+"""
+import argparse
+import asyncio
+import contextlib
+import dataclasses
+import hashlib
+import json
+import os
+import re
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FIXTURES = os.path.join(ROOT, "bench", "fixtures")
+BASELINE = os.path.join(FIXTURES, "parsers_baseline.json")
+sys.path.insert(0, ROOT)
+
+import httpx
+
+import html_extract
+import manhuabudang
+import moeshare_daysign
+
+
+def fixture(name: str) -> bytes:
+    with open(os.path.join(FIXTURES, name), "rb") as f:
+        return f.read()
+
+
+# --- 合成页面 ---
+
+def synthetic_forum(rows: int) -> bytes:
+    """
+    生成一个包含 rows 行普通主题的版块页面（结构与 moeshare_forum.html 相同）。
+    """
+    page = fixture("moeshare_forum.html").decode("utf-8")
+    row = re.search(r'<tr class="tr3 t_one">.*?</tr>\n', page, re.DOTALL).group(0)
+    body_start = page.index("普通主题")
+    body_start = page.index("</tr>", body_start) + len("</tr>\n")
+    body_end = page.index("</tbody>")
+    tid = re.search(r'td_(\d+)', row).group(1)
+    rows_html = "".join(row.replace(tid, str(1000000 + i)) for i in range(rows))
+    return (page[:body_start] + rows_html + page[body_end:]).encode("utf-8")
+
+
+def synthetic_user_center(feed_items: int) -> bytes:
+    """
+    生成一个动态列表很长的个人中心页面，MB / 活跃度 / 打卡按钮位于页面前部。
+    """
+    page = fixture("moeshare_u.html").decode("utf-8")
+    item = re.search(r"<li>.*?</li>", page).group(0)
+    return page.replace(item, item * feed_items, 1).encode("utf-8")
+
+
+# --- 假的 _request ---
+
+def _response(method: str, url: str, body: bytes, content_type: str) -> httpx.Response:
+    return httpx.Response(200, content=body, headers={"content-type": content_type},
+                          request=httpx.Request(method, url))
+
+
+def fake_request(routes: dict[str, tuple[bytes, str]]):
+    """
+    返回与 site_client.async_request_context 接口相同的异步 _request，按 URL 中的正则返回固定页面。
+    """
+
+    @contextlib.asynccontextmanager
+    async def _request(method, url, *args, **kwargs):
+        for pattern, (body, content_type) in routes.items():
+            if re.search(pattern, url):
+                yield _response(method, url, body, content_type)
+                return
+        raise AssertionError(f"没有为 {url} 准备页面")
+
+    return _request
+
+
+def fake_sync_request(routes: dict[str, tuple[bytes, str]]):
+    """
+    同步版本，对应 site_client.request_context。
+    """
+
+    @contextlib.contextmanager
+    def _request(method, url, *args, **kwargs):
+        for pattern, (body, content_type) in routes.items():
+            if re.search(pattern, url):
+                yield _response(method, url, body, content_type)
+                return
+        raise AssertionError(f"没有为 {url} 准备页面")
+
+    return _request
+
+
+# --- 用例 ---
+HTML_UTF8 = "text/html; charset=utf-8"
+HTML_NO_CHARSET = "text/html"  # 漫画不当BBS 的页面不带 charset，需要从 <meta> 识别 GBK
+
+
+def build_cases() -> dict:
+    """
+    返回 {用例名: (是否为协程函数, 无参调用函数)}。
+    """
+    forum_routes = {
+        r"page-1\.html": (fixture("moeshare_forum.html"), HTML_UTF8),
+        r"page-2\.html": (fixture("moeshare_forum_page2.html"), HTML_UTF8),
+    }
+    # 合成的长页面与第 1 页结构相同（有置顶帖和 '普通主题' 标记行），按第 1 页请求
+    long_forum_routes = {rows: {r"page-1\.html": (synthetic_forum(rows), HTML_UTF8)} for rows in (1000, 5000)}
+    moeshare_routes = {
+        r"/u\.php$": (fixture("moeshare_u.html"), HTML_UTF8),
+        r"read-htm-tid-": (fixture("moeshare_read.html"), HTML_UTF8),
+        r"jobcenter\.php": (fixture("moeshare_jobcenter.xml"), "text/xml; charset=utf-8"),
+    }
+    punched_routes = {r"/u\.php$": (fixture("moeshare_u_punched.html"), HTML_UTF8)}
+    long_u_routes = {r"/u\.php$": (synthetic_user_center(5000), HTML_UTF8)}
+    mh_routes = {
+        r"/u\.php$": (fixture("manhuabudang_u.html"), HTML_NO_CHARSET),
+        r"jobcenter\.php": (fixture("manhuabudang_jobcenter.xml"), "text/xml"),
+    }
+    mh_punched_routes = {r"/u\.php$": (fixture("manhuabudang_u_punched.html"), HTML_NO_CHARSET)}
+
+    m = moeshare_daysign
+    forum = fake_request(forum_routes)
+    cases = {
+        "moeshare.forum_tids[page1]": (True, lambda: m._get_tids_from_forum(None, forum, m.FID, 1)),
+        "moeshare.forum_tids[page2]": (True, lambda: m._get_tids_from_forum(None, forum, m.FID, 2)),
+        "moeshare.forum_tids[synthetic 1000 rows]": (
+            True, lambda: m._get_tids_from_forum(None, fake_request(long_forum_routes[1000]), m.FID, 1)),
+        "moeshare.forum_tids[synthetic 5000 rows]": (
+            True, lambda: m._get_tids_from_forum(None, fake_request(long_forum_routes[5000]), m.FID, 1)),
+        "moeshare.user_center": (True, lambda: m._get_user_center_snapshot(None, fake_request(moeshare_routes))),
+        "moeshare.user_center[punched]": (True, lambda: m._get_user_center_snapshot(None, fake_request(punched_routes))),
+        "moeshare.user_center[synthetic 5000 feed]": (
+            True, lambda: m._get_user_center_snapshot(None, fake_request(long_u_routes))),
+        "moeshare.reply_form": (True, lambda: m._fetch_reply_form(None, fake_request(moeshare_routes), 900001)),
+        "moeshare.punch_response": (True, lambda: m._perform_daily_punch(None, fake_request(moeshare_routes), "5a1f3c9e")),
+        "manhuabudang.punch_button_info": (
+            False, lambda: manhuabudang._get_punch_button_info(None, fake_sync_request(mh_routes))),
+        "manhuabudang.punch_button_info[punched]": (
+            False, lambda: manhuabudang._get_punch_button_info(None, fake_sync_request(mh_punched_routes))),
+        "manhuabudang.punch_response": (
+            False, lambda: manhuabudang._perform_daily_punch(None, fake_sync_request(mh_routes), "5a1f3c9e")),
+    }
+
+    # html_extract 各后端单独测量（不经过回退链）
+    pages = {
+        "forum_tids": (fixture("moeshare_forum.html"), "utf-8", ()),
+        "user_center": (fixture("moeshare_u.html"), "utf-8", ()),
+        "reply_form": (fixture("moeshare_read.html"), "utf-8", ()),
+        "manhuabudang_punch_div": (fixture("manhuabudang_u.html"), "gbk", ()),
+        "verifyhash": (fixture("manhuabudang_u.html"), "gbk", ()),
+    }
+    for backend in ("regex", "lxml", "bs4"):
+        if backend == "lxml" and html_extract.lxml is None:
+            continue
+        for kind, (content, encoding, args) in pages.items():
+            extractor = html_extract._EXTRACTORS[backend][kind]
+            cases[f"html_extract.{kind}[{backend}]"] = (
+                False, lambda extractor=extractor, content=content, encoding=encoding, args=args:
+                extractor(content, encoding, *args))
+    return cases
+
+
+# --- 运行与对比 ---
+
+def jsonable(value):
+    if dataclasses.is_dataclass(value):
+        return jsonable(dataclasses.asdict(value))
+    if isinstance(value, dict):
+        return {str(k): jsonable(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [jsonable(v) for v in value]
+    return value
+
+
+def summarize(value):
+    """
+    长列表（合成页面的结果）只保存长度和摘要，避免基准文件过大。
+    """
+    value = jsonable(value)
+    if isinstance(value, list) and len(value) > 50:
+        digest = hashlib.sha1(json.dumps(value).encode("utf-8")).hexdigest()
+        return {"len": len(value), "sha1": digest}
+    return value
+
+
+def measure(is_async: bool, call, min_time: float, min_rounds: int) -> tuple[object, list[float]]:
+    """
+    反复调用直到总耗时超过 min_time 且至少 min_rounds 次，返回 (最后一次结果, 每次耗时列表)。
+    """
+    samples = []
+
+    async def run_async():
+        result = None
+        start = time.perf_counter()
+        while len(samples) < min_rounds or time.perf_counter() - start < min_time:
+            t = time.perf_counter()
+            result = await call()
+            samples.append(time.perf_counter() - t)
+        return result
+
+    def run_sync():
+        result = None
+        start = time.perf_counter()
+        while len(samples) < min_rounds or time.perf_counter() - start < min_time:
+            t = time.perf_counter()
+            result = call()
+            samples.append(time.perf_counter() - t)
+        return result
+
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        result = asyncio.run(run_async()) if is_async else run_sync()
+    return result, samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-k", "--filter", default="", help="只运行名字包含该字符串的用例")
+    parser.add_argument("--min-time", type=float, default=0.3, help="每个用例至少运行的秒数")
+    parser.add_argument("--min-rounds", type=int, default=5, help="每个用例至少运行的次数")
+    parser.add_argument("--update-baseline", action="store_true", help="用本次的解析结果覆盖基准结果")
+    parser.add_argument("--json", metavar="PATH", help="把耗时写入 JSON 文件")
+    args = parser.parse_args()
+
+    baseline = {}
+    if os.path.exists(BASELINE):
+        with open(BASELINE, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+
+    results, timings, mismatches = {}, {}, []
+    for name, (is_async, call) in build_cases().items():
+        if args.filter not in name:
+            continue
+        result, samples = measure(is_async, call, args.min_time, args.min_rounds)
+        results[name] = summarize(result)
+        timings[name] = {"median_us": statistics.median(samples) * 1e6, "min_us": min(samples) * 1e6,
+                         "rounds": len(samples)}
+
+        status = ""
+        if not args.update_baseline:
+            if name not in baseline:
+                status = "（无基准结果）"
+            elif baseline[name] != results[name]:
+                status = "❌ 结果与基准不一致"
+                mismatches.append(name)
+        print(f"{name:<45} 中位数 {timings[name]['median_us']:10.1f} us  最小 {timings[name]['min_us']:10.1f} us  "
+              f"{timings[name]['rounds']:6d} 次 {status}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(timings, f, ensure_ascii=False, indent=2)
+
+    if args.update_baseline:
+        baseline.update(results)
+        with open(BASELINE, "w", encoding="utf-8") as f:
+            json.dump(baseline, f, ensure_ascii=False, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"已更新基准结果：{BASELINE}")
+        return
+
+    for name in mismatches:
+        print(f"\n{name}\n  基准：{json.dumps(baseline[name], ensure_ascii=False)}\n"
+              f"  本次：{json.dumps(results[name], ensure_ascii=False)}")
+    if mismatches:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+检查把消息放进查询字符串的推送渠道（go-cqhttp、Telegram）能正确发送多行、中文和特殊字符的消息：
+启动本地 HTTP 服务器充当渠道接口，通过 notify.send 推送，比较服务器收到的消息与原文。
+任意一条消息推送失败或内容不一致时以退出码 1 结束。
+
+用法：python bench/check_notify_channels.py
+"""
+import json
+import os
+import sys
+import tempfile
+import threading
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import notify
+
+MESSAGES = [
+    ("萌享社签到通知", "第一行\n第二行\n第三行"),
+    ("标题 & 符号", "a=1&b=2 #锚点 100% +加号"),
+    ("多行\n标题", "\n前后都有换行\n"),
+]
+
+
+class ChannelServer(BaseHTTPRequestHandler):
+    received = []
+
+    def log_message(self, *args):
+        pass
+
+    def _handle(self):
+        url = urllib.parse.urlsplit(self.path)
+        query = urllib.parse.parse_qs(url.query)
+        if url.path.endswith("/sendMessage"):
+            self.received.append(("telegram_bot", query["text"][0]))
+            body = {"ok": True}
+        else:
+            self.received.append(("go_cqhttp", query["message"][0]))
+            body = {"status": "ok"}
+        data = json.dumps(body).encode()
+        self.send_response(200)
+        self.send_header("content-type", "application/json")
+        self.send_header("content-length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    do_GET = do_POST = _handle
+
+
+def main():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), ChannelServer)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+
+    failed = 0
+    with tempfile.TemporaryDirectory(prefix="check_notify_") as workdir:
+        config = {
+            "GOBOT_URL": f"{base}/send_private_msg",
+            "GOBOT_QQ": "user_id=10000",
+            "TG_BOT_TOKEN": "token",
+            "TG_USER_ID": "1",
+            "TG_API_HOST": base,
+            "HITOKOTO": "false",
+            "PUSH_TIMEOUT": "5",
+            "PUSH_OUTBOX": os.path.join(workdir, "outbox.sqlite3"),
+            "PUSH_DEDUPE_WINDOW": "0",
+        }
+        for title, content in MESSAGES:
+            ChannelServer.received.clear()
+            results = notify.send(title, content, ignore_default_config=True, **dict(config))
+            expected = {
+                "go_cqhttp": f"标题:{title}\n内容:{content}",
+                "telegram_bot": f"{title}\n\n{content}",
+            }
+            received = dict(ChannelServer.received)
+            for channel, text in expected.items():
+                ok = results.get(channel) == notify.PUSH_SUCCESS and received.get(channel) == text
+                failed += not ok
+                print(f"{'✅' if ok else '❌'} {channel:<14} {title!r}：{results.get(channel)}，"
+                      f"收到 {received.get(channel)!r}")
+    server.shutdown()
+
+    if failed:
+        print(f"{failed} 条推送失败或内容不一致。")
+        sys.exit(1)
+    print(f"全部 {len(MESSAGES)} 条消息在各渠道推送成功，内容一致。")
+
+
+if __name__ == "__main__":
+    main()
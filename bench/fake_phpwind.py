@@ -0,0 +1,276 @@
+"""
+本地模拟的 PHPWind 论坛服务器，提供签到脚本用到的萌享社和漫画不当BBS页面：
+u.php、版块列表、帖子页、post.php 和 jobcenter.php?action=punch。
+按请求头 Host 区分站点，按 Cookie 中的 winduser 区分账号，每个账号单独保存 MB、活跃度和打卡状态。
+页面基于 bench/fixtures 中保存的页面生成。
+
+只依赖标准库，使用 asyncio 实现最简单的 HTTP/1.1（支持 keep-alive），可以同时服务上千个账号。
+配合 site_client 的 DAYSIGN_UPSTREAM 使用，例如：
+
+    python bench/fake_phpwind.py --port 8080 --latency-ms 50 --flood-seconds 10
+    DAYSIGN_UPSTREAM=http://127.0.0.1:8080 python moeshare_daysign.py
+
+GET /__stats 返回请求数和流量统计（JSON），GET /__accounts 返回每个账号的打卡状态和活跃度（JSON），
+POST /__reset 清空账号状态和统计。
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import re
+import time
+from dataclasses import dataclass, field
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+
+def _fixture(name: str) -> bytes:
+    with open(os.path.join(FIXTURES, name), "rb") as f:
+        return f.read()
+
+
+@dataclass
+class Options:
+    latency_ms: float = 0.0  # 每个请求的平均延迟
+    jitter_ms: float = 0.0  # 延迟的标准差
+    flood_seconds: float = 0.0  # 两次回帖的最短间隔，间隔内回帖返回灌水预防提示
+    gain: int = 1  # 每次成功回帖增加的活跃度
+    report_gain: bool = True  # 回帖成功的消息中是否带上 "活跃度+N"
+    initial_activity: int = 4
+    initial_mb: int = 1000
+    forum_rows: int = 40  # 每个版块页面的帖子数
+
+
+@dataclass
+class Account:
+    mb: int
+    activity: int
+    punched: bool = False
+    last_post: float = 0.0
+    replies: int = 0
+
+
+@dataclass
+class Stats:
+    requests: dict = field(default_factory=dict)
+    bytes_in: int = 0
+    bytes_out: int = 0
+    not_modified: int = 0
+    flood_rejected: int = 0
+
+    def as_dict(self, accounts: int) -> dict:
+        return {
+            "accounts": accounts,
+            "requests": dict(sorted(self.requests.items())),
+            "total_requests": sum(self.requests.values()),
+            "bytes_in": self.bytes_in,
+            "bytes_out": self.bytes_out,
+            "not_modified": self.not_modified,
+            "flood_rejected": self.flood_rejected,
+        }
+
+
+class FakePHPWind:
+    def __init__(self, options: Options):
+        self.options = options
+        self.accounts: dict[tuple[str, str], Account] = {}
+        self.stats = Stats()
+        self.moeshare_u = _fixture("moeshare_u.html").decode("utf-8")
+        self.moeshare_forum = _fixture("moeshare_forum.html").decode("utf-8")
+        self.moeshare_read = _fixture("moeshare_read.html").decode("utf-8")
+        self.manhuabudang_u = _fixture("manhuabudang_u.html").decode("gbk")
+        self._row = re.search(r'<tr class="tr3 t_one">.*?</tr>\n', self.moeshare_forum, re.DOTALL).group(0)
+        self._row_tid = re.search(r'td_(\d+)', self._row).group(1)
+        self._forum_cache: dict[int, bytes] = {}
+
+    # --- 页面 ---
+
+    def account(self, site: str, cookie: str) -> Account:
+        match = re.search(r'winduser=([^;]+)', cookie)
+        key = (site, match.group(1) if match else cookie)
+        if key not in self.accounts:
+            self.accounts[key] = Account(self.options.initial_mb, self.options.initial_activity)
+        return self.accounts[key]
+
+    def moeshare_user_center(self, account: Account) -> bytes:
+        page = self.moeshare_u.replace('>1234</a>', f'>{account.mb}</a>').replace('>4</a>', f'>{account.activity}</a>')
+        if account.punched:
+            page = page.replace('class="btn" onclick="punchJob(14)"', 'class="btn" disabled="disabled"')
+        return page.encode("utf-8")
+
+    def forum_page(self, page: int) -> bytes:
+        """
+        第 1 页包含置顶帖和 '普通主题' 标记行，之后的页面只有普通帖子；每页的帖子 ID 互不相同。
+        """
+        if page not in self._forum_cache:
+            html = self.moeshare_forum
+            start = html.index("普通主题")
+            start = html.index("</tr>", start) + len("</tr>\n")
+            end = html.index("</tbody>")
+            first = 900000 + (page - 1) * self.options.forum_rows
+            rows = "".join(self._row.replace(self._row_tid, str(first + i)) for i in range(self.options.forum_rows))
+            if page > 1:
+                start = html.index('<tr class="tr4">')
+            self._forum_cache[page] = (html[:start] + rows + html[end:]).encode("utf-8")
+        return self._forum_cache[page]
+
+    def handle(self, method: str, target: str, headers: dict, body: bytes) -> tuple[int, dict, bytes]:
+        path, _, query = target.partition("?")
+        host = headers.get("host", "")
+        site = "manhuabudang" if "manhuabudang" in host else "moeshare"
+        kind = re.sub(r'\d+', 'N', path)
+        self.stats.requests[f"{site} {method} {kind}"] = self.stats.requests.get(f"{site} {method} {kind}", 0) + 1
+
+        if path == "/__stats":
+            return 200, {"content-type": "application/json"}, json.dumps(
+                self.stats.as_dict(len(self.accounts))).encode("utf-8")
+        if path == "/__accounts":
+            return 200, {"content-type": "application/json"}, json.dumps({
+                f"{site} {user}": {"punched": account.punched, "activity": account.activity,
+                                   "mb": account.mb, "replies": account.replies}
+                for (site, user), account in self.accounts.items()}, ensure_ascii=False).encode("utf-8")
+        if path == "/__reset":
+            self.accounts.clear()
+            self.stats = Stats()
+            return 200, {}, b"ok"
+
+        account = self.account(site, headers.get("cookie", ""))
+        html_utf8 = {"content-type": "text/html; charset=utf-8"}
+
+        if site == "manhuabudang":
+            if path == "/u.php":
+                page = self.manhuabudang_u
+                if account.punched:
+                    page = page.replace('<div class="card fr" onclick="punchJob(14)"><span>每日打卡</span></div>',
+                                        '<div class="card fr card_old"><span>连续 1 天打卡</span></div>')
+                return 200, {"content-type": "text/html"}, page.encode("gbk")
+            if path == "/jobcenter.php" and method == "POST":
+                account.punched = True
+                return 200, {"content-type": "text/xml"}, \
+                    '<ajax><![CDATA[{"message":"打卡成功，威望 +1","flag":"1"}]]></ajax>'.encode("gbk")
+            return 404, {}, b"not found"
+
+        if path == "/u.php":
+            return 200, html_utf8, self.moeshare_user_center(account)
+
+        match = re.match(r'/thread-htm-fid-\d+-page-(\d+)\.html$', path)
+        if match:
+            page = int(match.group(1))
+            etag = f'"forum-{page}-{self.options.forum_rows}"'
+            if headers.get("if-none-match") == etag:
+                self.stats.not_modified += 1
+                return 304, {"etag": etag}, b""
+            return 200, {**html_utf8, "etag": etag}, self.forum_page(page)
+
+        match = re.match(r'/read-htm-tid-(\d+)\.html$', path)
+        if match:
+            return 200, html_utf8, self.moeshare_read.replace("900001", match.group(1)).encode("utf-8")
+
+        if path == "/post.php" and method == "POST":
+            now = time.monotonic()
+            if account.last_post and now - account.last_post < self.options.flood_seconds:
+                self.stats.flood_rejected += 1
+                message = f"灌水预防机制已经打开，在{self.options.flood_seconds:g}秒内不能发帖"
+            else:
+                account.last_post = now
+                account.activity += self.options.gain
+                account.replies += 1
+                message = "发表成功" + (f"，活跃度+{self.options.gain}" if self.options.report_gain else "")
+            return 200, {"content-type": "text/xml; charset=utf-8"}, \
+                f"<ajax><![CDATA[{message}]]></ajax>".encode("utf-8")
+
+        if path == "/jobcenter.php" and method == "POST":
+            message = "您今天已打卡" if account.punched else "打卡成功"
+            if not account.punched:
+                account.punched = True
+                account.mb += 10
+            return 200, {"content-type": "text/xml; charset=utf-8"}, \
+                f"<ajax><![CDATA[{message}]]></ajax>".encode("utf-8")
+
+        return 404, {}, b"not found"
+
+    # --- HTTP/1.1 ---
+
+    async def serve_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b"\r\n\r\n")
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    break
+                lines = head.decode("latin-1").split("\r\n")
+                method, target, _ = lines[0].split(" ", 2)
+                headers = {}
+                for line in lines[1:]:
+                    if ":" in line:
+                        name, value = line.split(":", 1)
+                        headers[name.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get("content-length", 0) or 0))
+                # 请求头中的 Cookie 等非 ASCII 内容按 UTF-8 解释
+                headers = {k: v.encode("latin-1").decode("utf-8", errors="replace") for k, v in headers.items()}
+                self.stats.bytes_in += len(head) + len(body)
+
+                if self.options.latency_ms:
+                    delay = random.gauss(self.options.latency_ms, self.options.jitter_ms) / 1000
+                    await asyncio.sleep(max(delay, 0))
+
+                status, response_headers, payload = self.handle(method, target, headers, body)
+                reason = {200: "OK", 304: "Not Modified", 404: "Not Found"}.get(status, "OK")
+                response_headers = {**response_headers, "content-length": str(len(payload))}
+                raw = f"HTTP/1.1 {status} {reason}\r\n" + "".join(
+                    f"{name}: {value}\r\n" for name, value in response_headers.items()) + "\r\n"
+                writer.write(raw.encode("latin-1") + payload)
+                self.stats.bytes_out += len(raw) + len(payload)
+                await writer.drain()
+                if headers.get("connection", "").lower() == "close":
+                    break
+        finally:
+            writer.close()
+
+
+async def serve(host: str, port: int, options: Options, ready_file: str | None = None) -> None:
+    app = FakePHPWind(options)
+    server = await asyncio.start_server(app.serve_connection, host, port, backlog=1024)
+    bound_port = server.sockets[0].getsockname()[1]
+    print(f"fake PHPWind 服务器已启动：http://{host}:{bound_port}", flush=True)
+    if ready_file:
+        with open(ready_file, "w") as f:
+            f.write(str(bound_port))
+    async with server:
+        await server.serve_forever()
+
+
+def add_options(parser: argparse.ArgumentParser) -> None:
+    defaults = Options()
+    parser.add_argument("--latency-ms", type=float, default=defaults.latency_ms, help="每个请求的平均延迟（毫秒）")
+    parser.add_argument("--jitter-ms", type=float, default=defaults.jitter_ms, help="延迟的标准差（毫秒）")
+    parser.add_argument("--flood-seconds", type=float, default=defaults.flood_seconds,
+                        help="两次回帖的最短间隔（秒），间隔内回帖会被灌水预防拒绝")
+    parser.add_argument("--gain", type=int, default=defaults.gain, help="每次成功回帖增加的活跃度")
+    parser.add_argument("--hide-gain", action="store_true", help="回帖成功的消息中不带 '活跃度+N'")
+    parser.add_argument("--initial-activity", type=int, default=defaults.initial_activity, help="账号初始活跃度")
+    parser.add_argument("--forum-rows", type=int, default=defaults.forum_rows, help="每个版块页面的帖子数")
+
+
+def options_from_args(args) -> Options:
+    return Options(latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, flood_seconds=args.flood_seconds,
+                   gain=args.gain, report_gain=not args.hide_gain, initial_activity=args.initial_activity,
+                   forum_rows=args.forum_rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080, help="监听端口，0 为随机端口")
+    parser.add_argument("--ready-file", help="启动后把实际端口写入该文件")
+    add_options(parser)
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args.host, args.port, options_from_args(args), args.ready_file))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
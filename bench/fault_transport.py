@@ -0,0 +1,219 @@
+"""
+故障注入的 httpx 传输层：包装真实的传输层，按计划模拟延迟尖刺、连接断开、5xx / 429 响应和缓慢的响应正文。
+
+故障计划用逗号分隔的 "类型=概率[:参数][@开始-结束]" 描述：
+    spike=0.05:3      5% 的请求额外延迟 3 秒
+    drop=0.03         3% 的请求连接被断开（RemoteProtocolError）
+    refuse=0.02       2% 的请求连接失败（ConnectError，请求没有发出）
+    503=0.05          5% 的请求返回 503（其它状态码同理，如 500、502）
+    429=0.02:5        2% 的请求返回 429，Retry-After 为 5 秒
+    slow=0.05:4       5% 的响应正文分块慢慢返回，总共多花 4 秒
+    503=1@100-150     第 100~149 个请求全部返回 503（模拟一段时间的故障）
+
+延迟超过请求的读超时时，与真实网络一样抛出 httpx.ReadTimeout（只等待超时的时间）。
+同一个种子、同样的请求顺序得到同样的故障序列。
+
+用法：
+    import site_client, fault_transport
+    schedule = fault_transport.FaultSchedule.parse("spike=0.05:3,503=0.05", seed=1)
+    site_client.transport_wrapper = schedule.wrap
+"""
+import asyncio
+import random
+import threading
+import time
+from dataclasses import dataclass, field
+
+import httpx
+
+DROP = "drop"
+REFUSE = "refuse"
+SPIKE = "spike"
+SLOW = "slow"
+SLOW_CHUNKS = 8  # 缓慢正文分成的块数
+
+
+@dataclass
+class Fault:
+    kind: str  # drop / refuse / spike / slow / HTTP 状态码
+    rate: float
+    param: float = 0.0
+    start: int = 0  # 只对第 start ~ end-1 个请求生效
+    end: int | None = None
+
+    def active(self, index: int) -> bool:
+        return index >= self.start and (self.end is None or index < self.end)
+
+
+@dataclass
+class FaultStats:
+    requests: int = 0
+    injected: dict = field(default_factory=dict)
+    timeouts: int = 0
+
+    def as_dict(self) -> dict:
+        return {"requests": self.requests, "injected": dict(sorted(self.injected.items())), "timeouts": self.timeouts}
+
+
+class FaultSchedule:
+    """
+    决定每个请求注入什么故障。多个故障按书写顺序依次抽签，第一个命中的生效。
+    """
+
+    def __init__(self, faults: list[Fault], seed: int | None = None):
+        self.faults = faults
+        self.stats = FaultStats()
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def parse(cls, spec: str, seed: int | None = None) -> "FaultSchedule":
+        faults = []
+        for item in filter(None, (part.strip() for part in spec.split(","))):
+            kind, _, rest = item.partition("=")
+            rest, _, window = rest.partition("@")
+            rate, _, param = rest.partition(":")
+            start, _, end = window.partition("-")
+            kind = kind.strip().lower()
+            if kind not in (DROP, REFUSE, SPIKE, SLOW) and not kind.isdigit():
+                raise ValueError(f"未知的故障类型：{kind}")
+            faults.append(Fault(kind, float(rate), float(param or 0), int(start or 0), int(end) if end else None))
+        return cls(faults, seed)
+
+    def next(self) -> Fault | None:
+        with self._lock:
+            index = self.stats.requests
+            self.stats.requests += 1
+            for fault in self.faults:
+                if fault.active(index) and self._random.random() < fault.rate:
+                    self.stats.injected[fault.kind] = self.stats.injected.get(fault.kind, 0) + 1
+                    return fault
+        return None
+
+    def timed_out(self) -> None:
+        with self._lock:
+            self.stats.timeouts += 1
+
+    def wrap(self, transport, is_async: bool):
+        """
+        可以直接赋值给 site_client.transport_wrapper。
+        """
+        return AsyncFaultTransport(transport, self) if is_async else FaultTransport(transport, self)
+
+
+def _read_timeout(request: httpx.Request) -> float | None:
+    return request.extensions.get("timeout", {}).get("read")
+
+
+def _status_response(fault: Fault, request: httpx.Request) -> httpx.Response:
+    headers = {"retry-after": str(int(fault.param))} if fault.param else {}
+    return httpx.Response(int(fault.kind), headers=headers, content=b"injected fault", request=request)
+
+
+class _SlowAsyncStream(httpx.AsyncByteStream):
+    def __init__(self, content: bytes, delay: float, timeout: float | None, schedule: FaultSchedule,
+                 request: httpx.Request):
+        self._content = content
+        self._delay = delay / SLOW_CHUNKS
+        self._timeout = timeout
+        self._schedule = schedule
+        self._request = request
+
+    async def __aiter__(self):
+        size = -(-len(self._content) // SLOW_CHUNKS) or 1
+        for offset in range(0, max(len(self._content), 1), size):
+            if self._timeout is not None and self._delay > self._timeout:
+                await asyncio.sleep(self._timeout)
+                self._schedule.timed_out()
+                raise httpx.ReadTimeout("injected slow body", request=self._request)
+            await asyncio.sleep(self._delay)
+            yield self._content[offset:offset + size]
+
+
+class _SlowSyncStream(httpx.SyncByteStream):
+    def __init__(self, content: bytes, delay: float, timeout: float | None, schedule: FaultSchedule,
+                 request: httpx.Request):
+        self._content = content
+        self._delay = delay / SLOW_CHUNKS
+        self._timeout = timeout
+        self._schedule = schedule
+        self._request = request
+
+    def __iter__(self):
+        size = -(-len(self._content) // SLOW_CHUNKS) or 1
+        for offset in range(0, max(len(self._content), 1), size):
+            if self._timeout is not None and self._delay > self._timeout:
+                time.sleep(self._timeout)
+                self._schedule.timed_out()
+                raise httpx.ReadTimeout("injected slow body", request=self._request)
+            time.sleep(self._delay)
+            yield self._content[offset:offset + size]
+
+
+class AsyncFaultTransport(httpx.AsyncBaseTransport):
+    def __init__(self, transport: httpx.AsyncBaseTransport, schedule: FaultSchedule):
+        self._transport = transport
+        self._schedule = schedule
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        fault = self._schedule.next()
+        if fault is None:
+            return await self._transport.handle_async_request(request)
+        timeout = _read_timeout(request)
+        if fault.kind == REFUSE:
+            raise httpx.ConnectError("injected connection refused", request=request)
+        if fault.kind == DROP:
+            raise httpx.RemoteProtocolError("injected connection drop", request=request)
+        if fault.kind.isdigit():
+            return _status_response(fault, request)
+        if fault.kind == SPIKE:
+            if timeout is not None and fault.param > timeout:
+                await asyncio.sleep(timeout)
+                self._schedule.timed_out()
+                raise httpx.ReadTimeout("injected latency spike", request=request)
+            await asyncio.sleep(fault.param)
+            return await self._transport.handle_async_request(request)
+        # SLOW：先完整读取真实响应，再慢慢交给客户端
+        response = await self._transport.handle_async_request(request)
+        content = b"".join([chunk async for chunk in response.aiter_raw()])  # 保持原始编码，由客户端解压
+        await response.aclose()
+        return httpx.Response(response.status_code, headers=response.headers, request=request,
+                              stream=_SlowAsyncStream(content, fault.param, timeout, self._schedule, request),
+                              extensions=response.extensions)
+
+    async def aclose(self) -> None:
+        await self._transport.aclose()
+
+
+class FaultTransport(httpx.BaseTransport):
+    def __init__(self, transport: httpx.BaseTransport, schedule: FaultSchedule):
+        self._transport = transport
+        self._schedule = schedule
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        fault = self._schedule.next()
+        if fault is None:
+            return self._transport.handle_request(request)
+        timeout = _read_timeout(request)
+        if fault.kind == REFUSE:
+            raise httpx.ConnectError("injected connection refused", request=request)
+        if fault.kind == DROP:
+            raise httpx.RemoteProtocolError("injected connection drop", request=request)
+        if fault.kind.isdigit():
+            return _status_response(fault, request)
+        if fault.kind == SPIKE:
+            if timeout is not None and fault.param > timeout:
+                time.sleep(timeout)
+                self._schedule.timed_out()
+                raise httpx.ReadTimeout("injected latency spike", request=request)
+            time.sleep(fault.param)
+            return self._transport.handle_request(request)
+        response = self._transport.handle_request(request)
+        content = b"".join(response.iter_raw())
+        response.close()
+        return httpx.Response(response.status_code, headers=response.headers, request=request,
+                              stream=_SlowSyncStream(content, fault.param, timeout, self._schedule, request),
+                              extensions=response.extensions)
+
+    def close(self) -> None:
+        self._transport.close()
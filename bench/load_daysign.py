@@ -0,0 +1,157 @@
+"""
+多账号签到的端到端压力测试：启动 bench/fake_phpwind.py 本地服务器，
+用 1~1000 个模拟账号运行完整的签到流程（回帖、打卡），报告总耗时、每个账号的请求数、流量和峰值内存。
+
+签到脚本的配置在导入时读取，因此本脚本先设置环境变量再导入签到模块：
+- DAYSIGN_UPSTREAM 指向本地服务器；
+- 回帖间隔默认为 0（--reply-interval 可修改），不等待活跃度更新；
+- 状态数据库和 HTTP 缓存放在临时目录，不影响真实运行的数据；
+- 不发送 Telegram 通知。
+
+用法：
+    python bench/load_daysign.py --accounts 100 --concurrency 20 --latency-ms 30
+    python bench/load_daysign.py --site manhuabudang --accounts 50
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BENCH = os.path.join(ROOT, "bench")
+sys.path.insert(0, ROOT)
+sys.path.insert(0, BENCH)
+
+import httpx
+
+import fake_phpwind
+
+
+def start_server(args) -> tuple[subprocess.Popen, str]:
+    ready_dir = tempfile.mkdtemp(prefix="fake_phpwind_")
+    ready_file = os.path.join(ready_dir, "port")
+    command = [sys.executable, os.path.join(BENCH, "fake_phpwind.py"), "--port", "0", "--ready-file", ready_file,
+               "--latency-ms", str(args.latency_ms), "--jitter-ms", str(args.jitter_ms),
+               "--flood-seconds", str(args.flood_seconds), "--gain", str(args.gain),
+               "--initial-activity", str(args.initial_activity), "--forum-rows", str(args.forum_rows)]
+    if args.hide_gain:
+        command.append("--hide-gain")
+    server = subprocess.Popen(command, stdout=subprocess.DEVNULL)
+    try:
+        deadline = time.monotonic() + 10
+        while not os.path.exists(ready_file) or not open(ready_file).read():
+            if server.poll() is not None or time.monotonic() > deadline:
+                raise RuntimeError("fake PHPWind 服务器启动失败")
+            time.sleep(0.05)
+        with open(ready_file) as f:
+            port = int(f.read())
+    finally:
+        shutil.rmtree(ready_dir, ignore_errors=True)
+    return server, f"http://127.0.0.1:{port}"
+
+
+def configure_environment(args, upstream: str, workdir: str) -> None:
+    os.environ.update({
+        "DAYSIGN_UPSTREAM": upstream,
+        "REPLY_INTERVAL_MOESHARE": args.reply_interval,
+        "ACTIVITY_SETTLE_MOESHARE": "0",
+        "MOESHARE_CONCURRENCY": str(args.concurrency),
+        "DAYSIGN_STATE_DB": os.path.join(workdir, "state.sqlite3"),
+        "DAYSIGN_HTTP_CACHE_DIR": os.path.join(workdir, "http_cache"),
+        "NOTIFY_FLUSH_DEADLINE": "1",
+    })
+    os.environ.pop("TG_USER_ID", None)
+    os.environ.pop("TG_BOT_TOKEN", None)
+
+
+def run_moeshare(accounts: int, concurrency: int) -> int:
+    import moeshare_daysign
+
+    fetches = [
+        (f"sim_{i}", f'fetch("https://www.moeshare.cc/u.php", {{"headers": {{"cookie": "pw_winduser=sim{i}; lastvisit=1"}}}})')
+        for i in range(accounts)
+    ]
+    results = asyncio.run(moeshare_daysign.run_accounts(fetches, concurrency))
+    return sum(1 for ok in results.values() if ok)
+
+
+def run_manhuabudang(accounts: int, concurrency: int) -> int:
+    import manhuabudang
+
+    cookies = [{"pw_winduser": f"sim{i}", "lastvisit": "1"} for i in range(accounts)]
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        return sum(1 for ok in executor.map(lambda c: manhuabudang.daysign(c), cookies) if ok)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--site", choices=("moeshare", "manhuabudang"), default="moeshare")
+    parser.add_argument("--accounts", type=int, default=10, help="模拟账号数（1~1000）")
+    parser.add_argument("--concurrency", type=int, default=10, help="同时运行的账号数")
+    parser.add_argument("--reply-interval", default="0,0", help="两次回帖之间等待的秒数范围，格式：最小,最大")
+    parser.add_argument("--json", metavar="PATH", help="把结果写入 JSON 文件")
+    parser.add_argument("-v", "--verbose", action="store_true", help="显示签到脚本的输出")
+    fake_phpwind.add_options(parser)
+    args = parser.parse_args()
+    if not 1 <= args.accounts <= 1000:
+        parser.error("--accounts 需要在 1~1000 之间")
+
+    server, upstream = start_server(args)
+    try:
+        with tempfile.TemporaryDirectory(prefix="load_daysign_") as workdir:
+            configure_environment(args, upstream, workdir)
+            run = run_moeshare if args.site == "moeshare" else run_manhuabudang
+            output = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(open(os.devnull, "w"))
+            start = time.perf_counter()
+            with output:
+                succeeded = run(args.accounts, args.concurrency)
+                import site_client
+                site_client.flush_notifications(1)
+            wall = time.perf_counter() - start
+            stats = httpx.get(f"{upstream}/__stats").json()
+    finally:
+        server.terminate()
+        server.wait()
+
+    peak_rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # Linux 上单位为 KB
+    total = stats["total_requests"] - 1  # 不计 /__stats 本身
+    report = {
+        "site": args.site,
+        "accounts": args.accounts,
+        "succeeded": succeeded,
+        "concurrency": args.concurrency,
+        "wall_seconds": round(wall, 3),
+        "accounts_per_second": round(args.accounts / wall, 2),
+        "requests_per_account": round(total / args.accounts, 2),
+        "bytes_in_per_account": round(stats["bytes_in"] / args.accounts),
+        "bytes_out_per_account": round(stats["bytes_out"] / args.accounts),
+        "not_modified": stats["not_modified"],
+        "flood_rejected": stats["flood_rejected"],
+        "peak_rss_mb": round(peak_rss_mb, 1),
+        "requests": stats["requests"],
+    }
+
+    print(f"站点 {args.site}：{succeeded}/{args.accounts} 个账号成功，并发 {args.concurrency}")
+    print(f"总耗时 {report['wall_seconds']} 秒（{report['accounts_per_second']} 账号/秒）")
+    print(f"每个账号 {report['requests_per_account']} 次请求，上传 {report['bytes_in_per_account']} 字节，"
+          f"下载 {report['bytes_out_per_account']} 字节；304 {report['not_modified']} 次，灌水拒绝 {report['flood_rejected']} 次")
+    print(f"峰值内存 {report['peak_rss_mb']} MB")
+    for kind, count in stats["requests"].items():
+        if "__stats" not in kind:
+            print(f"    {kind:<48} {count:6d}  ({count / args.accounts:.2f}/账号)")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
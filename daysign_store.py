@@ -0,0 +1,138 @@
+import os
+import json
+import math
+import time
+import sqlite3
+import hashlib
+import threading
+from contextlib import contextmanager
+
+# --- 本地状态存储 ---
+# 跨运行持久化的签到状态（已回复帖子等）保存在同一个 SQLite 文件中，多个账号、多个进程共用。
+# 读写都是阻塞的 SQLite 操作，异步代码中应通过 asyncio.to_thread 调用。
+DEFAULT_STATE_DB = os.path.join(os.path.dirname(os.path.abspath(__file__)), "daysign_state.sqlite3")
+STATE_DB = os.getenv("DAYSIGN_STATE_DB", DEFAULT_STATE_DB)
+
+# 已回复帖子的记录保留天数，过期后该帖子可以再次被选中
+REPLY_LEDGER_TTL_DAYS = float(os.getenv("REPLY_LEDGER_TTL_DAYS", 30))
+
+# 每次成功回复带来的活跃度增长：没有历史数据时的初始值、学习速率和取值范围
+DEFAULT_ACTIVITY_GAIN = 1.0
+ACTIVITY_GAIN_ALPHA = 0.3
+ACTIVITY_GAIN_RANGE = (0.1, 10.0)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS replied_threads (
+    account TEXT NOT NULL,
+    tid INTEGER NOT NULL,
+    replied_at REAL NOT NULL,
+    PRIMARY KEY (account, tid)
+);
+CREATE TABLE IF NOT EXISTS activity_gain (
+    account TEXT PRIMARY KEY,
+    gain REAL NOT NULL,
+    samples INTEGER NOT NULL,
+    updated_at REAL NOT NULL
+);
+"""
+
+
+_connections: dict[str, sqlite3.Connection] = {}
+_connections_lock = threading.Lock()
+
+
+@contextmanager
+def _db(path: str):
+    """
+    进程内每个数据库文件共用一个连接（建表只在首次连接时执行），各线程通过锁依次使用。
+    """
+    with _connections_lock:
+        conn = _connections.get(path)
+        if conn is None:
+            conn = _connections[path] = sqlite3.connect(path, timeout=30, check_same_thread=False)
+            conn.executescript(_SCHEMA)
+        yield conn
+
+
+def account_key(cookies: dict) -> str:
+    """
+    由 Cookie 计算一个稳定的账号标识，不在本地保存任何 Cookie 原文。
+    优先使用 PHPWind 的 *winduser 登录 Cookie，其次使用全部 Cookie。
+    """
+    for name, value in cookies.items():
+        if name.endswith('winduser'):
+            return hashlib.sha1(value.encode('utf-8')).hexdigest()[:16]
+    return hashlib.sha1(json.dumps(sorted(cookies.items())).encode('utf-8')).hexdigest()[:16]
+
+
+class ReplyLedger:
+    """
+    按 (账号, tid) 记录已回复过的帖子，在选择候选帖子时先在本地过滤，避免重复请求和重复回复。
+    """
+
+    def __init__(self, account: str, path: str = STATE_DB, ttl_days: float = REPLY_LEDGER_TTL_DAYS):
+        self.account = account
+        self.path = path
+        self.ttl = ttl_days * 86400
+
+    def replied_tids(self) -> set[int]:
+        """
+        返回该账号未过期的已回复帖子 ID，同时清理过期记录。
+        """
+        with _db(self.path) as conn, conn:
+            conn.execute("DELETE FROM replied_threads WHERE replied_at < ?", (time.time() - self.ttl,))
+            rows = conn.execute("SELECT tid FROM replied_threads WHERE account = ?", (self.account,))
+            return {tid for tid, in rows}
+
+    def record(self, tid: int) -> None:
+        with _db(self.path) as conn, conn:
+            conn.execute("INSERT OR REPLACE INTO replied_threads (account, tid, replied_at) VALUES (?, ?, ?)",
+                         (self.account, tid, time.time()))
+
+
+class ActivityGainModel:
+    """
+    按账号学习“每次成功回复增加多少活跃度”，用指数滑动平均跨运行持久化。
+    用来推算还需要几次回复，而不必在每次回复后都重新请求 u.php。
+    """
+
+    def __init__(self, account: str, path: str = STATE_DB):
+        self.account = account
+        self.path = path
+        self.gain = DEFAULT_ACTIVITY_GAIN
+        self.samples = 0
+        with _db(self.path) as conn:
+            row = conn.execute("SELECT gain, samples FROM activity_gain WHERE account = ?",
+                               (self.account,)).fetchone()
+        if row:
+            self.gain, self.samples = row
+
+    def replies_needed(self, gap: int) -> int:
+        """
+        返回补足 gap 点活跃度预计需要的成功回复次数。
+        """
+        if gap <= 0:
+            return 0
+        return max(1, math.ceil(gap / self.gain))
+
+    def poll_after(self, gap: int) -> int:
+        """
+        返回最迟在多少次成功回复后重新读取 u.php。
+        学到的增长偏小时按模型推算会多回复很多次，因此按模型和默认增长中较大的一个推算。
+        """
+        return max(1, math.ceil(gap / max(self.gain, DEFAULT_ACTIVITY_GAIN)))
+
+    def observe(self, delta: float, replies: int) -> None:
+        """
+        记录一次观测：replies 次成功回复后活跃度增加了 delta。
+        """
+        if replies <= 0:
+            return
+        low, high = ACTIVITY_GAIN_RANGE
+        sample = min(max(delta / replies, low), high)
+        # 第一次观测也与默认值加权平均，一次读取过早（活跃度尚未更新）不会让模型直接跌到下限
+        self.gain = (1 - ACTIVITY_GAIN_ALPHA) * self.gain + ACTIVITY_GAIN_ALPHA * sample
+        self.samples += 1
+        with _db(self.path) as conn, conn:
+            conn.execute("INSERT OR REPLACE INTO activity_gain (account, gain, samples, updated_at) "
+                         "VALUES (?, ?, ?, ?)", (self.account, self.gain, self.samples, time.time()))
@@ -0,0 +1,457 @@
+import os
+import re
+from typing import Callable, NamedTuple
+
+import profiling
+
+# --- 页面字段提取层 ---
+# 每种字段都有多个可替换的后端实现：
+#   regex: 在原始字节上直接用预编译正则提取，不解码整个页面、不建 DOM 树，速度最快；
+#   lxml : 使用 lxml 解析（需要额外安装 lxml，未安装时自动跳过）；
+#   bs4  : 使用 BeautifulSoup + html.parser，纯 Python 实现，最宽容也最慢。
+# HTML_EXTRACT_BACKEND 为逗号分隔的后端顺序，依次尝试，前一个后端什么都没提取到时自动回退到下一个。
+DEFAULT_BACKENDS = "regex,lxml,bs4"
+
+try:
+    import lxml.html
+except ImportError:  # lxml 为可选依赖
+    lxml = None
+
+
+class UserCenterFields(NamedTuple):
+    punch_button_found: bool = False
+    punch_button_disabled: bool = True
+    mb: int = 0
+    activity: int = 0
+    verifyhash: str | None = None
+
+
+class PunchDiv(NamedTuple):
+    classes: list[str]
+    text: str
+
+
+_META_CHARSET_RE = re.compile(rb'<meta[^>]+charset=["\']?([\w-]+)', re.IGNORECASE)
+_VERIFYHASH_RE = re.compile(rb"var\s+verifyhash\s*=\s*'([a-f0-9]+)'")
+_VERIFYHASH_STR_RE = re.compile(r"var\s+verifyhash\s*=\s*'([a-f0-9]+)'")
+_DIGITS_RE = re.compile(r'^\d+$')
+
+_THREADLIST_RE = re.compile(rb'<tbody[^>]*\bid="threadlist"[^>]*>(.*?)</tbody>', re.DOTALL)
+_TR_RE = re.compile(rb'<tr\b([^>]*)>(.*?)(?=<tr\b|</tbody>|$)', re.DOTALL)
+_CLASS_ATTR_RE = re.compile(rb'\bclass="([^"]*)"')
+_TD_ID_RE = re.compile(rb'<td\b[^>]*\bid="td_(\d+)"')
+_TD_ID_STR_RE = re.compile(r'^td_\d+')
+
+_BUTTON_RE = re.compile(rb'<button\b([^>]*)>\s*([^<]*?)\s*</button>', re.DOTALL)
+_MB5_RE = re.compile(rb'<p\b[^>]*\bclass="[^"]*\bmb5\b[^"]*"[^>]*>(.*?)</p>', re.DOTALL)
+_A_DIGITS_RE = re.compile(rb'<a\b[^>]*>\s*(\d+)\s*</a>')
+_TAG_RE = re.compile(rb'<[^>]+>')
+
+_POST_FORM_RE = re.compile(rb'<form\b[^>]*\baction="[^"]*post.php[^"]*"[^>]*>(.*?)</form>', re.DOTALL)
+_INPUT_RE = re.compile(rb'<input\b([^>]*)>')
+_ATTR_RE = re.compile(rb'([\w-]+)\s*=\s*(?:"([^"]*)"|\'([^\']*)\')')
+
+_CARD_DIV_RE = re.compile(
+    rb'<div\b([^>]*)>\s*(?:<span\b[^>]*>)?([^<]*)(?:</span>)?\s*</div>', re.DOTALL)
+
+# 按编码缓存编码后的中文标记，避免每次调用都重新 encode
+_marker_cache: dict[tuple[str, str], bytes] = {}
+
+
+def _marker(text: str, encoding: str) -> bytes:
+    key = (text, encoding)
+    if key not in _marker_cache:
+        _marker_cache[key] = text.encode(encoding, errors='replace')
+    return _marker_cache[key]
+
+
+def sniff_encoding(content: bytes, declared: str | None = None) -> str:
+    """
+    返回页面编码：优先使用响应头声明的 charset，其次是页面前 2KB 中的 <meta charset>，默认 utf-8。
+    """
+    if declared:
+        return declared
+    match = _META_CHARSET_RE.search(content, 0, 2048)
+    if match:
+        return match.group(1).decode('ascii')
+    return 'utf-8'
+
+
+def _attrs(raw: bytes, encoding: str) -> dict[str, str]:
+    return {
+        m.group(1).decode('ascii').lower(): (m.group(2) if m.group(2) is not None else m.group(3) or b'').decode(
+            encoding, errors='replace')
+        for m in _ATTR_RE.finditer(raw)
+    }
+
+
+def _html_unescape(text: str) -> str:
+    if '&' not in text:
+        return text
+    import html
+    return html.unescape(text)
+
+
+# --- regex 后端 ---
+
+def _forum_tids_regex(content: bytes, encoding: str, after_marker: bool = True) -> list[int]:
+    body = _THREADLIST_RE.search(content)
+    if not body:
+        return []
+    marker = _marker('普通主题', encoding)
+    tids = []
+    seen_marker = not after_marker
+    for row in _TR_RE.finditer(body.group(1)):
+        class_match = _CLASS_ATTR_RE.search(row.group(1))
+        classes = class_match.group(1).split() if class_match else []
+        if not seen_marker:
+            seen_marker = b'tr4' in classes and marker in row.group(2)
+            continue
+        if b'tr3' in classes:
+            td_match = _TD_ID_RE.search(row.group(2))
+            if td_match:
+                tids.append(int(td_match.group(1)))
+    return tids
+
+
+def _user_center_regex(content: bytes, encoding: str) -> UserCenterFields:
+    found, disabled = False, True
+    label = _marker('每日打卡', encoding)
+    for match in _BUTTON_RE.finditer(content):
+        attrs = _attrs(match.group(1), encoding)
+        if attrs.get('type') == 'button' and match.group(2) == label:
+            found = True
+            disabled = b'disabled' in match.group(1)
+            break
+
+    mb = activity = 0
+    mb_label, activity_label = _marker('MB：', encoding), _marker('活跃度：', encoding)
+    for match in _MB5_RE.finditer(content):
+        text = _TAG_RE.sub(b'', match.group(1))
+        a_match = _A_DIGITS_RE.search(match.group(1))
+        if mb_label in text:
+            mb = int(a_match.group(1)) if a_match else mb
+        elif activity_label in text:
+            activity = int(a_match.group(1)) if a_match else activity
+
+    verifyhash = _verifyhash_regex(content, encoding)
+    return UserCenterFields(found, disabled, mb, activity, verifyhash)
+
+
+def _reply_form_regex(content: bytes, encoding: str) -> dict[str, str] | None:
+    form = _POST_FORM_RE.search(content)
+    if not form:
+        return None
+    form_data = {}
+    for match in _INPUT_RE.finditer(form.group(1)):
+        attrs = _attrs(match.group(1), encoding)
+        if attrs.get('type') == 'hidden' and attrs.get('name'):
+            form_data[_html_unescape(attrs['name'])] = _html_unescape(attrs['value']) if 'value' in attrs else None
+    return form_data
+
+
+def _manhuabudang_punch_div_regex(content: bytes, encoding: str) -> PunchDiv | None:
+    new_label, old_label = _marker('每日打卡', encoding), _marker('天打卡', encoding)
+    old_div = None
+    for match in _CARD_DIV_RE.finditer(content):
+        class_match = _CLASS_ATTR_RE.search(match.group(1))
+        if not class_match:
+            continue
+        classes = class_match.group(1).decode('ascii', errors='replace').split()
+        text = match.group(2).strip()
+        if 'card' in classes and new_label in text and 'card_old' not in classes:
+            return PunchDiv(classes, text.decode(encoding, errors='replace'))
+        if old_div is None and 'card_old' in classes and old_label in text:
+            old_div = PunchDiv(classes, text.decode(encoding, errors='replace'))
+    return old_div
+
+
+def _verifyhash_regex(content: bytes, encoding: str) -> str | None:
+    match = _VERIFYHASH_RE.search(content)
+    return match.group(1).decode('ascii') if match else None
+
+
+# --- bs4 后端 ---
+
+def _soup(content: bytes, encoding: str):
+    from bs4 import BeautifulSoup
+    return BeautifulSoup(content, 'html.parser', from_encoding=encoding)
+
+
+def _forum_tids_bs4(content: bytes, encoding: str, after_marker: bool = True) -> list[int]:
+    soup = _soup(content, encoding)
+    thread_list_body = soup.find('tbody', id='threadlist')
+    if not thread_list_body:
+        print("⚠️ 未找到 id='threadlist' 的 tbody。请检查版块页面结构。")
+        return []
+
+    if after_marker:
+        normal_threads_marker = thread_list_body.find('tr', class_='tr4', string=lambda
+            text: '普通主题' in text if text else False)
+        if not normal_threads_marker:
+            print("⚠️ 未找到 '普通主题' 标记行。请检查版块页面结构。")
+            return []
+        current_thread_row = normal_threads_marker.find_next_sibling('tr')
+    else:
+        current_thread_row = thread_list_body.find('tr')
+
+    tids = []
+    while current_thread_row:
+        if 'tr3' in current_thread_row.get('class', []):
+            td_id_tag = current_thread_row.find('td', id=_TD_ID_STR_RE)
+            if td_id_tag:
+                tid_match = re.search(r'td_(\d+)', td_id_tag['id'])
+                if tid_match:
+                    tids.append(int(tid_match.group(1)))
+        current_thread_row = current_thread_row.find_next_sibling('tr')
+    return tids
+
+
+def _user_center_bs4(content: bytes, encoding: str) -> UserCenterFields:
+    soup = _soup(content, encoding)
+    found, disabled = False, True
+    punch_button = soup.find('button', type='button', string='每日打卡')
+    if punch_button:
+        found = True
+        disabled = 'disabled' in punch_button.attrs
+    else:
+        info_box = soup.find('div', class_='infoBox')
+        if info_box:
+            print(f"调试信息：在 infoBox 中未找到按钮。infoBox 内容前200字：\n{info_box.prettify()[:500]}...")
+
+    mb = activity = 0
+    for p_tag in soup.find_all('p', class_='mb5'):
+        p_text = p_tag.get_text(strip=True)
+        a_tag = p_tag.find('a')
+        value = a_tag.text.strip() if a_tag else ''
+        if 'MB：' in p_text:
+            if _DIGITS_RE.match(value):
+                mb = int(value)
+            else:
+                print("⚠️ 未能从 MB 标签的<a>中解析数值。")
+        elif '活跃度：' in p_text:
+            if _DIGITS_RE.match(value):
+                activity = int(value)
+            else:
+                print("⚠️ 未能从活跃度标签的<a>中解析数值。")
+
+    return UserCenterFields(found, disabled, mb, activity, _verifyhash_from_soup(soup))
+
+
+def _reply_form_bs4(content: bytes, encoding: str) -> dict[str, str] | None:
+    soup = _soup(content, encoding)
+    reply_form = soup.find('form', {'action': re.compile(r'post.php')})
+    if not reply_form:
+        return None
+    form_data = {}
+    for hidden_input in reply_form.find_all('input', type='hidden'):
+        name = hidden_input.get('name')
+        if name:
+            form_data[name] = hidden_input.get('value')
+    return form_data
+
+
+def _manhuabudang_punch_div_bs4(content: bytes, encoding: str) -> PunchDiv | None:
+    soup = _soup(content, encoding)
+    punch_div = None
+    # 未打卡按钮: class="card fr" 且文本为 "每日打卡"
+    new_punch_div = soup.find('div', class_='card', string=re.compile(r'每日打卡'))
+    if new_punch_div and 'card_old' not in new_punch_div.get('class', []):  # 确保不是已打卡状态的旧按钮
+        punch_div = new_punch_div
+    # 已打卡按钮: class="card fr card_old" 且文本包含 "天打卡"
+    if not punch_div:
+        punch_div = soup.find('div', class_='card_old', string=re.compile(r'天打卡'))
+    if not punch_div:
+        return None
+    return PunchDiv(punch_div.get('class', []), punch_div.get_text(strip=True))
+
+
+def _verifyhash_from_soup(soup) -> str | None:
+    for script in soup.find_all('script'):
+        if script.string:
+            match = _VERIFYHASH_STR_RE.search(script.string)
+            if match:
+                return match.group(1)
+    return None
+
+
+def _verifyhash_bs4(content: bytes, encoding: str) -> str | None:
+    return _verifyhash_from_soup(_soup(content, encoding))
+
+
+# --- lxml 后端 ---
+
+def _tree(content: bytes, encoding: str):
+    return lxml.html.fromstring(content, parser=lxml.html.HTMLParser(encoding=encoding))
+
+
+def _classes(element) -> list[str]:
+    return (element.get('class') or '').split()
+
+
+def _forum_tids_lxml(content: bytes, encoding: str, after_marker: bool = True) -> list[int]:
+    bodies = _tree(content, encoding).xpath('//tbody[@id="threadlist"]')
+    if not bodies:
+        return []
+    tids = []
+    seen_marker = not after_marker
+    for row in bodies[0].iterchildren('tr'):
+        if not seen_marker:
+            seen_marker = 'tr4' in _classes(row) and '普通主题' in row.text_content()
+            continue
+        if 'tr3' in _classes(row):
+            for td in row.iter('td'):
+                tid_match = re.match(r'td_(\d+)', td.get('id') or '')
+                if tid_match:
+                    tids.append(int(tid_match.group(1)))
+                    break
+    return tids
+
+
+def _user_center_lxml(content: bytes, encoding: str) -> UserCenterFields:
+    tree = _tree(content, encoding)
+    found, disabled = False, True
+    for button in tree.xpath('//button[@type="button"]'):
+        if button.text_content() == '每日打卡':
+            found = True
+            disabled = 'disabled' in button.attrib
+            break
+
+    mb = activity = 0
+    for p_tag in tree.xpath('//p[contains(concat(" ", normalize-space(@class), " "), " mb5 ")]'):
+        p_text = ''.join(p_tag.text_content().split())
+        a_tags = p_tag.xpath('.//a')
+        value = a_tags[0].text_content().strip() if a_tags else ''
+        if 'MB：' in p_text and _DIGITS_RE.match(value):
+            mb = int(value)
+        elif '活跃度：' in p_text and _DIGITS_RE.match(value):
+            activity = int(value)
+
+    verifyhash = None
+    for script in tree.iter('script'):
+        match = _VERIFYHASH_STR_RE.search(script.text or '')
+        if match:
+            verifyhash = match.group(1)
+            break
+    return UserCenterFields(found, disabled, mb, activity, verifyhash)
+
+
+def _reply_form_lxml(content: bytes, encoding: str) -> dict[str, str] | None:
+    forms = _tree(content, encoding).xpath('//form[contains(@action, "post.php")]')
+    if not forms:
+        return None
+    return {
+        hidden_input.get('name'): hidden_input.get('value')
+        for hidden_input in forms[0].xpath('.//input[@type="hidden"]')
+        if hidden_input.get('name')
+    }
+
+
+def _manhuabudang_punch_div_lxml(content: bytes, encoding: str) -> PunchDiv | None:
+    old_div = None
+    for div in _tree(content, encoding).iter('div'):
+        classes = _classes(div)
+        if 'card' not in classes and 'card_old' not in classes:
+            continue
+        text = div.text_content().strip()
+        if 'card' in classes and '每日打卡' in text and 'card_old' not in classes:
+            return PunchDiv(classes, text)
+        if old_div is None and 'card_old' in classes and '天打卡' in text:
+            old_div = PunchDiv(classes, text)
+    return old_div
+
+
+def _verifyhash_lxml(content: bytes, encoding: str) -> str | None:
+    for script in _tree(content, encoding).iter('script'):
+        match = _VERIFYHASH_STR_RE.search(script.text or '')
+        if match:
+            return match.group(1)
+    return None
+
+
+# --- 后端注册与调度 ---
+
+_EXTRACTORS: dict[str, dict[str, Callable]] = {
+    'regex': {
+        'forum_tids': _forum_tids_regex,
+        'user_center': _user_center_regex,
+        'reply_form': _reply_form_regex,
+        'manhuabudang_punch_div': _manhuabudang_punch_div_regex,
+        'verifyhash': _verifyhash_regex,
+    },
+    'lxml': {
+        'forum_tids': _forum_tids_lxml,
+        'user_center': _user_center_lxml,
+        'reply_form': _reply_form_lxml,
+        'manhuabudang_punch_div': _manhuabudang_punch_div_lxml,
+        'verifyhash': _verifyhash_lxml,
+    },
+    'bs4': {
+        'forum_tids': _forum_tids_bs4,
+        'user_center': _user_center_bs4,
+        'reply_form': _reply_form_bs4,
+        'manhuabudang_punch_div': _manhuabudang_punch_div_bs4,
+        'verifyhash': _verifyhash_bs4,
+    },
+}
+
+
+def backend_chain() -> list[str]:
+    """
+    返回当前生效的后端顺序，跳过未知或未安装的后端。
+    """
+    chain = []
+    for name in os.getenv("HTML_EXTRACT_BACKEND", DEFAULT_BACKENDS).split(','):
+        name = name.strip()
+        if name not in _EXTRACTORS or (name == 'lxml' and lxml is None):
+            continue
+        chain.append(name)
+    return chain or ['bs4']
+
+
+def _extract(kind: str, content: bytes, encoding: str | None, is_empty: Callable, *args):
+    with profiling.phase('parse'):
+        encoding = sniff_encoding(content, encoding)
+        result = None
+        for name in backend_chain():
+            result = _EXTRACTORS[name][kind](content, encoding, *args)
+            if not is_empty(result):
+                return result
+        return result
+
+
+def forum_tids(content: bytes, encoding: str | None = None, after_marker: bool = True) -> list[int]:
+    """
+    提取版块页面中的帖子 ID。
+    after_marker 为 True 时只返回 '普通主题' 标记行之后的帖子（跳过置顶帖）。
+    """
+    return _extract('forum_tids', content, encoding, lambda tids: not tids, after_marker)
+
+
+def user_center(content: bytes, encoding: str | None = None) -> UserCenterFields:
+    """
+    提取萌享社个人中心页面中的打卡按钮状态、MB、活跃度和 verifyhash。
+    """
+    return _extract('user_center', content, encoding,
+                    lambda fields: not fields.punch_button_found and not fields.mb and not fields.activity)
+
+
+def reply_form(content: bytes, encoding: str | None = None) -> dict[str, str] | None:
+    """
+    提取帖子页面中回帖表单（action 指向 post.php）的全部隐藏字段，未找到表单时返回 None。
+    """
+    return _extract('reply_form', content, encoding, lambda form_data: form_data is None)
+
+
+def manhuabudang_punch_div(content: bytes, encoding: str | None = None) -> PunchDiv | None:
+    """
+    提取漫画不当BBS个人中心的打卡按钮 div（未打卡的 '每日打卡' 优先，其次是已打卡的 '连续 N 天打卡'）。
+    """
+    return _extract('manhuabudang_punch_div', content, encoding, lambda punch_div: punch_div is None)
+
+
+def verifyhash(content: bytes, encoding: str | None = None) -> str | None:
+    """
+    提取页面脚本中的 var verifyhash = '...'。
+    """
+    return _extract('verifyhash', content, encoding, lambda value: value is None)
@@ -0,0 +1,167 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from contextlib import contextmanager
+from dataclasses import dataclass
+
+import httpx
+
+# --- HTTP 条件请求缓存 ---
+# 保存 GET 响应的 ETag / Last-Modified 和正文，下次请求时带上 If-None-Match / If-Modified-Since，
+# 服务器返回 304 时直接用本地正文构造响应。正文按 sha256 摘要存储，多个账号拿到相同页面时只存一份。
+# 缓存目录可在多个进程之间共享，总大小超过上限时按最近使用时间淘汰。
+DEFAULT_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".http_cache")
+HTTP_CACHE_ENABLED = os.getenv("DAYSIGN_HTTP_CACHE", "true").lower() != "false"
+HTTP_CACHE_DIR = os.getenv("DAYSIGN_HTTP_CACHE_DIR", DEFAULT_CACHE_DIR)
+HTTP_CACHE_MAX_BYTES = int(float(os.getenv("DAYSIGN_HTTP_CACHE_MB", 64)) * 1024 * 1024)
+
+# 从缓存构造响应时保留的响应头
+_KEPT_HEADERS = ('content-type', 'etag', 'last-modified')
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    etag TEXT,
+    last_modified TEXT,
+    digest TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    headers TEXT NOT NULL,
+    last_access REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS entries_last_access ON entries (last_access);
+"""
+
+
+@dataclass
+class CacheEntry:
+    key: str
+    etag: str | None
+    last_modified: str | None
+    digest: str
+    size: int
+    headers: dict
+
+
+class HttpCache:
+    """
+    以 key（通常为 URL，可加上账号前缀）索引的磁盘缓存，按正文总大小做 LRU 淘汰。
+    方法都是阻塞的文件和 SQLite 操作，异步代码中应通过 asyncio.to_thread 调用。
+    """
+
+    def __init__(self, directory: str = HTTP_CACHE_DIR, max_bytes: int = HTTP_CACHE_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.blob_dir = os.path.join(directory, 'blobs')
+        os.makedirs(self.blob_dir, exist_ok=True)
+        self.index_path = os.path.join(directory, 'index.sqlite3')
+        self._conn: sqlite3.Connection | None = None
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def _db(self):
+        """
+        进程内共用一个索引连接（建表只在首次连接时执行），各线程通过锁依次使用。
+        """
+        with self._lock:
+            if self._conn is None:
+                self._conn = sqlite3.connect(self.index_path, timeout=30, check_same_thread=False)
+                self._conn.executescript(_SCHEMA)
+            yield self._conn
+
+    def _blob_path(self, digest: str) -> str:
+        return os.path.join(self.blob_dir, digest)
+
+    def lookup(self, key: str) -> CacheEntry | None:
+        with self._db() as conn:
+            row = conn.execute("SELECT key, etag, last_modified, digest, size, headers FROM entries WHERE key = ?",
+                               (key,)).fetchone()
+        if not row:
+            return None
+        return CacheEntry(*row[:5], json.loads(row[5]))
+
+    @staticmethod
+    def revalidation_headers(entry: CacheEntry) -> dict:
+        """
+        返回用于条件请求的请求头。
+        """
+        headers = {}
+        if entry.etag:
+            headers['if-none-match'] = entry.etag
+        if entry.last_modified:
+            headers['if-modified-since'] = entry.last_modified
+        return headers
+
+    def response_from_cache(self, entry: CacheEntry, request: httpx.Request) -> httpx.Response | None:
+        """
+        收到 304 后用本地正文构造一个 200 响应；正文已被淘汰时返回 None。
+        """
+        try:
+            with open(self._blob_path(entry.digest), 'rb') as f:
+                body = f.read()
+        except FileNotFoundError:
+            return None
+        with self._db() as conn, conn:
+            conn.execute("UPDATE entries SET last_access = ? WHERE key = ?", (time.time(), entry.key))
+        return httpx.Response(200, headers=entry.headers, content=body, request=request)
+
+    def store(self, key: str, response: httpx.Response) -> None:
+        """
+        保存带有 ETag 或 Last-Modified 的 200 响应，没有校验头的响应无法做条件请求，不缓存。
+        """
+        etag = response.headers.get('etag')
+        last_modified = response.headers.get('last-modified')
+        if response.status_code != 200 or not (etag or last_modified):
+            return
+
+        body = response.content
+        digest = hashlib.sha256(body).hexdigest()
+        blob_path = self._blob_path(digest)
+        if not os.path.exists(blob_path):
+            tmp_path = f"{blob_path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'wb') as f:
+                f.write(body)
+            os.replace(tmp_path, blob_path)
+
+        headers = {name: response.headers[name] for name in _KEPT_HEADERS if name in response.headers}
+        with self._db() as conn, conn:
+            conn.execute("INSERT OR REPLACE INTO entries (key, etag, last_modified, digest, size, headers, last_access) "
+                         "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                         (key, etag, last_modified, digest, len(body), json.dumps(headers), time.time()))
+            self._evict(conn)
+
+    def _evict(self, conn: sqlite3.Connection) -> None:
+        """
+        按最近使用时间淘汰条目，直到去重后的正文总大小不超过 max_bytes。
+        """
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM (SELECT DISTINCT digest, size FROM entries)").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for key, digest, size in conn.execute(
+                "SELECT key, digest, size FROM entries ORDER BY last_access").fetchall():
+            conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+            if not conn.execute("SELECT 1 FROM entries WHERE digest = ? LIMIT 1", (digest,)).fetchone():
+                try:
+                    os.remove(self._blob_path(digest))
+                except FileNotFoundError:
+                    pass
+                total -= size
+            if total <= self.max_bytes:
+                break
+
+
+_default_cache: HttpCache | None = None
+
+
+def default_cache() -> HttpCache | None:
+    """
+    返回进程内共享的默认缓存；DAYSIGN_HTTP_CACHE=false 时返回 None。
+    """
+    global _default_cache
+    if not HTTP_CACHE_ENABLED:
+        return None
+    if _default_cache is None:
+        _default_cache = HttpCache()
+    return _default_cache
@@ -1,21 +1,61 @@
 import os
 import re
 import time
+import json
+import asyncio
+import builtins
+import contextvars
 import httpx, h2
 import traceback
 import random
-from contextlib import contextmanager
-from bs4 import BeautifulSoup
+from dataclasses import dataclass
+
+import html_extract
+import profiling
+import run_metrics
+import site_client
+from site_client import queue_notification
+from daysign_store import ActivityGainModel, ReplyLedger, account_key
+from http_cache import default_cache
 
 # --- 萌享社配置 ---
 Moeshare_HOST = "www.moeshare.cc"
-DEFAULT_USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/138.0.0.0 Safari/537.36 Edg/138.0.0.0'
 FID = 36  # 后花园
 
 # 发帖次数（现在主要由活跃度目标控制，此变量作为最大尝试次数）
 MAX_REPLY_ATTEMPTS = int(os.getenv("REPLY_TIMES_MOESHARE", 15))  # 提高最大尝试次数，以防活跃度较低
 TARGET_ACTIVITY = 10  # 目标活跃度
 
+# 候选帖子池最多抓取的版块页数，以及每批并发抓取的页数
+FORUM_MAX_PAGES = int(os.getenv("FORUM_PAGES_MOESHARE", 5))
+FORUM_CRAWL_BATCH = 3
+
+# 回帖 AJAX 响应中的活跃度奖励，例如 "活跃度+1"
+_ACTIVITY_GAIN_RE = re.compile(r'活跃度\s*[+＋]\s*(\d+)')
+
+# 两次回帖之间等待的秒数范围，以及预计活跃度达标后等待服务器更新的秒数（本地模拟测试时可设为 0）
+REPLY_INTERVAL = tuple(float(s) for s in os.getenv("REPLY_INTERVAL_MOESHARE", "40,60").split(',', 1))
+ACTIVITY_SETTLE_SECONDS = float(os.getenv("ACTIVITY_SETTLE_MOESHARE", 5))
+
+# 多账号并发运行时同时执行的账号数上限
+MAX_CONCURRENT_ACCOUNTS = int(os.getenv("MOESHARE_CONCURRENCY", 5))
+
+# 当前协程所属账号的标签，多账号并发时用作输出前缀
+_account_label = contextvars.ContextVar('account_label', default='')
+
+
+def print(*args, **kw):
+    """
+    多账号并发时在每行输出前加上账号标签，避免各账号的日志混在一起无法区分。
+    """
+    label = _account_label.get()
+    if label and args:
+        text = str(args[0])
+        stripped = text.lstrip('\n')
+        builtins.print(f"{text[:len(text) - len(stripped)]}[{label}] {stripped}", *args[1:], **kw)
+    else:
+        builtins.print(*args, **kw)
+
 # 原始的回复内容列表
 AUTO_REPLIES_ORIGINAL = (
     "每日打卡，补充一些活跃度",
@@ -33,80 +73,32 @@ AUTO_REPLIES_ORIGINAL = (
 )
 
 
-# --- Telegram 通知函数 ---
-def push_notification(title: str, content: str) -> None:
+def _notify(title: str, content: str) -> None:
     """
-    发送 Telegram 通知。
-    需要设置 TG_USER_ID 和 TG_BOT_TOKEN 环境变量。
+    把通知放入后台队列，立即返回，不阻塞回帖和打卡；同一次运行的通知会合并为一条摘要发送。
     """
-
-    def telegram_send_message(text: str, chat_id: str, token: str, silent: bool = False) -> None:
-        try:
-            r = httpx.post(url=f'https://api.telegram.org/bot{token}/sendMessage',
-                           json={
-                               'chat_id': chat_id,
-                               'text': text,
-                               'disable_notification': silent,
-                               'disable_web_page_preview': True,
-                           }, timeout=10)  # 增加超时时间，避免通知发送卡住
-            r.raise_for_status()
-            print(f"✅ Telegram 通知已发送：{title}")
-        except httpx.RequestError as exc:
-            print(f"❌ 发送 Telegram 通知时发生请求错误: {exc}")
-        except httpx.HTTPStatusError as exc:
-            print(f"❌ 发送 Telegram 通知失败，HTTP 状态码: {exc.response.status_code}, 响应: {exc.response.text}")
-        except Exception as e:
-            print(f"❌ 发送 Telegram 通知过程中发生未知错误: {e}")
-
-    chat_id = os.getenv('TG_USER_ID')
-    bot_token = os.getenv('TG_BOT_TOKEN')
-
-    if chat_id and bot_token:
-        telegram_send_message(f'{title}\n\n{content}', chat_id, bot_token)
-    else:
-        print("⚠️ 未设置 TG_USER_ID 或 TG_BOT_TOKEN，跳过 Telegram 通知。")
+    label = _account_label.get()
+    if label:
+        content = f"[{label}] {content}"
+    queue_notification(title, content)
 
 
 # --- 萌享社核心功能函数 ---
-def _get_tids_from_forum(client: httpx.Client, _request_context_manager, fid: int, page: int = 1) -> list:
+async def _get_tids_from_forum(client: httpx.AsyncClient, _request_context_manager, fid: int, page: int = 1) -> list:
     """
     访问萌享社指定版块的页面，提取普通主题的帖子 ID 列表。
+    第 2 页及之后的页面没有置顶帖和 '普通主题' 标记行，直接取页面中的全部帖子。
     """
     forum_url = f'https://{Moeshare_HOST}/thread-htm-fid-{fid}-page-{page}.html'
     print(f"尝试访问版块页面: {forum_url} 获取帖子列表...")
 
     tids = []
     try:
-        with _request_context_manager('GET', forum_url) as response:
+        async with _request_context_manager('GET', forum_url, step='forum_list', cache_scope='shared') as response:
             print(f"版块页面状态码: {response.status_code}")
             if response.status_code == 200:
-                soup = BeautifulSoup(response.text, 'html.parser')
-                thread_list_body = soup.find('tbody', id='threadlist')
-
-                if thread_list_body:
-                    normal_threads_marker = thread_list_body.find('tr', class_='tr4', string=lambda
-                        text: '普通主题' in text if text else False)
-
-                    if normal_threads_marker:
-                        current_thread_row = normal_threads_marker.find_next_sibling('tr')
-
-                        while current_thread_row:
-                            if 'tr3' in current_thread_row.get('class', []):
-                                td_id_tag = current_thread_row.find('td', id=re.compile(r'^td_\d+'))
-
-                                if td_id_tag:
-                                    tid_match = re.search(r'td_(\d+)', td_id_tag['id'])
-                                    if tid_match:
-                                        tid = int(tid_match.group(1))
-                                        tids.append(tid)
-
-                            next_sibling = current_thread_row.find_next_sibling('tr')
-                            current_thread_row = next_sibling
-
-                    else:
-                        print("⚠️ 未找到 '普通主题' 标记行。请检查版块页面结构。")
-                else:
-                    print("⚠️ 未找到 id='threadlist' 的 tbody。请检查版块页面结构。")
+                # 后续页面按标记行解析必然为空，会让解析一路回退到最慢的 bs4 并打印误导性的警告
+                tids = html_extract.forum_tids(response.content, response.charset_encoding, after_marker=page == 1)
 
                 if tids:
                     print(f"成功从版块 {fid} 页面 {page} 获取到 {len(tids)} 个普通主题帖子ID。")
@@ -124,121 +116,100 @@ def _get_tids_from_forum(client: httpx.Client, _request_context_manager, fid: in
     return tids
 
 
-def _get_current_mb_and_activity(client: httpx.Client, _request_context_manager) -> tuple[int, int]:
+@dataclass
+class UserCenterSnapshot:
     """
-    访问用户中心页面，获取当前 MB 数量和活跃度。
-    返回 (mb_value, activity_value)
+    一次 GET u.php 并解析一次得到的个人中心状态。
+    在下一次 POST（回帖、打卡）之前可重复使用，无需重复请求。
     """
-    user_page_url = f'https://{Moeshare_HOST}/u.php'
-    print(f"正在获取当前 MB 和活跃度，访问页面: {user_page_url}")
-    mb_value = 0
-    activity_value = 0
-    try:
-        with _request_context_manager('GET', user_page_url) as response:
-            if response.status_code == 200:
-                soup = BeautifulSoup(response.text, 'html.parser')
+    punch_button_found: bool = False  # 是否找到 '每日打卡' 按钮（用于判断登录状态）
+    punch_button_disabled: bool = True  # 按钮是否禁用（今日已打卡或无法打卡）
+    mb: int = 0
+    activity: int = 0
+    verifyhash: str | None = None  # 打卡所需的动态参数
 
-                p_tags = soup.find_all('p', class_='mb5')
 
-                for p_tag in p_tags:
-                    p_text = p_tag.get_text(strip=True)
+def _parse_user_center(content: bytes, encoding: str | None = None) -> UserCenterSnapshot:
+    """
+    解析个人中心页面，一次性提取打卡按钮状态、MB、活跃度和 verifyhash。
+    """
+    snapshot = UserCenterSnapshot(**html_extract.user_center(content, encoding)._asdict())
 
-                    if 'MB：' in p_text:
-                        mb_a_tag = p_tag.find('a')
-                        if mb_a_tag and mb_a_tag.text.strip().isdigit():
-                            mb_value = int(mb_a_tag.text.strip())
-                            print(f"✅ 当前 MB: {mb_value}")
-                        else:
-                            print("⚠️ 未能从 MB 标签的<a>中解析数值。")
-                    elif '活跃度：' in p_text:
-                        activity_a_tag = p_tag.find('a')
-                        if activity_a_tag and activity_a_tag.text.strip().isdigit():
-                            activity_value = int(activity_a_tag.text.strip())
-                            print(f"✅ 当前活跃度: {activity_value}")
-                        else:
-                            print("⚠️ 未能从活跃度标签的<a>中解析数值。")
+    if snapshot.punch_button_found:
+        print("✅ 找到 '每日打卡' 按钮。")
+    else:
+        print("❌ 未找到 '每日打卡' 按钮。可能未登录或页面结构有变。")
 
-                if mb_value == 0 and activity_value == 0:
-                    print("⚠️ 未找到 MB 或活跃度信息标签。")
+    if snapshot.mb:
+        print(f"✅ 当前 MB: {snapshot.mb}")
+    if snapshot.activity:
+        print(f"✅ 当前活跃度: {snapshot.activity}")
+    if snapshot.mb == 0 and snapshot.activity == 0:
+        print("⚠️ 未找到 MB 或活跃度信息标签。")
 
-            else:
-                print(f"❌ 获取 MB/活跃度失败，状态码: {response.status_code}")
-    except httpx.RequestError as exc:
-        print(f"❌ 获取 MB/活跃度时发生请求错误: {exc}")
-        traceback.print_exc()
-    except Exception as e:
-        print(f"❌ 获取 MB/活跃度过程中发生未知错误: {e}")
-        traceback.print_exc()
-    return mb_value, activity_value
+    if snapshot.verifyhash:
+        print(f"✅ 成功从页面中提取打卡参数：verify={snapshot.verifyhash}")
+
+    return snapshot
 
 
-def _get_punch_button_element(client: httpx.Client, _request_context_manager):
+async def _get_user_center_snapshot(client: httpx.AsyncClient, _request_context_manager) -> UserCenterSnapshot | None:
     """
-    访问个人中心页面，返回每日打卡按钮元素。
-    如果找到按钮，返回按钮元素；否则返回 None。
+    访问个人中心页面并解析为 UserCenterSnapshot。
+    请求或解析失败时返回 None。
     """
     user_page_url = f'https://{Moeshare_HOST}/u.php'
-    print(f"尝试访问个人中心页面: {user_page_url} 查找每日打卡按钮...")
+    print(f"正在访问个人中心页面: {user_page_url} 获取打卡按钮、MB 和活跃度...")
     try:
-        with _request_context_manager('GET', user_page_url) as response:
+        async with _request_context_manager('GET', user_page_url, step='user_center') as response:
             if response.status_code == 200:
-                soup = BeautifulSoup(response.text, 'html.parser')
-                punch_button = soup.find('button', type='button', string='每日打卡')
-
-                if punch_button:
-                    print("✅ 找到 '每日打卡' 按钮。")
-                    return punch_button
-                else:
-                    print("❌ 未找到 '每日打卡' 按钮。可能未登录或页面结构有变。")
-                    info_box = soup.find('div', class_='infoBox')
-                    if info_box:
-                        print(f"调试信息：在 infoBox 中未找到按钮。infoBox 内容前200字：\n{info_box.prettify()[:500]}...")
-                    return None
-            else:
-                print(f"❌ 访问个人中心页面失败，状态码: {response.status_code}")
-                return None
+                return _parse_user_center(response.content, response.charset_encoding)
+            print(f"❌ 访问个人中心页面失败，状态码: {response.status_code}")
     except httpx.RequestError as exc:
         print(f"❌ 访问个人中心页面时发生请求错误: {exc}")
         traceback.print_exc()
-        return None
     except Exception as e:
-        print(f"❌ 查找打卡按钮过程中发生未知错误: {e}")
+        print(f"❌ 解析个人中心页面过程中发生未知错误: {e}")
         traceback.print_exc()
-        return None
+    return None
+
+
+class UserCenter:
+    """
+    缓存最近一次的 UserCenterSnapshot，直到调用 invalidate()（每次 POST 之后）才重新请求 u.php。
+    """
 
+    def __init__(self, client: httpx.AsyncClient, _request_context_manager):
+        self._client = client
+        self._request_context_manager = _request_context_manager
+        self._snapshot: UserCenterSnapshot | None = None
 
-def _perform_daily_punch(client: httpx.Client, _request_context_manager) -> bool:
+    async def get(self) -> UserCenterSnapshot | None:
+        if self._snapshot is None:
+            self._snapshot = await _get_user_center_snapshot(self._client, self._request_context_manager)
+        return self._snapshot
+
+    def invalidate(self) -> None:
+        self._snapshot = None
+
+    async def mb_and_activity(self) -> tuple[int, int]:
+        """
+        返回 (mb_value, activity_value)，获取失败时返回 (0, 0)。
+        """
+        snapshot = await self.get()
+        if snapshot is None:
+            return 0, 0
+        return snapshot.mb, snapshot.activity
+
+
+async def _perform_daily_punch(client: httpx.AsyncClient, _request_context_manager, verify_param: str | None) -> bool:
     """
     模拟点击“每日打卡”按钮进行打卡。
+    verify_param 来自 UserCenterSnapshot.verifyhash。
     """
     user_page_url = f'https://{Moeshare_HOST}/u.php'
-    print(f"尝试执行每日打卡：首先访问个人中心页面获取动态参数...")
-    verify_param = None
-
-    try:
-        with _request_context_manager('GET', user_page_url) as response:
-            if response.status_code == 200:
-                soup = BeautifulSoup(response.text, 'html.parser')
-                script_tags = soup.find_all('script')
-                for script in script_tags:
-                    if script.string:
-                        verify_hash_match = re.search(r"var\s+verifyhash\s*=\s*'([a-f0-9]+)'", script.string)
-                        if verify_hash_match:
-                            verify_param = verify_hash_match.group(1)
-                            print(f"✅ 成功从页面中提取打卡参数：verify={verify_param}")
-                            break
-
-                if not verify_param:
-                    print("⚠️ 未能在个人中心页面找到打卡所需的动态参数 (verify)。将尝试不带这些参数的打卡请求。")
-            else:
-                print(
-                    f"❌ 访问个人中心页面获取打卡参数失败，状态码: {response.status_code}. 将尝试不带这些参数的打卡请求。")
-    except httpx.RequestError as exc:
-        print(f"❌ 获取打卡参数时发生请求错误: {exc}. 将尝试不带这些参数的打卡请求。")
-        traceback.print_exc()
-    except Exception as e:
-        print(f"❌ _perform_daily_punch 获取参数过程中发生未知错误: {e}. 将尝试不带这些参数的打卡请求。")
-        traceback.print_exc()
+    if not verify_param:
+        print("⚠️ 未能在个人中心页面找到打卡所需的动态参数 (verify)。将尝试不带这些参数的打卡请求。")
 
     punch_url = f'https://{Moeshare_HOST}/jobcenter.php?action=punch'
     if verify_param:
@@ -249,7 +220,7 @@ def _perform_daily_punch(client: httpx.Client, _request_context_manager) -> bool
 
     print(f"正在提交每日打卡请求到: {punch_url}，数据: {punch_data}")
     try:
-        with _request_context_manager('POST', punch_url, data=punch_data, headers={
+        async with _request_context_manager('POST', punch_url, step='punch', data=punch_data, headers={
             'Referer': user_page_url,
             'Content-Type': 'application/x-www-form-urlencoded',
         }) as response:
@@ -280,186 +251,250 @@ def _perform_daily_punch(client: httpx.Client, _request_context_manager) -> bool
         return False
 
 
-# 实际发送回帖请求的函数
-def _auto_reply(client: httpx.Client, _request_context_manager, fid: int, tid: int, content: str) -> bool:
+async def _fetch_reply_form(client: httpx.AsyncClient, _request_context_manager, tid: int) -> dict | None:
     """
-    访问帖子详情页获取必要的表单参数，然后提交回帖。
+    访问帖子详情页，提取回帖表单的全部隐藏字段。
+    失败时返回 None。可以在回帖间隔的等待期间提前调用（预取下一个帖子的表单）。
     """
-    print(f"--- 尝试回帖到 TID {tid}，内容: '{content}' ---")
-
-    # 1. 访问帖子详情页，获取回帖所需的动态参数
     post_url = f'https://{Moeshare_HOST}/read-htm-tid-{tid}.html'
     try:
-        with _request_context_manager('GET', post_url) as response:
+        async with _request_context_manager('GET', post_url, step='reply', cache_scope='private') as response:
             if response.status_code != 200:
                 print(f"❌ 访问帖子详情页失败，状态码: {response.status_code}")
-                return False
+                return None
 
-            soup = BeautifulSoup(response.text, 'html.parser')
+            # 查找回帖表单，提取所有隐藏的 input 字段
+            form_data = html_extract.reply_form(response.content, response.charset_encoding)
 
-            # 查找回帖表单
-            form_data = {}
-            reply_form = soup.find('form', {'action': re.compile(r'post.php')})
+            if form_data is None:
+                print(f"❌ 未在帖子 {tid} 中找到回帖表单。")
+            return form_data
 
-            if not reply_form:
-                print("❌ 未找到回帖表单。")
-                return False
+    except httpx.RequestError as exc:
+        print(f"❌ 访问帖子 {tid} 详情页时发生请求错误: {exc}")
+        traceback.print_exc()
+        return None
+    except Exception as e:
+        print(f"❌ _fetch_reply_form 函数执行中发生未知错误: {e}")
+        traceback.print_exc()
+        return None
 
-            # 提取所有隐藏的 input 字段
-            for hidden_input in reply_form.find_all('input', type='hidden'):
-                name = hidden_input.get('name')
-                value = hidden_input.get('value')
-                if name:
-                    form_data[name] = value
-
-            # 填充回帖内容
-            form_data['atc_content'] = content
-            form_data['step'] = '2'
-            form_data['action'] = 'reply'
-            form_data['fid'] = str(fid)
-            form_data['tid'] = str(tid)
-
-            # 2. 构造回帖的 POST URL
-            submit_url = f'https://{Moeshare_HOST}/post.php'
-
-            # 3. 发送 POST 请求提交回帖
-            print(f"正在提交回帖到: {submit_url}")
-            with _request_context_manager(
-                    'POST',
-                    submit_url,
-                    data=form_data,
-                    headers={
-                        'referer': post_url,
-                        'content-type': 'application/x-www-form-urlencoded',
-                    }
-            ) as post_response:
-                print(f"回帖提交状态码: {post_response.status_code}")
-
-                if post_response.status_code == 200:
-                    ajax_response_match = re.search(r'<ajax><!\[CDATA\[(.*?)\]\]></ajax>', post_response.text,
-                                                    re.DOTALL)
-                    if ajax_response_match:
-                        ajax_message = ajax_response_match.group(1).strip()
-                        if '发表成功' in ajax_message or '成功' in ajax_message or 'success' in ajax_message:
-                            print(f"✅ 成功回帖到帖子 {tid}！萌享社消息: {ajax_message}")
-                            return True
-                        elif 'tid-' in str(post_response.url):
-                            print(f"✅ 成功回帖到帖子 {tid}！页面重定向到帖子详情页。")
-                            return True
-                        else:
-                            print(f"❌ 回帖失败，萌享社返回消息: {ajax_message}")
-                            return False
+
+async def _submit_reply(client: httpx.AsyncClient, _request_context_manager, fid: int, tid: int, form_data: dict,
+                        content: str) -> tuple[bool, int | None]:
+    """
+    使用已提取的表单字段提交回帖。
+    返回 (是否成功, 响应中给出的活跃度增加值)，响应中没有活跃度信息时第二项为 None。
+    """
+    post_url = f'https://{Moeshare_HOST}/read-htm-tid-{tid}.html'
+
+    # 填充回帖内容
+    form_data = dict(form_data)
+    form_data['atc_content'] = content
+    form_data['step'] = '2'
+    form_data['action'] = 'reply'
+    form_data['fid'] = str(fid)
+    form_data['tid'] = str(tid)
+
+    submit_url = f'https://{Moeshare_HOST}/post.php'
+
+    print(f"正在提交回帖到: {submit_url}")
+    try:
+        async with _request_context_manager(
+                'POST',
+                submit_url,
+                step='reply',
+                data=form_data,
+                headers={
+                    'referer': post_url,
+                    'content-type': 'application/x-www-form-urlencoded',
+                }
+        ) as post_response:
+            print(f"回帖提交状态码: {post_response.status_code}")
+
+            if post_response.status_code == 200:
+                ajax_response_match = re.search(r'<ajax><!\[CDATA\[(.*?)\]\]></ajax>', post_response.text,
+                                                re.DOTALL)
+                if ajax_response_match:
+                    ajax_message = ajax_response_match.group(1).strip()
+                    gain_match = _ACTIVITY_GAIN_RE.search(ajax_message)
+                    activity_gain = int(gain_match.group(1)) if gain_match else None
+                    if '发表成功' in ajax_message or '成功' in ajax_message or 'success' in ajax_message:
+                        print(f"✅ 成功回帖到帖子 {tid}！萌享社消息: {ajax_message}")
+                        return True, activity_gain
+                    elif 'tid-' in str(post_response.url):
+                        print(f"✅ 成功回帖到帖子 {tid}！页面重定向到帖子详情页。")
+                        return True, activity_gain
                     else:
-                        if '发表成功' in post_response.text or '成功' in post_response.text or 'tid-' in str(
-                                post_response.url):
-                            print(f"✅ 成功回帖到帖子 {tid}！")
-                            return True
-                        else:
-                            print(f"❌ 回帖失败，响应内容：\n{post_response.text[:500]}...")
-                            error_msg = re.search(r'<div class="f_alert_d" id="J_q_message_tip">(.+?)</div>',
-                                                  post_response.text)
-                            if error_msg:
-                                print(f"错误提示: {error_msg.group(1).strip()}")
-                            return False
+                        print(f"❌ 回帖失败，萌享社返回消息: {ajax_message}")
+                        return False, None
                 else:
-                    print(f"❌ 回帖提交请求失败，HTTP 状态码: {post_response.status_code}")
-                    return False
+                    if '发表成功' in post_response.text or '成功' in post_response.text or 'tid-' in str(
+                            post_response.url):
+                        print(f"✅ 成功回帖到帖子 {tid}！")
+                        return True, None
+                    else:
+                        print(f"❌ 回帖失败，响应内容：\n{post_response.text[:500]}...")
+                        error_msg = re.search(r'<div class="f_alert_d" id="J_q_message_tip">(.+?)</div>',
+                                              post_response.text)
+                        if error_msg:
+                            print(f"错误提示: {error_msg.group(1).strip()}")
+                        return False, None
+            else:
+                print(f"❌ 回帖提交请求失败，HTTP 状态码: {post_response.status_code}")
+                return False, None
 
     except httpx.RequestError as exc:
         print(f"❌ 回帖请求过程中发生错误: {exc}")
         traceback.print_exc()
-        return False
+        return False, None
     except Exception as e:
-        print(f"❌ _auto_reply 函数执行中发生未知错误: {e}")
+        print(f"❌ _submit_reply 函数执行中发生未知错误: {e}")
         traceback.print_exc()
-        return False
+        return False, None
 
 
-def daysign(
+async def _crawl_candidate_pool(client: httpx.AsyncClient, _request_context_manager, fid: int, wanted: int,
+                                exclude: set[int] = frozenset(), max_pages: int = FORUM_MAX_PAGES) -> list[int]:
+    """
+    抓取版块页面，合并去重为候选帖子池，exclude 中的帖子（例如最近回复过的）不计入候选池。
+    第 1 页单独抓取，通常已经足够；仍不足 wanted 时才并发抓取后续页面（同一 HTTP/2 连接上多路复用），
+    每批 FORUM_CRAWL_BATCH 页，最多抓到第 max_pages 页。
+    """
+    pool = []
+    seen = set(exclude)
+    skipped = set()
+    page = 1
+    while page <= max_pages and len(pool) < wanted:
+        pages = range(page, min(page + (1 if page == 1 else FORUM_CRAWL_BATCH), max_pages + 1))
+        results = await asyncio.gather(*(
+            _get_tids_from_forum(client, _request_context_manager, fid, p) for p in pages
+        ))
+        for tids in results:
+            for tid in tids:
+                if tid in exclude:
+                    skipped.add(tid)
+                if tid not in seen:
+                    seen.add(tid)
+                    pool.append(tid)
+        page = pages.stop
+        if pages.start > 1 and not any(results):
+            break  # 这一批后续页面全部为空，后面的页面也不会再有帖子
+
+    if skipped:
+        print(f"已跳过 {len(skipped)} 个最近回复过的帖子。")
+    print(f"候选帖子池共 {len(pool)} 个帖子（抓取到第 {page - 1} 页）。")
+    return pool
+
+
+def _pop_random_tid(tids: list[int]) -> int:
+    """
+    随机取出一个帖子 ID 并从列表中移除，避免重复回复同一帖子。
+    """
+    tid = random.choice(tids)
+    tids.remove(tid)
+    return tid
+
+
+# 实际发送回帖请求的函数
+async def _auto_reply(client: httpx.AsyncClient, _request_context_manager, fid: int, tid: int, content: str,
+                      form_data: dict | None = None) -> tuple[bool, int | None]:
+    """
+    访问帖子详情页获取必要的表单参数，然后提交回帖。
+    如果传入了预取的 form_data，则跳过帖子详情页请求直接提交。
+    返回 (是否成功, 响应中给出的活跃度增加值或 None)。
+    """
+    print(f"--- 尝试回帖到 TID {tid}，内容: '{content}' ---")
+
+    with profiling.phase('reply'):
+        # 1. 访问帖子详情页，获取回帖所需的动态参数（已预取时跳过）
+        if form_data is None:
+            form_data = await _fetch_reply_form(client, _request_context_manager, tid)
+            if form_data is None:
+                return False, None
+        else:
+            print(f"使用预取的帖子 {tid} 回帖表单。")
+
+        # 2. 发送 POST 请求提交回帖
+        return await _submit_reply(client, _request_context_manager, fid, tid, form_data, content)
+
+
+async def daysign_async(
         cookies: dict,
+        pool: site_client.HostPool | None = None,
 ) -> bool:
-    # 直接使用 httpx.Client
-    with httpx.Client(cookies=cookies, http2=True) as client:
-
-        @contextmanager
-        def _request(method, url, *args, **kwargs):
-            extra_headers = kwargs.pop('headers', {})
-
-            final_headers = {
-                'user-agent': DEFAULT_USER_AGENT,
-                'x-requested-with': 'XMLHttpRequest',
-                'dnt': '1',
-                'accept': '*/*',
-                'sec-ch-ua-mobile': '?0',
-                'sec-ch-ua-platform': 'macOS',
-                'sec-fetch-site': 'same-origin',
-                'sec-fetch-mode': 'cors',
-                'sec-fetch-dest': 'empty',
-                'referer': f'https://{Moeshare_HOST}/',
-                'accept-language': 'en-US,en;q=0.9,zh-CN;q=0.8,zh;q=0.7',
-            }
-            final_headers.update(extra_headers)
-
-            response = client.request(method=method, url=url,
-                                      headers=final_headers,
-                                      timeout=30,  # 增加一个更长的默认超时时间
-                                      *args, **kwargs)
-            try:
-                response.raise_for_status()
-                yield response
-            finally:
-                response.close()
-
-        # 登录状态验证：尝试获取打卡按钮，如果失败（None），则视为未登录
-        punch_button_element = _get_punch_button_element(client, _request)
-        if punch_button_element is None:
+    account = account_key(cookies)
+
+    # 使用共享模块创建的 httpx.AsyncClient，多账号运行时复用 pool 中的连接
+    async with site_client.async_client(Moeshare_HOST, cookies, pool) as client:
+
+        # 版块列表按 'shared' 缓存，帖子页（含个人表单参数）按账号 'private' 缓存；
+        # 每次 POST 会改变个人中心状态，之后需要重新获取 u.php
+        _request = site_client.async_request_context(client, http_cache=default_cache(), account=account,
+                                                     on_write=lambda: user_center.invalidate(),
+                                                     label=_account_label.get() or account)
+
+        user_center = UserCenter(client, _request)
+
+        # 登录状态验证：尝试获取打卡按钮，如果失败，则视为未登录
+        snapshot = await user_center.get()
+        if snapshot is None or not snapshot.punch_button_found:
             error_msg = "❗ 登录状态验证失败：未找到 '每日打卡' 按钮。请确保你的 Cookie 有效，并从登录会话中准确提取。"
             print(error_msg)
-            push_notification("萌享社签到通知", f"登录失败！请检查 Cookie。\n{error_msg}")
+            _notify("萌享社签到通知", f"登录失败！请检查 Cookie。\n{error_msg}")
             print(f"\n--- 脚本执行结束 ---")
             return False  # 登录失败，直接退出
 
-        # 此时已经确认登录成功（因为找到了打卡按钮）
-        # 检查打卡按钮是否禁用 (即是否已经打卡)
-        is_punch_button_enabled = 'disabled' not in punch_button_element.attrs
-
-        current_mb, current_activity = _get_current_mb_and_activity(client, _request)  # 先获取当前状态
+        # 此时已经确认登录成功（因为找到了打卡按钮），同一份快照中已包含按钮状态、MB 和活跃度
+        current_mb, current_activity = snapshot.mb, snapshot.activity
 
-        if not is_punch_button_enabled:
+        if snapshot.punch_button_disabled:
             print("❌ '每日打卡' 按钮已禁用，今天可能已打卡或无法打卡。")
             status_msg = "❗ '每日打卡' 按钮已禁用。跳过活跃度任务。"
             print(status_msg)
-            push_notification("萌享社签到通知",
-                              f"每日打卡按钮已禁用。\n当前 MB: {current_mb}，活跃度: {current_activity}")
-            mb_final, activity_final = _get_current_mb_and_activity(client, _request)  # 再次获取最终状态，确保最新
+            _notify("萌享社签到通知",
+                    f"每日打卡按钮已禁用。\n当前 MB: {current_mb}，活跃度: {current_activity}")
+            # 期间没有任何 POST，快照仍然是最新状态，无需再次请求
             print(f"\n--- 脚本执行结束 ---")
-            print(f"最终 MB: {mb_final}，最终活跃度: {activity_final}")
+            print(f"最终 MB: {current_mb}，最终活跃度: {current_activity}")
             return True  # 视为成功完成流程，只是因为打卡按钮禁用而提前结束
 
+        gain_model = await asyncio.to_thread(ActivityGainModel, account)  # 读取状态数据库，不阻塞其它账号
+        polled_activity = current_activity  # 最近一次从 u.php 读到的活跃度
+        replies_since_poll = 0  # 自上次读取 u.php 以来成功回复的次数
+        poll_after = gain_model.poll_after(TARGET_ACTIVITY - polled_activity)  # 最迟在这么多次回复后读取 u.php
+
         # 只有在打卡按钮可用且活跃度未达标时才执行回复任务
         if current_activity < TARGET_ACTIVITY:
             print(f"\n--- 活跃度 {current_activity}/{TARGET_ACTIVITY} 未达标，开始执行回复任务以增加活跃度 ---")
-            available_tids = _get_tids_from_forum(client, _request, FID)
+            print(f"按历史数据每次回复约 +{gain_model.gain:.2f} 活跃度估算，"
+                  f"预计需要 {gain_model.replies_needed(TARGET_ACTIVITY - current_activity)} 次成功回复。")
+            # 跳过最近已经回复过的帖子，避免白白请求帖子页和重复回复
+            ledger = ReplyLedger(account)
+            available_tids = await _crawl_candidate_pool(client, _request, FID, MAX_REPLY_ATTEMPTS,
+                                                         exclude=await asyncio.to_thread(ledger.replied_tids))
             if not available_tids:
                 warning_msg = "❌ 未能获取到可回复的帖子列表。可能无法进行任何回复。"
                 print(warning_msg)
-                push_notification("萌享社签到通知", f"未能获取到帖子列表。\n{warning_msg}")
+                _notify("萌享社签到通知", f"未能获取到帖子列表。\n{warning_msg}")
 
             reply_attempts = 0
+            expected_activity = float(current_activity)  # 按模型推算的活跃度，current_activity 取其整数部分
+            next_tid = None  # 在上一次等待期间已选好的帖子
+            prefetched_form = None  # 在上一次等待期间为 next_tid 预取的回帖表单
             while current_activity < TARGET_ACTIVITY and reply_attempts < MAX_REPLY_ATTEMPTS:
                 print(
                     f"\n--- 活跃度 {current_activity}/{TARGET_ACTIVITY} - 正在进行第 {reply_attempts + 1} 次回帖尝试 ---")
 
-                if not available_tids:
-                    print("⚠️ 没有更多帖子可回复了，且活跃度未达标。请尝试刷新帖子列表或检查版块。")
-                    push_notification("萌享社签到通知", f"回帖失败：没有更多帖子可回复。当前活跃度: {current_activity}")
-                    break
+                if next_tid is None:
+                    if not available_tids:
+                        print("⚠️ 没有更多帖子可回复了，且活跃度未达标。请尝试刷新帖子列表或检查版块。")
+                        _notify("萌享社签到通知", f"回帖失败：没有更多帖子可回复。当前活跃度: {current_activity}")
+                        break
+                    next_tid = _pop_random_tid(available_tids)
 
-                target_tid = random.choice(available_tids)
-                try:
-                    available_tids.remove(target_tid)  # 避免重复回复同一帖子
-                except ValueError:
-                    pass
+                target_tid, next_tid = next_tid, None
+                form_data, prefetched_form = prefetched_form, None
 
                 reply_content = random.choice(list(AUTO_REPLIES_ORIGINAL))
                 # 注意：这里不需要从 AUTO_REPLIES_ORIGINAL 中移除，因为回复内容可以重复
@@ -468,31 +503,63 @@ def daysign(
                 print(f"回复内容: '{reply_content}'")
 
                 try:
-                    auto_reply_success = _auto_reply(client, _request, FID, target_tid, reply_content)
+                    auto_reply_success, activity_gain = await _auto_reply(client, _request, FID, target_tid,
+                                                                          reply_content, form_data=form_data)
                     reply_attempts += 1
 
                     if auto_reply_success:
-                        print(f"✅ 回复成功！等待更新活跃度...")
-                        time.sleep(5)  # 稍微等待，让服务器更新活跃度
-                        current_mb, current_activity = _get_current_mb_and_activity(client, _request)
-                        if current_activity >= TARGET_ACTIVITY:
-                            print(f"🎉 活跃度已达到目标 {TARGET_ACTIVITY}！")
-                            push_notification("萌享社签到通知",
-                                              f"活跃度已达标！当前 MB: {current_mb}，活跃度: {current_activity}")
-                            break
+                        await asyncio.to_thread(ledger.record, target_tid)
+                        replies_since_poll += 1
+                        if activity_gain is not None:
+                            expected_activity += activity_gain
+                            print(f"✅ 回复成功！萌享社返回活跃度 +{activity_gain}。")
+                        else:
+                            expected_activity += gain_model.gain
+                            print(f"✅ 回复成功！按历史数据估算当前活跃度约为 {expected_activity:.1f}。")
+                        current_activity = int(expected_activity)
+
+                        # 只有预计已达标，或按默认增长估算早该达标时才重新读取 u.php 确认，而不是每次回复后都读取
+                        if current_activity >= TARGET_ACTIVITY or replies_since_poll >= poll_after:
+                            if current_activity >= TARGET_ACTIVITY:
+                                print("预计活跃度已达标，等待更新后读取个人中心确认...")
+                            else:
+                                print(f"已成功回复 {replies_since_poll} 次，等待更新后读取个人中心校正活跃度...")
+                            await asyncio.sleep(ACTIVITY_SETTLE_SECONDS)  # 稍微等待，让服务器更新活跃度
+                            snapshot = await user_center.get()
+                            if snapshot is not None:
+                                current_mb, current_activity = snapshot.mb, snapshot.activity
+                                await asyncio.to_thread(gain_model.observe, current_activity - polled_activity,
+                                                        replies_since_poll)
+                                polled_activity, replies_since_poll = current_activity, 0
+                                poll_after = gain_model.poll_after(TARGET_ACTIVITY - polled_activity)
+                                expected_activity = float(current_activity)
+                            if current_activity >= TARGET_ACTIVITY:
+                                print(f"🎉 活跃度已达到目标 {TARGET_ACTIVITY}！")
+                                _notify("萌享社签到通知",
+                                        f"活跃度已达标！当前 MB: {current_mb}，活跃度: {current_activity}")
+                                break
+                            print(f"实际活跃度 {current_activity} 仍未达标，继续回复。")
                     else:
                         print(f"❌ 本次回帖失败。")
-                        push_notification("萌享社签到通知", f"第 {reply_attempts} 次回帖失败。")
+                        _notify("萌享社签到通知", f"第 {reply_attempts} 次回帖失败。")
 
                 except Exception as e:
                     print(f"❌ 回帖过程中发生错误: {e}")
                     traceback.print_exc()
-                    push_notification("萌享社签到通知", f"回帖过程中发生错误: {e}")
+                    _notify("萌享社签到通知", f"回帖过程中发生错误: {e}")
 
                 if current_activity < TARGET_ACTIVITY and reply_attempts < MAX_REPLY_ATTEMPTS:
-                    sleep_time = random.randint(40, 60)
+                    sleep_time = round(random.uniform(*REPLY_INTERVAL))
                     print(f"等待 {sleep_time} 秒后进行下一次回帖尝试...")
-                    time.sleep(sleep_time)
+                    if available_tids:
+                        # 等待期间预取下一个帖子的回帖表单，等待结束后即可直接提交
+                        next_tid = _pop_random_tid(available_tids)
+                        print(f"等待期间预取帖子 {next_tid} 的回帖表单。")
+                        prefetch = asyncio.create_task(_fetch_reply_form(client, _request, next_tid))
+                        await asyncio.sleep(sleep_time)
+                        prefetched_form = await prefetch
+                    else:
+                        await asyncio.sleep(sleep_time)
 
             print("--- 回帖循环结束 ---")
         else:
@@ -500,23 +567,42 @@ def daysign(
 
         # 无论是否进行回复任务，只要打卡按钮可用，最后都要执行每日打卡
         print("准备执行每日打卡。")
-        punch_success = _perform_daily_punch(client, _request)
+        # 回帖之后快照已失效，这里会重新获取一次以拿到最新的 verifyhash
+        if replies_since_poll:
+            # 这次读取到的活跃度还要用来校正模型，先等待服务器更新活跃度
+            await asyncio.sleep(ACTIVITY_SETTLE_SECONDS)
+        verify_snapshot = await user_center.get()
+        if verify_snapshot is not None and replies_since_poll:
+            # 顺便用这次读取到的活跃度校正每次回复的活跃度增长
+            await asyncio.to_thread(gain_model.observe, verify_snapshot.activity - polled_activity, replies_since_poll)
+        with profiling.phase('punch'):
+            punch_success = await _perform_daily_punch(client, _request,
+                                                       verify_snapshot.verifyhash if verify_snapshot else None)
         if punch_success:
-            push_notification("萌享社签到通知", f"每日打卡成功！")
+            _notify("萌享社签到通知", f"每日打卡成功！")
         else:
-            push_notification("萌享社签到通知", f"每日打卡失败。")
+            _notify("萌享社签到通知", f"每日打卡失败。")
 
         # --- 最终报告 MB 和活跃度 ---
-        mb_final, activity_final = _get_current_mb_and_activity(client, _request)
+        mb_final, activity_final = await user_center.mb_and_activity()
         final_message = f"最终 MB: {mb_final}，最终活跃度: {activity_final}"
         print(f"\n--- 脚本执行结束 ---")
         print(final_message)
-        push_notification("萌享社签到通知", f"脚本运行结束。\n{final_message}")  # 最终结果通知
+        _notify("萌享社签到通知", f"脚本运行结束。\n{final_message}")  # 最终结果通知
 
         return True
 
 
-def retrieve_cookies_from_fetch(env: str) -> dict:
+def daysign(
+        cookies: dict,
+) -> bool:
+    """
+    单账号同步入口，保持与旧版调用方式兼容。
+    """
+    return asyncio.run(daysign_async(cookies))
+
+
+def parse_cookies_from_fetch(fetch_command_string: str) -> dict:
     def parse_fetch(s: str) -> dict:
         ans = {}
         exec(s, {
@@ -528,10 +614,6 @@ def retrieve_cookies_from_fetch(env: str) -> dict:
         })
         return ans
 
-    fetch_command_string = os.getenv(env)
-    if not fetch_command_string:
-        raise ValueError(f"Environment variable '{env}' is not set.")
-
     parsed_data = parse_fetch(fetch_command_string)
     headers_data = parsed_data.get('headers')
     if not headers_data or 'cookie' not in headers_data:
@@ -541,39 +623,106 @@ def retrieve_cookies_from_fetch(env: str) -> dict:
     return dict(s.strip().split('=', maxsplit=1) for s in cookie_str.split(';'))
 
 
+def retrieve_cookies_from_fetch(env: str) -> dict:
+    fetch_command_string = os.getenv(env)
+    if not fetch_command_string:
+        raise ValueError(f"Environment variable '{env}' is not set.")
+
+    return parse_cookies_from_fetch(fetch_command_string)
+
+
+def load_accounts(env: str) -> list[tuple[str, str]]:
+    """
+    读取所有账号的 fetch 命令，返回 [(账号标签, fetch 字符串), ...]。
+    支持三种写法，可以混用：
+    - env 本身为单个 fetch 字符串；
+    - env 为 fetch 字符串组成的 JSON 列表；
+    - env_1, env_2, ... env_N 依次编号（遇到第一个未设置的编号停止）。
+    """
+    accounts = []
+
+    value = os.getenv(env)
+    if value:
+        if value.lstrip().startswith('['):
+            for index, fetch_command_string in enumerate(json.loads(value), start=1):
+                accounts.append((f"{env}[{index}]", fetch_command_string))
+        else:
+            accounts.append((env, value))
+
+    index = 1
+    while os.getenv(f"{env}_{index}"):
+        accounts.append((f"{env}_{index}", os.getenv(f"{env}_{index}")))
+        index += 1
+
+    return accounts
+
+
+async def _run_account(label: str, fetch_command_string: str, semaphore: asyncio.Semaphore,
+                       pool: site_client.HostPool) -> bool:
+    _account_label.set(label)
+    async with semaphore:
+        start = time.perf_counter()
+        success = False
+        try:
+            cookies = parse_cookies_from_fetch(fetch_command_string)
+            print("--- 成功从环境变量解析出 Cookie ---")
+            print("正在尝试执行签到和自动回帖流程...")
+            success = await daysign_async(cookies=cookies, pool=pool)
+        except Exception as e:
+            error_msg = f"ERROR: 处理 {label} 或执行 daysign 时发生错误: {e}"
+            print(error_msg)
+            traceback.print_exc()
+            _notify("萌享社签到通知", f"脚本运行异常：\n{error_msg}")
+        run_metrics.metrics.record_account(label, time.perf_counter() - start, success)
+        return success
+
+
+async def run_accounts(accounts: list[tuple[str, str]], concurrency: int = MAX_CONCURRENT_ACCOUNTS) -> dict[str, bool]:
+    """
+    并发执行多个账号的签到流程，最多同时运行 concurrency 个账号。
+    返回 {账号标签: 是否成功}。
+    """
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    pool = site_client.HostPool()
+    try:
+        results = await asyncio.gather(*(
+            _run_account(label, fetch_command_string, semaphore, pool) for label, fetch_command_string in accounts
+        ))
+    finally:
+        await pool.aclose()
+    return {label: result for (label, _), result in zip(accounts, results)}
+
+
+@profiling.profiled('moeshare')
 def main():
     print("--- 脚本启动 ---")
     env_name = 'MOESHARE_DAYSIGN'
-
-    cookies = {}
-    script_successful = False  # 用于标记脚本是否整体成功完成
+    run_metrics.metrics.start('moeshare')
 
     try:
-        if os.getenv(env_name):
-            try:
-                cookies = retrieve_cookies_from_fetch(env_name)
-                print("--- 成功从环境变量解析出 Cookie ---")
-                print("正在尝试执行签到和自动回帖流程...")
-                script_successful = daysign(cookies=cookies)
-
-            except Exception as e:
-                error_msg = f"ERROR: 在 main 函数中处理 {env_name} 环境变量或执行 daysign 时发生错误: {e}"
-                print(error_msg)
-                traceback.print_exc()
-                push_notification("萌享社签到通知", f"脚本运行异常：\n{error_msg}")
+        accounts = load_accounts(env_name)
+        if accounts:
+            print(f"共读取到 {len(accounts)} 个账号，最多同时运行 {MAX_CONCURRENT_ACCOUNTS} 个。")
+            results = asyncio.run(run_accounts(accounts))
+            succeeded = sum(1 for result in results.values() if result)
+            print(f"账号执行结果：成功 {succeeded}/{len(results)}")
+            for label, result in results.items():
+                print(f"  {label}: {'✅ 成功' if result else '❌ 失败'}")
         else:
             info_msg = f"INFO: 环境变量 '{env_name}' 未设置。请配置你的 fetch 命令。"
             print(info_msg)
-            push_notification("萌享社签到通知", f"脚本运行失败：\n{info_msg}")
+            _notify("萌享社签到通知", f"脚本运行失败：\n{info_msg}")
 
     except Exception as e:
         error_msg = f"ERROR: 脚本主函数发生未捕获的错误: {e}"
         print(error_msg)
         traceback.print_exc()
-        push_notification("萌享社签到通知", f"脚本运行异常：\n{error_msg}")
+        _notify("萌享社签到通知", f"脚本运行异常：\n{error_msg}")
 
+    site_client.flush_notifications()
+    run_metrics.finish()
     print("--- 脚本执行结束 ---")
 
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    main()
@@ -1,20 +1,25 @@
 #!/usr/bin/env python3
 # _*_ coding:utf-8 _*_
+import atexit
 import base64
+import functools
 import hashlib
 import hmac
 import json
 import os
+import random
 import re
+import sys
+import tempfile
 import threading
 import time
 import urllib.parse
-import smtplib
-from email.mime.text import MIMEText
-from email.header import Header
-from email.utils import formataddr
+from typing import TYPE_CHECKING
 
-import requests
+if TYPE_CHECKING:  # 只用于类型标注，运行时仍在首次使用时导入
+    import httpx
+
+# asyncio、httpx、smtplib、email 等依赖在首次使用时才导入，减少脚本启动时间
 
 # 原先的 print 函数和主线程的锁
 _print = print
@@ -34,6 +39,9 @@ def print(text, *args, **kw):
 # fmt: off
 push_config = {
     'HITOKOTO': True,                  # 启用一言（随机句子）
+    'HITOKOTO_TIMEOUT': 2,              # 获取一言的最长等待时间（秒），超时使用本地缓存的一言
+    'HITOKOTO_CACHE': os.path.join(tempfile.gettempdir(), 'hitokoto_cache.json'),  # 一言本地缓存文件，为空时只缓存在内存中
+    'HITOKOTO_CACHE_SIZE': 50,          # 本地最多缓存的一言条数
 
     'BARK_PUSH': '',                    # bark IP 或设备码，例：https://api.day.app/DxHcxxxxxRxxxxxxcm/
     'BARK_ARCHIVE': '',                 # bark 推送是否存档
@@ -45,6 +53,15 @@ push_config = {
 
     'CONSOLE': False,                    # 控制台输出
 
+    'PUSH_TIMEOUT': 15,                 # 单个渠道的推送超时时间（秒）
+    'PUSH_CHANNEL_TIMEOUTS': '',        # 单独设置部分渠道的超时时间，例：smtp=30,telegram_bot=10
+    'PUSH_DEADLINE': 60,                # 一次 send 所有渠道的总时限（秒），超时未完成的渠道直接放弃
+    'PUSH_OUTBOX': os.path.join(tempfile.gettempdir(), 'notify_outbox.sqlite3'),  # 推送状态文件（失败重试队列、去重、限流），多个进程共用；为空时不重试、不去重、不限流
+    'PUSH_OUTBOX_MAX': 200,             # 待重试消息的最大条数，超出时丢弃最早的
+    'PUSH_OUTBOX_ATTEMPTS': 8,          # 每条消息最多重试的次数
+    'PUSH_DEDUPE_WINDOW': 300,          # 相同标题和内容的消息在该秒数内只推送一次，重复的合并为一行摘要；0 为不去重
+    'PUSH_RATE_LIMITS': 'telegram_bot=20/60,serverJ=5/60,pushplus_bot=10/60',  # 渠道限流，格式：渠道=次数/秒数，超出的消息稍后重试
+
     'DD_BOT_SECRET': '',                # 钉钉机器人的 DD_BOT_SECRET
     'DD_BOT_TOKEN': '',                 # 钉钉机器人的 DD_BOT_TOKEN
 
@@ -90,6 +107,7 @@ push_config = {
     'QYWX_ORIGIN': '',                  # 企业微信代理地址
 
     'QYWX_AM': '',                      # 企业微信应用
+    'QYWX_TOKEN_CACHE': '',             # 企业微信 access_token 缓存文件路径，设置后多个进程共用；为空时只缓存在内存中
 
     'QYWX_KEY': '',                     # 企业微信机器人
 
@@ -109,6 +127,7 @@ push_config = {
     'SMTP_EMAIL': '',                   # SMTP 收发件邮箱，通知将会由自己发给自己
     'SMTP_PASSWORD': '',                # SMTP 登录密码，也可能为特殊口令，视具体邮件服务商说明而定
     'SMTP_NAME': '',                    # SMTP 收发件人姓名，可随意填写
+    'SMTP_NOOP_AFTER': 30,              # SMTP 会话空闲超过该秒数后，复用前先发送 NOOP 检查连接是否可用
 
     'PUSHME_KEY': '',                   # PushMe 的 PUSHME_KEY
     'PUSHME_URL': '',                   # PushMe 的 PUSHME_URL
@@ -122,6 +141,7 @@ push_config = {
     'WEBHOOK_HEADERS': '',              # 自定义通知 请求头
     'WEBHOOK_METHOD': '',               # 自定义通知 请求方法
     'WEBHOOK_CONTENT_TYPE': '',         # 自定义通知 content-type
+    'WEBHOOK_BATCH': '',                # 自定义通知 批量推送（send_many）时以 JSON 数组一次发送，需要 content-type 为 application/json，填写 true 或 false
 
     'NTFY_URL': '',                     # ntfy地址,如https://ntfy.sh
     'NTFY_TOPIC': '',                   # ntfy的消息应用topic
@@ -143,7 +163,74 @@ for k in push_config:
         push_config[k] = v
 
 
-def bark(title: str, content: str) -> None:
+# --- 推送使用的事件循环和 HTTP 客户端 ---
+# 所有渠道协程都在一个常驻守护线程的事件循环中运行，共用同一组 httpx.AsyncClient，
+# 多次 send() 之间复用连接；超时被放弃的请求不会阻止进程退出。
+_loop = None
+_loop_lock = threading.Lock()
+_clients = {}  # 代理地址 -> httpx.AsyncClient，只在推送事件循环中访问
+
+
+def _notify_loop():
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            import asyncio
+
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="notify-loop", daemon=True).start()
+        return _loop
+
+
+def _submit(coro):
+    """
+    把协程交给推送事件循环运行，返回 concurrent.futures.Future。
+    """
+    import asyncio
+
+    return asyncio.run_coroutine_threadsafe(coro, _notify_loop())
+
+
+def http(proxy: str | None = None) -> "httpx.AsyncClient":
+    """
+    所有渠道共用的异步 HTTP 客户端（使用代理的渠道按代理地址单独一个），只能在推送事件循环中使用。
+    未指定 timeout 的请求使用 PUSH_TIMEOUT，避免某个渠道无限期挂起。
+    """
+    if proxy not in _clients:
+        import httpx
+
+        class _Client(httpx.AsyncClient):
+            async def request(self, method, url, **kwargs):
+                if kwargs.get("timeout", httpx.USE_CLIENT_DEFAULT) is httpx.USE_CLIENT_DEFAULT:
+                    kwargs["timeout"] = float(push_config.get("PUSH_TIMEOUT") or 15)
+                return await super().request(method, url, **kwargs)
+
+        _clients[proxy] = _Client(proxy=proxy, limits=httpx.Limits(max_connections=16))
+    return _clients[proxy]
+
+
+def _channel(coroutine):
+    """
+    把协程实现的渠道包装为同名的同步函数，原有的直接调用方式（如 notify.bark(title, content)）继续可用：
+    同步调用时在推送事件循环中运行，最多等待该渠道的超时时间。
+    调度器通过 .coroutine 属性直接在事件循环中等待协程版本，不占用线程。
+    """
+
+    @functools.wraps(coroutine)
+    def run(*args):
+        future = _submit(coroutine(*args))
+        try:
+            return future.result(timeout=_channel_timeout(coroutine.__name__))
+        except BaseException:
+            future.cancel()
+            raise
+
+    run.coroutine = coroutine
+    return run
+
+
+@_channel
+async def bark(title: str, content: str) -> bool | None:
     """
     使用 bark 推送消息。
     """
@@ -177,24 +264,27 @@ def bark(title: str, content: str) -> None:
     ):
         data[bark_params.get(pair[0])] = pair[1]
     headers = {"Content-Type": "application/json;charset=utf-8"}
-    response = requests.post(
-        url=url, data=json.dumps(data), headers=headers, timeout=15
-    ).json()
+    response = (await http().post(
+        url=url, content=json.dumps(data), headers=headers, timeout=15
+    )).json()
 
     if response["code"] == 200:
         print("bark 推送成功！")
     else:
         print("bark 推送失败！")
+        return False
 
 
-def console(title: str, content: str) -> None:
+@_channel
+async def console(title: str, content: str) -> bool | None:
     """
     使用 控制台 推送消息。
     """
     print(f"{title}\n\n{content}")
 
 
-def dingding_bot(title: str, content: str) -> None:
+@_channel
+async def dingding_bot(title: str, content: str) -> bool | None:
     """
     使用 钉钉机器人 推送消息。
     """
@@ -213,17 +303,19 @@ def dingding_bot(title: str, content: str) -> None:
     url = f'https://oapi.dingtalk.com/robot/send?access_token={push_config.get("DD_BOT_TOKEN")}&timestamp={timestamp}&sign={sign}'
     headers = {"Content-Type": "application/json;charset=utf-8"}
     data = {"msgtype": "text", "text": {"content": f"{title}\n\n{content}"}}
-    response = requests.post(
-        url=url, data=json.dumps(data), headers=headers, timeout=15
-    ).json()
+    response = (await http().post(
+        url=url, content=json.dumps(data), headers=headers, timeout=15
+    )).json()
 
     if not response["errcode"]:
         print("钉钉机器人 推送成功！")
     else:
         print("钉钉机器人 推送失败！")
+        return False
 
 
-def feishu_bot(title: str, content: str) -> None:
+@_channel
+async def feishu_bot(title: str, content: str) -> bool | None:
     """
     使用 飞书机器人 推送消息。
     """
@@ -233,15 +325,17 @@ def feishu_bot(title: str, content: str) -> None:
 
     url = f'https://open.feishu.cn/open-apis/bot/v2/hook/{push_config.get("FSKEY")}'
     data = {"msg_type": "text", "content": {"text": f"{title}\n\n{content}"}}
-    response = requests.post(url, data=json.dumps(data)).json()
+    response = (await http().post(url, content=json.dumps(data))).json()
 
     if response.get("StatusCode") == 0 or response.get("code") == 0:
         print("飞书 推送成功！")
     else:
         print("飞书 推送失败！错误信息如下：\n", response)
+        return False
 
 
-def go_cqhttp(title: str, content: str) -> None:
+@_channel
+async def go_cqhttp(title: str, content: str) -> bool | None:
     """
     使用 go_cqhttp 推送消息。
     """
@@ -249,16 +343,19 @@ def go_cqhttp(title: str, content: str) -> None:
         return
     print("go-cqhttp 服务启动")
 
-    url = f'{push_config.get("GOBOT_URL")}?access_token={push_config.get("GOBOT_TOKEN")}&{push_config.get("GOBOT_QQ")}&message=标题:{title}\n内容:{content}'
-    response = requests.get(url).json()
+    url = f'{push_config.get("GOBOT_URL")}?access_token={push_config.get("GOBOT_TOKEN")}&{push_config.get("GOBOT_QQ")}'
+    # 消息中的换行和中文要经过编码才能放进查询字符串，httpx 不会像 requests 那样自动编码
+    response = (await http().get(url, params={"message": f"标题:{title}\n内容:{content}"})).json()
 
     if response["status"] == "ok":
         print("go-cqhttp 推送成功！")
     else:
         print("go-cqhttp 推送失败！")
+        return False
 
 
-def gotify(title: str, content: str) -> None:
+@_channel
+async def gotify(title: str, content: str) -> bool | None:
     """
     使用 gotify 推送消息。
     """
@@ -272,15 +369,17 @@ def gotify(title: str, content: str) -> None:
         "message": content,
         "priority": push_config.get("GOTIFY_PRIORITY"),
     }
-    response = requests.post(url, data=data).json()
+    response = (await http().post(url, data=data)).json()
 
     if response.get("id"):
         print("gotify 推送成功！")
     else:
         print("gotify 推送失败！")
+        return False
 
 
-def iGot(title: str, content: str) -> None:
+@_channel
+async def iGot(title: str, content: str) -> bool | None:
     """
     使用 iGot 推送消息。
     """
@@ -291,15 +390,17 @@ def iGot(title: str, content: str) -> None:
     url = f'https://push.hellyw.com/{push_config.get("IGOT_PUSH_KEY")}'
     data = {"title": title, "content": content}
     headers = {"Content-Type": "application/x-www-form-urlencoded"}
-    response = requests.post(url, data=data, headers=headers).json()
+    response = (await http().post(url, data=data, headers=headers)).json()
 
     if response["ret"] == 0:
         print("iGot 推送成功！")
     else:
         print(f'iGot 推送失败！{response["errMsg"]}')
+        return False
 
 
-def serverJ(title: str, content: str) -> None:
+@_channel
+async def serverJ(title: str, content: str) -> bool | None:
     """
     通过 serverJ 推送消息。
     """
@@ -316,15 +417,17 @@ def serverJ(title: str, content: str) -> None:
     else:
         url = f'https://sctapi.ftqq.com/{push_config.get("PUSH_KEY")}.send'
 
-    response = requests.post(url, data=data).json()
+    response = (await http().post(url, data=data)).json()
 
     if response.get("errno") == 0 or response.get("code") == 0:
         print("serverJ 推送成功！")
     else:
         print(f'serverJ 推送失败！错误码：{response["message"]}')
+        return False
 
 
-def pushdeer(title: str, content: str) -> None:
+@_channel
+async def pushdeer(title: str, content: str) -> bool | None:
     """
     通过PushDeer 推送消息
     """
@@ -341,15 +444,17 @@ def pushdeer(title: str, content: str) -> None:
     if push_config.get("DEER_URL"):
         url = push_config.get("DEER_URL")
 
-    response = requests.post(url, data=data).json()
+    response = (await http().post(url, data=data)).json()
 
     if len(response.get("content").get("result")) > 0:
         print("PushDeer 推送成功！")
     else:
         print("PushDeer 推送失败！错误信息：", response)
+        return False
 
 
-def chat(title: str, content: str) -> None:
+@_channel
+async def chat(title: str, content: str) -> bool | None:
     """
     通过Chat 推送消息
     """
@@ -358,15 +463,17 @@ def chat(title: str, content: str) -> None:
     print("chat 服务启动")
     data = "payload=" + json.dumps({"text": title + "\n" + content})
     url = push_config.get("CHAT_URL") + push_config.get("CHAT_TOKEN")
-    response = requests.post(url, data=data)
+    response = await http().post(url, content=data)
 
     if response.status_code == 200:
         print("Chat 推送成功！")
     else:
         print("Chat 推送失败！错误信息：", response)
+        return False
 
 
-def pushplus_bot(title: str, content: str) -> None:
+@_channel
+async def pushplus_bot(title: str, content: str) -> bool | None:
     """
     通过 pushplus 推送消息。
     """
@@ -388,7 +495,7 @@ def pushplus_bot(title: str, content: str) -> None:
     }
     body = json.dumps(data).encode(encoding="utf-8")
     headers = {"Content-Type": "application/json"}
-    response = requests.post(url=url, data=body, headers=headers).json()
+    response = (await http().post(url=url, content=body, headers=headers)).json()
 
     code = response["code"]
     if code == 200:
@@ -398,20 +505,23 @@ def pushplus_bot(title: str, content: str) -> None:
         )
     elif code == 900 or code == 903 or code == 905 or code == 999:
         print(response["msg"])
+        return False
 
     else:
         url_old = "http://pushplus.hxtrip.com/send"
         headers["Accept"] = "application/json"
-        response = requests.post(url=url_old, data=body, headers=headers).json()
+        response = (await http().post(url=url_old, content=body, headers=headers)).json()
 
         if response["code"] == 200:
             print("PUSHPLUS(hxtrip) 推送成功！")
 
         else:
             print("PUSHPLUS 推送失败！")
+            return False
 
 
-def weplus_bot(title: str, content: str) -> None:
+@_channel
+async def weplus_bot(title: str, content: str) -> bool | None:
     """
     通过 微加机器人 推送消息。
     """
@@ -434,15 +544,17 @@ def weplus_bot(title: str, content: str) -> None:
     }
     body = json.dumps(data).encode(encoding="utf-8")
     headers = {"Content-Type": "application/json"}
-    response = requests.post(url=url, data=body, headers=headers).json()
+    response = (await http().post(url=url, content=body, headers=headers)).json()
 
     if response["code"] == 200:
         print("微加机器人 推送成功！")
     else:
         print("微加机器人 推送失败！")
+        return False
 
 
-def qmsg_bot(title: str, content: str) -> None:
+@_channel
+async def qmsg_bot(title: str, content: str) -> bool | None:
     """
     使用 qmsg 推送消息。
     """
@@ -451,16 +563,18 @@ def qmsg_bot(title: str, content: str) -> None:
     print("qmsg 服务启动")
 
     url = f'https://qmsg.zendee.cn/{push_config.get("QMSG_TYPE")}/{push_config.get("QMSG_KEY")}'
-    payload = {"msg": f'{title}\n\n{content.replace("----", "-")}'.encode("utf-8")}
-    response = requests.post(url=url, params=payload).json()
+    payload = {"msg": f'{title}\n\n{content.replace("----", "-")}'}
+    response = (await http().post(url=url, params=payload)).json()
 
     if response["code"] == 0:
         print("qmsg 推送成功！")
     else:
         print(f'qmsg 推送失败！{response["reason"]}')
+        return False
 
 
-def wecom_app(title: str, content: str) -> None:
+@_channel
+async def wecom_app(title: str, content: str) -> bool | None:
     """
     通过 企业微信 APP 推送消息。
     """
@@ -469,7 +583,7 @@ def wecom_app(title: str, content: str) -> None:
     QYWX_AM_AY = re.split(",", push_config.get("QYWX_AM"))
     if 4 < len(QYWX_AM_AY) > 5:
         print("QYWX_AM 设置错误!!")
-        return
+        return False
     print("企业微信 APP 服务启动")
 
     corpid = QYWX_AM_AY[0]
@@ -484,14 +598,40 @@ def wecom_app(title: str, content: str) -> None:
     # 如果没有配置 media_id 默认就以 text 方式发送
     if not media_id:
         message = title + "\n\n" + content
-        response = wx.send_text(message, touser)
+        response = await wx.send_text(message, touser)
     else:
-        response = wx.send_mpnews(title, content, media_id, touser)
+        response = await wx.send_mpnews(title, content, media_id, touser)
 
     if response == "ok":
         print("企业微信推送成功！")
     else:
         print("企业微信推送失败！错误信息如下：\n", response)
+        return False
+
+
+# 企业微信 access_token 缓存：{键: (access_token, 过期时间戳)}
+_wecom_tokens = {}
+_wecom_tokens_lock = None  # asyncio.Lock，在推送事件循环中首次使用时创建
+WECOM_TOKEN_MARGIN = 300  # 提前 300 秒视为过期，避免发送时 token 恰好失效
+WECOM_TOKEN_INVALID = (40001, 40014, 42001)  # access_token 无效或已过期的错误码
+
+
+def _wecom_token_file_load(path: str) -> dict:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return {k: tuple(v) for k, v in json.load(f).items()}
+    except (OSError, ValueError):
+        return {}
+
+
+def _wecom_token_file_save(path: str, tokens: dict) -> None:
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(tokens, f)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        print(f"企业微信 access_token 缓存写入失败：{e}")
 
 
 class WeCom:
@@ -503,20 +643,59 @@ class WeCom:
         if push_config.get("QYWX_ORIGIN"):
             self.ORIGIN = push_config.get("QYWX_ORIGIN")
 
-    def get_access_token(self):
-        url = f"{self.ORIGIN}/cgi-bin/gettoken"
-        values = {
-            "corpid": self.CORPID,
-            "corpsecret": self.CORPSECRET,
-        }
-        req = requests.post(url, params=values)
-        data = json.loads(req.text)
-        return data["access_token"]
+    def _token_key(self):
+        # 缓存文件中不保存 secret 原文
+        raw = f"{self.ORIGIN}|{self.CORPID}|{self.CORPSECRET}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    async def get_access_token(self, refresh=False):
+        """
+        获取 access_token，按 expires_in 缓存在内存中（设置 QYWX_TOKEN_CACHE 时同时缓存到文件）。
+        """
+        import asyncio
+
+        global _wecom_tokens_lock
+        if _wecom_tokens_lock is None:
+            _wecom_tokens_lock = asyncio.Lock()
+        key = self._token_key()
+        path = push_config.get("QYWX_TOKEN_CACHE")
+        async with _wecom_tokens_lock:
+            if not refresh:
+                cached = _wecom_tokens.get(key)
+                if not cached and path:
+                    cached = _wecom_token_file_load(path).get(key)
+                if cached and cached[1] > time.time():
+                    _wecom_tokens[key] = cached
+                    return cached[0]
+
+            url = f"{self.ORIGIN}/cgi-bin/gettoken"
+            values = {
+                "corpid": self.CORPID,
+                "corpsecret": self.CORPSECRET,
+            }
+            req = await http().post(url, params=values)
+            data = json.loads(req.text)
+            token = data["access_token"]
+            expires_at = time.time() + int(data.get("expires_in", 7200)) - WECOM_TOKEN_MARGIN
+            _wecom_tokens[key] = (token, expires_at)
+            if path:
+                tokens = {k: v for k, v in _wecom_token_file_load(path).items() if v[1] > time.time()}
+                tokens[key] = (token, expires_at)
+                _wecom_token_file_save(path, tokens)
+            return token
+
+    async def _send(self, send_values):
+        send_msges = bytes(json.dumps(send_values), "utf-8")
+        respone = None
+        for refresh in (False, True):
+            send_url = f"{self.ORIGIN}/cgi-bin/message/send?access_token={await self.get_access_token(refresh)}"
+            respone = (await http().post(send_url, content=send_msges)).json()
+            # 缓存的 token 被提前作废时刷新后重试一次
+            if respone.get("errcode") not in WECOM_TOKEN_INVALID:
+                break
+        return respone["errmsg"]
 
-    def send_text(self, message, touser="@all"):
-        send_url = (
-            f"{self.ORIGIN}/cgi-bin/message/send?access_token={self.get_access_token()}"
-        )
+    async def send_text(self, message, touser="@all"):
         send_values = {
             "touser": touser,
             "msgtype": "text",
@@ -524,15 +703,9 @@ class WeCom:
             "text": {"content": message},
             "safe": "0",
         }
-        send_msges = bytes(json.dumps(send_values), "utf-8")
-        respone = requests.post(send_url, send_msges)
-        respone = respone.json()
-        return respone["errmsg"]
+        return await self._send(send_values)
 
-    def send_mpnews(self, title, message, media_id, touser="@all"):
-        send_url = (
-            f"{self.ORIGIN}/cgi-bin/message/send?access_token={self.get_access_token()}"
-        )
+    async def send_mpnews(self, title, message, media_id, touser="@all"):
         send_values = {
             "touser": touser,
             "msgtype": "mpnews",
@@ -550,13 +723,11 @@ class WeCom:
                 ]
             },
         }
-        send_msges = bytes(json.dumps(send_values), "utf-8")
-        respone = requests.post(send_url, send_msges)
-        respone = respone.json()
-        return respone["errmsg"]
+        return await self._send(send_values)
 
 
-def wecom_bot(title: str, content: str) -> None:
+@_channel
+async def wecom_bot(title: str, content: str) -> bool | None:
     """
     通过 企业微信机器人 推送消息。
     """
@@ -571,17 +742,19 @@ def wecom_bot(title: str, content: str) -> None:
     url = f"{origin}/cgi-bin/webhook/send?key={push_config.get('QYWX_KEY')}"
     headers = {"Content-Type": "application/json;charset=utf-8"}
     data = {"msgtype": "text", "text": {"content": f"{title}\n\n{content}"}}
-    response = requests.post(
-        url=url, data=json.dumps(data), headers=headers, timeout=15
-    ).json()
+    response = (await http().post(
+        url=url, content=json.dumps(data), headers=headers, timeout=15
+    )).json()
 
     if response["errcode"] == 0:
         print("企业微信机器人推送成功！")
     else:
         print("企业微信机器人推送失败！")
+        return False
 
 
-def telegram_bot(title: str, content: str) -> None:
+@_channel
+async def telegram_bot(title: str, content: str) -> bool | None:
     """
     使用 telegram 机器人 推送消息。
     """
@@ -601,7 +774,7 @@ def telegram_bot(title: str, content: str) -> None:
         "text": f"{title}\n\n{content}",
         "disable_web_page_preview": "true",
     }
-    proxies = None
+    proxy = None
     if push_config.get("TG_PROXY_HOST") and push_config.get("TG_PROXY_PORT"):
         if push_config.get("TG_PROXY_AUTH") is not None and "@" not in push_config.get(
             "TG_PROXY_HOST"
@@ -611,21 +784,22 @@ def telegram_bot(title: str, content: str) -> None:
                 + "@"
                 + push_config.get("TG_PROXY_HOST")
             )
-        proxyStr = "http://{}:{}".format(
+        proxy = "http://{}:{}".format(
             push_config.get("TG_PROXY_HOST"), push_config.get("TG_PROXY_PORT")
         )
-        proxies = {"http": proxyStr, "https": proxyStr}
-    response = requests.post(
-        url=url, headers=headers, params=payload, proxies=proxies
-    ).json()
+    response = (await http(proxy).post(
+        url=url, headers=headers, params=payload
+    )).json()
 
     if response["ok"]:
         print("tg 推送成功！")
     else:
         print("tg 推送失败！")
+        return False
 
 
-def aibotk(title: str, content: str) -> None:
+@_channel
+async def aibotk(title: str, content: str) -> bool | None:
     """
     使用 智能微秘书 推送消息。
     """
@@ -653,27 +827,124 @@ def aibotk(title: str, content: str) -> None:
         }
     body = json.dumps(data).encode(encoding="utf-8")
     headers = {"Content-Type": "application/json"}
-    response = requests.post(url=url, data=body, headers=headers).json()
+    response = (await http().post(url=url, content=body, headers=headers)).json()
     print(response)
     if response["code"] == 0:
         print("智能微秘书 推送成功！")
     else:
         print(f'智能微秘书 推送失败！{response["error"]}')
+        return False
 
 
-def smtp(title: str, content: str) -> None:
+class SMTPSession:
     """
-    使用 SMTP 邮件 推送消息。
+    进程内复用的 SMTP 会话：登录一次后保持连接，多条邮件共用同一个会话。
+    空闲一段时间后复用前先发送 NOOP 检查；复用的连接已被服务器关闭时重连并重试一次。
     """
-    if (
-        not push_config.get("SMTP_SERVER")
-        or not push_config.get("SMTP_SSL")
-        or not push_config.get("SMTP_EMAIL")
-        or not push_config.get("SMTP_PASSWORD")
-        or not push_config.get("SMTP_NAME")
-    ):
-        return
-    print("SMTP 邮件 服务启动")
+
+    def __init__(self, server: str, use_ssl: bool, email: str, password: str):
+        self.server = server
+        self.use_ssl = use_ssl
+        self.email = email
+        self.password = password
+        self.lock = threading.Lock()
+        self._conn = None
+        self._last_used = 0.0
+
+    def _connect(self):
+        import smtplib
+
+        # 没有超时时，只建立 TCP 连接却不发送问候语的服务器会让连接永远阻塞
+        timeout = _channel_timeout("smtp")
+        conn = (smtplib.SMTP_SSL(self.server, timeout=timeout) if self.use_ssl
+                else smtplib.SMTP(self.server, timeout=timeout))
+        try:
+            conn.login(self.email, self.password)
+        except Exception:
+            conn.close()
+            raise
+        return conn
+
+    def _ensure(self):
+        if self._conn is not None and time.time() - self._last_used >= float(
+            push_config.get("SMTP_NOOP_AFTER") or 0
+        ):
+            try:
+                if self._conn.noop()[0] != 250:
+                    raise OSError("NOOP 检查失败")
+            except Exception:
+                self.close()
+        if self._conn is None:
+            self._conn = self._connect()
+        return self._conn
+
+    def sendmail(self, to_addr: str, message: bytes) -> None:
+        import smtplib
+
+        with self.lock:
+            cached = self._conn
+            conn = self._ensure()  # 连接或登录失败直接抛出，不再重连
+            try:
+                conn.sendmail(self.email, to_addr, message)
+            except smtplib.SMTPServerDisconnected:
+                self.close()
+                if conn is not cached:  # 刚建立的连接也断开，重试没有意义
+                    raise
+                # 复用的连接在检查后被服务器关闭，邮件还没有发出，重连后重试一次
+                self._ensure().sendmail(self.email, to_addr, message)
+            except smtplib.SMTPException:
+                raise  # 服务器拒绝了这封邮件，连接仍然可用
+            except OSError:
+                # 发送过程中网络出错，不知道服务器是否已收下邮件，不重试以免重复发送
+                self.close()
+                raise
+            self._last_used = time.time()
+
+    def close(self) -> None:
+        if self._conn is None:
+            return
+        try:
+            self._conn.quit()
+        except Exception:
+            self._conn.close()
+        self._conn = None
+
+
+_smtp_sessions = {}
+_smtp_sessions_lock = threading.Lock()
+
+
+def _smtp_session() -> SMTPSession:
+    key = (
+        push_config.get("SMTP_SERVER"),
+        push_config.get("SMTP_SSL") == "true",
+        push_config.get("SMTP_EMAIL"),
+        push_config.get("SMTP_PASSWORD"),
+    )
+    with _smtp_sessions_lock:
+        if key not in _smtp_sessions:
+            _smtp_sessions[key] = SMTPSession(*key)
+        return _smtp_sessions[key]
+
+
+@atexit.register
+def _close_smtp_sessions() -> None:
+    with _smtp_sessions_lock:
+        for session in _smtp_sessions.values():
+            # 会话仍被超时放弃的推送线程占用时不发送 QUIT，直接退出，避免进程在退出时卡住
+            if not session.lock.acquire(timeout=1):
+                continue
+            try:
+                session.close()
+            finally:
+                session.lock.release()
+        _smtp_sessions.clear()
+
+
+def _smtp_message(title: str, content: str) -> bytes:
+    from email.mime.text import MIMEText
+    from email.header import Header
+    from email.utils import formataddr
 
     message = MIMEText(content, "plain", "utf-8")
     message["From"] = formataddr(
@@ -689,28 +960,57 @@ def smtp(title: str, content: str) -> None:
         )
     )
     message["Subject"] = Header(title, "utf-8")
+    return message.as_bytes()
 
-    try:
-        smtp_server = (
-            smtplib.SMTP_SSL(push_config.get("SMTP_SERVER"))
-            if push_config.get("SMTP_SSL") == "true"
-            else smtplib.SMTP(push_config.get("SMTP_SERVER"))
-        )
-        smtp_server.login(
-            push_config.get("SMTP_EMAIL"), push_config.get("SMTP_PASSWORD")
-        )
-        smtp_server.sendmail(
-            push_config.get("SMTP_EMAIL"),
-            push_config.get("SMTP_EMAIL"),
-            message.as_bytes(),
-        )
-        smtp_server.close()
+
+def smtp_batch(messages, pending: list | None = None) -> int:
+    """
+    通过同一个 SMTP 会话依次发送多封邮件，messages 为 [(title, content), ...]。
+    返回发送成功的数量；传入 pending 时每发送成功一封就从中移除该消息，其余即为未确认送达的消息。
+    """
+    if (
+        not push_config.get("SMTP_SERVER")
+        or not push_config.get("SMTP_SSL")
+        or not push_config.get("SMTP_EMAIL")
+        or not push_config.get("SMTP_PASSWORD")
+        or not push_config.get("SMTP_NAME")
+    ):
+        return 0
+    session = _smtp_session()
+    sent = 0
+    for title, content in messages:
+        try:
+            session.sendmail(push_config.get("SMTP_EMAIL"), _smtp_message(title, content))
+            sent += 1
+            if pending is not None:
+                pending.remove((title, content))
+        except Exception as e:
+            print(f"SMTP 邮件 推送失败！{title}：{e}")
+    return sent
+
+
+def smtp(title: str, content: str) -> bool | None:
+    """
+    使用 SMTP 邮件 推送消息。
+    """
+    if (
+        not push_config.get("SMTP_SERVER")
+        or not push_config.get("SMTP_SSL")
+        or not push_config.get("SMTP_EMAIL")
+        or not push_config.get("SMTP_PASSWORD")
+        or not push_config.get("SMTP_NAME")
+    ):
+        return
+    print("SMTP 邮件 服务启动")
+
+    if smtp_batch([(title, content)]):
         print("SMTP 邮件 推送成功！")
-    except Exception as e:
-        print(f"SMTP 邮件 推送失败！{e}")
+    else:
+        return False
 
 
-def pushme(title: str, content: str) -> None:
+@_channel
+async def pushme(title: str, content: str) -> bool | None:
     """
     使用 PushMe 推送消息。
     """
@@ -730,15 +1030,17 @@ def pushme(title: str, content: str) -> None:
         "date": push_config.get("date") if push_config.get("date") else "",
         "type": push_config.get("type") if push_config.get("type") else "",
     }
-    response = requests.post(url, data=data)
+    response = await http().post(url, data=data)
 
     if response.status_code == 200 and response.text == "success":
         print("PushMe 推送成功！")
     else:
         print(f"PushMe 推送失败！{response.status_code} {response.text}")
+        return False
 
 
-def chronocat(title: str, content: str) -> None:
+@_channel
+async def chronocat(title: str, content: str) -> bool | None:
     """
     使用 CHRONOCAT 推送消息。
     """
@@ -760,6 +1062,7 @@ def chronocat(title: str, content: str) -> None:
         "Authorization": f'Bearer {push_config.get("CHRONOCAT_TOKEN")}',
     }
 
+    failed = False
     for chat_type, ids in [(1, user_ids), (2, group_ids)]:
         if not ids:
             continue
@@ -773,7 +1076,7 @@ def chronocat(title: str, content: str) -> None:
                     }
                 ],
             }
-            response = requests.post(url, headers=headers, data=json.dumps(data))
+            response = await http().post(url, headers=headers, content=json.dumps(data))
             if response.status_code == 200:
                 if chat_type == 1:
                     print(f"QQ个人消息:{ids}推送成功！")
@@ -784,9 +1087,13 @@ def chronocat(title: str, content: str) -> None:
                     print(f"QQ个人消息:{ids}推送失败！")
                 else:
                     print(f"QQ群消息:{ids}推送失败！")
+                failed = True
+    if failed:
+        return False
 
 
-def ntfy(title: str, content: str) -> None:
+@_channel
+async def ntfy(title: str, content: str) -> bool | None:
     """
     通过 Ntfy 推送消息
     """
@@ -820,14 +1127,16 @@ def ntfy(title: str, content: str) -> None:
         headers['Actions'] = encode_rfc2047(push_config.get("NTFY_ACTIONS"))
 
     url = push_config.get("NTFY_URL") + "/" + push_config.get("NTFY_TOPIC")
-    response = requests.post(url, data=data, headers=headers)
+    response = await http().post(url, content=data, headers=headers)
     if response.status_code == 200:  # 使用 response.status_code 进行检查
         print("Ntfy 推送成功！")
     else:
         print("Ntfy 推送失败！错误信息：", response.text)
+        return False
 
 
-def wxpusher_bot(title: str, content: str) -> None:
+@_channel
+async def wxpusher_bot(title: str, content: str) -> bool | None:
     """
     通过 wxpusher 推送消息。
     支持的环境变量:
@@ -875,12 +1184,13 @@ def wxpusher_bot(title: str, content: str) -> None:
     }
 
     headers = {"Content-Type": "application/json"}
-    response = requests.post(url=url, json=data, headers=headers).json()
+    response = (await http().post(url=url, json=data, headers=headers)).json()
 
     if response.get("code") == 1000:
         print("wxpusher 推送成功！")
     else:
         print(f"wxpusher 推送失败！错误信息：{response.get('msg')}")
+        return False
 
 
 def parse_headers(headers):
@@ -902,12 +1212,16 @@ def parse_headers(headers):
     return parsed
 
 
+_PARSE_STRING_RE = re.compile(r"(\w+):\s*((?:(?!\n\w+:).)*)")
+
+
+def _split_fields(input_string):
+    return [(match.group(1).strip(), match.group(2).strip()) for match in _PARSE_STRING_RE.finditer(input_string)]
+
+
 def parse_string(input_string, value_format_fn=None):
     matches = {}
-    pattern = r"(\w+):\s*((?:(?!\n\w+:).)*)"
-    regex = re.compile(pattern)
-    for match in regex.finditer(input_string):
-        key, value = match.group(1).strip(), match.group(2).strip()
+    for key, value in _split_fields(input_string):
         try:
             value = value_format_fn(value) if value_format_fn else value
             json_value = json.loads(value)
@@ -934,7 +1248,152 @@ def parse_body(body, content_type, value_format_fn=None):
     return parsed
 
 
-def custom_notify(title: str, content: str) -> None:
+class _TemplateString:
+    """
+    预先按 $title / $content 拆分的字符串，填充结果与依次 .replace("$title", ...).replace("$content", ...) 完全一致。
+    """
+
+    _CONTENT_PREFIXES = tuple("$content"[:i] for i in range(1, len("$content")))
+
+    def __init__(self, text: str):
+        self.text = text
+        title_parts = text.split("$title")
+        parts = [part.split("$content") for part in title_parts]
+        self.has_slots = len(title_parts) > 1 or len(parts[0]) > 1
+        # 预先转换为 str.format 模板，填充时只需一次调用
+        self.format = "{0}".join(
+            "{1}".join(piece.replace("{", "{{").replace("}", "}}") for piece in pieces) for pieces in parts
+        )
+        # 替换 $title 后可能在拼接处组成新的 "$content"，此时只能按原方式依次替换
+        self.exact = not any(part.endswith(self._CONTENT_PREFIXES) for part in title_parts[:-1])
+
+    def fill(self, title: str, content: str) -> str:
+        if not self.exact or "$" in title:
+            return self.text.replace("$title", title).replace("$content", content)
+        return self.format.format(title, content)
+
+
+class WebhookTemplate:
+    """
+    预编译的自定义通知配置：请求头只解析一次，请求体预先拆分为键和带占位符的值，
+    不含占位符的值预先完成 json.loads。render() 的结果与 parse_headers / parse_body 的结果一致。
+    """
+
+    def __init__(self, url, method, content_type, body, headers):
+        self.method = method
+        self.content_type = content_type
+        self.headers = parse_headers(headers)
+        self.url = _TemplateString(url)
+        self.valid = "$title" in url or "$title" in body
+        self.body = body
+        self.plain_body = None
+        self.fields = None
+        if not body or content_type == "text/plain":
+            self.plain_body = _TemplateString(body) if body else None
+        else:
+            self.fields = []
+            for key, value in _split_fields(body):
+                slots = _TemplateString(value)
+                if slots.has_slots:
+                    self.fields.append((key, slots, None))
+                    continue
+                # 不含占位符的值与消息无关，预先完成 json.loads
+                try:
+                    self.fields.append((key, None, json.loads(value)))
+                except:
+                    self.fields.append((key, None, value))
+
+    def render_fields(self, title: str, content: str) -> dict:
+        escaped_title, escaped_content = title.replace("\n", "\\n"), content.replace("\n", "\\n")
+        parsed = {}
+        for key, slots, value in self.fields:
+            if slots is None:
+                parsed[key] = value
+                continue
+            value = slots.fill(escaped_title, escaped_content)
+            try:
+                parsed[key] = json.loads(value)
+            except:
+                parsed[key] = value
+        return parsed
+
+    def render_body(self, title: str, content: str):
+        if self.fields is None:
+            if self.plain_body is None:
+                return self.body
+            return self.plain_body.fill(title.replace("\n", "\\n"), content.replace("\n", "\\n"))
+        parsed = self.render_fields(title, content)
+        if self.content_type == "application/x-www-form-urlencoded":
+            return urllib.parse.urlencode(parsed, doseq=True)
+        if self.content_type == "application/json":
+            return json.dumps(parsed)
+        return parsed
+
+    def render_url(self, title: str, content: str) -> str:
+        return self.url.fill(urllib.parse.quote_plus(title), urllib.parse.quote_plus(content))
+
+
+_webhook_template = (None, None)
+
+
+def webhook_template() -> WebhookTemplate:
+    """
+    返回当前自定义通知配置对应的预编译模板，配置变化时重新编译。
+    """
+    global _webhook_template
+    key = (
+        push_config.get("WEBHOOK_URL") or "",
+        push_config.get("WEBHOOK_METHOD") or "",
+        push_config.get("WEBHOOK_CONTENT_TYPE") or "",
+        push_config.get("WEBHOOK_BODY") or "",
+        push_config.get("WEBHOOK_HEADERS") or "",
+    )
+    if _webhook_template[0] != key:
+        _webhook_template = (key, WebhookTemplate(*key))
+    return _webhook_template[1]
+
+
+def custom_notify_batchable() -> bool:
+    """
+    自定义通知是否可以把多条消息合并为一个 JSON 数组发送。
+    """
+    return (
+        push_config.get("WEBHOOK_BATCH") == "true"
+        and push_config.get("WEBHOOK_CONTENT_TYPE") == "application/json"
+        and "$title" not in push_config.get("WEBHOOK_URL")
+        and "$content" not in push_config.get("WEBHOOK_URL")
+        and "$title" in (push_config.get("WEBHOOK_BODY") or "")
+    )
+
+
+@_channel
+async def custom_notify_many(messages) -> bool | None:
+    """
+    通过 自定义通知 一次推送多条消息，请求体为每条消息的请求体组成的 JSON 数组。
+    """
+    if not custom_notify_batchable():
+        return
+    print("自定义通知服务启动（批量）")
+
+    template = webhook_template()
+    body = json.dumps([template.render_fields(title, content) for title, content in messages])
+    response = await http().request(
+        method=template.method,
+        url=template.url.text,
+        headers=template.headers,
+        timeout=15,
+        content=body,
+    )
+
+    if response.status_code == 200:
+        print(f"自定义通知批量推送成功！共 {len(messages)} 条")
+    else:
+        print(f"自定义通知批量推送失败！{response.status_code} {response.text}")
+        return False
+
+
+@_channel
+async def custom_notify(title: str, content: str) -> bool | None:
     """
     通过 自定义通知 推送消息。
     """
@@ -943,117 +1402,510 @@ def custom_notify(title: str, content: str) -> None:
 
     print("自定义通知服务启动")
 
-    WEBHOOK_URL = push_config.get("WEBHOOK_URL")
-    WEBHOOK_METHOD = push_config.get("WEBHOOK_METHOD")
-    WEBHOOK_CONTENT_TYPE = push_config.get("WEBHOOK_CONTENT_TYPE")
-    WEBHOOK_BODY = push_config.get("WEBHOOK_BODY")
-    WEBHOOK_HEADERS = push_config.get("WEBHOOK_HEADERS")
-
-    if "$title" not in WEBHOOK_URL and "$title" not in WEBHOOK_BODY:
+    template = webhook_template()
+    if not template.valid:
         print("请求头或者请求体中必须包含 $title 和 $content")
-        return
-
-    headers = parse_headers(WEBHOOK_HEADERS)
-    body = parse_body(
-        WEBHOOK_BODY,
-        WEBHOOK_CONTENT_TYPE,
-        lambda v: v.replace("$title", title.replace("\n", "\\n")).replace(
-            "$content", content.replace("\n", "\\n")
-        ),
-    )
-    formatted_url = WEBHOOK_URL.replace(
-        "$title", urllib.parse.quote_plus(title)
-    ).replace("$content", urllib.parse.quote_plus(content))
-    response = requests.request(
-        method=WEBHOOK_METHOD, url=formatted_url, headers=headers, timeout=15, data=body
+        return False
+
+    body = template.render_body(title, content)
+    response = await http().request(
+        method=template.method,
+        url=template.render_url(title, content),
+        headers=template.headers,
+        timeout=15,
+        # 其它 content type 的请求体是字典，与 requests 一样按表单编码
+        **({"data": body} if isinstance(body, dict) else {"content": body or None}),
     )
 
     if response.status_code == 200:
         print("自定义通知推送成功！")
     else:
         print(f"自定义通知推送失败！{response.status_code} {response.text}")
+        return False
 
 
-def one() -> str:
+_hitokoto_cache = []
+_hitokoto_lock = threading.Lock()
+
+
+def _hitokoto_cached() -> list:
+    with _hitokoto_lock:
+        if not _hitokoto_cache and push_config.get("HITOKOTO_CACHE"):
+            try:
+                with open(push_config.get("HITOKOTO_CACHE"), "r", encoding="utf-8") as f:
+                    _hitokoto_cache.extend(json.load(f))
+            except (OSError, ValueError):
+                pass
+        return list(_hitokoto_cache)
+
+
+def _hitokoto_remember(quote: str) -> None:
+    """
+    把新获取的一言加入本地缓存，超过 HITOKOTO_CACHE_SIZE 条时淘汰最早的。
+    """
+    _hitokoto_cached()
+    path = push_config.get("HITOKOTO_CACHE")
+    with _hitokoto_lock:
+        if quote in _hitokoto_cache:
+            _hitokoto_cache.remove(quote)
+        _hitokoto_cache.append(quote)
+        del _hitokoto_cache[:-int(push_config.get("HITOKOTO_CACHE_SIZE") or 50)]
+        if path:
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            try:
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    json.dump(_hitokoto_cache, f, ensure_ascii=False)
+                os.replace(tmp_path, path)
+            except OSError:
+                pass
+
+
+async def _fetch_hitokoto() -> str:
+    url = "https://v1.hitokoto.cn/"
+    res = (await http().get(url, timeout=float(push_config.get("HITOKOTO_TIMEOUT") or 2) + 3)).json()
+    quote = res["hitokoto"] + "    ----" + res["from"]
+    _hitokoto_remember(quote)
+    return quote
+
+
+def prefetch_one():
+    """
+    在后台开始获取一言，返回 Future，传给 one() 取结果。
+    """
+    return _submit(_fetch_hitokoto())
+
+
+def one(future=None) -> str:
     """
     获取一条一言。
+    最多等待 HITOKOTO_TIMEOUT 秒，超时或失败时随机返回一条本地缓存的一言，没有缓存时返回空字符串。
     :return:
     """
-    url = "https://v1.hitokoto.cn/"
-    res = requests.get(url).json()
-    return res["hitokoto"] + "    ----" + res["from"]
+    if future is None:
+        future = prefetch_one()
+    try:
+        return future.result(timeout=float(push_config.get("HITOKOTO_TIMEOUT") or 2))
+    except Exception:
+        # 超时的请求继续在后台完成，结果会进入缓存供下次使用
+        cached = _hitokoto_cached()
+        return random.choice(cached) if cached else ""
+
+
+# 渠道注册表：(渠道函数名, 需要的配置项)。配置项为元组时表示其中任意一项有值即可。
+# 渠道函数推送失败时返回 False，返回 None（未配置或推送成功）时视为成功。
+_CHANNELS = (
+    ("bark", ("BARK_PUSH",)),
+    ("console", ("CONSOLE",)),
+    ("dingding_bot", ("DD_BOT_TOKEN", "DD_BOT_SECRET")),
+    ("feishu_bot", ("FSKEY",)),
+    ("go_cqhttp", ("GOBOT_URL", "GOBOT_QQ")),
+    ("gotify", ("GOTIFY_URL", "GOTIFY_TOKEN")),
+    ("iGot", ("IGOT_PUSH_KEY",)),
+    ("serverJ", ("PUSH_KEY",)),
+    ("pushdeer", ("DEER_KEY",)),
+    ("chat", ("CHAT_URL", "CHAT_TOKEN")),
+    ("pushplus_bot", ("PUSH_PLUS_TOKEN",)),
+    ("weplus_bot", ("WE_PLUS_BOT_TOKEN",)),
+    ("qmsg_bot", ("QMSG_KEY", "QMSG_TYPE")),
+    ("wecom_app", ("QYWX_AM",)),
+    ("wecom_bot", ("QYWX_KEY",)),
+    ("telegram_bot", ("TG_BOT_TOKEN", "TG_USER_ID")),
+    ("aibotk", ("AIBOTK_KEY", "AIBOTK_TYPE", "AIBOTK_NAME")),
+    ("smtp", ("SMTP_SERVER", "SMTP_SSL", "SMTP_EMAIL", "SMTP_PASSWORD", "SMTP_NAME")),
+    ("pushme", ("PUSHME_KEY",)),
+    ("chronocat", ("CHRONOCAT_URL", "CHRONOCAT_QQ", "CHRONOCAT_TOKEN")),
+    ("custom_notify", ("WEBHOOK_URL", "WEBHOOK_METHOD")),
+    ("ntfy", ("NTFY_TOPIC",)),
+    ("wxpusher_bot", ("WXPUSHER_APP_TOKEN", ("WXPUSHER_TOPIC_IDS", "WXPUSHER_UIDS"))),
+)
+_CHANNEL_KEYS = tuple(dict.fromkeys(
+    key for _, required in _CHANNELS for item in required
+    for key in (item if isinstance(item, tuple) else (item,))
+))
+
+# 已解析的渠道列表：(配置指纹, 渠道函数列表)
+_resolved_channels = (None, [])
+
+
+def _channel_enabled(required) -> bool:
+    return all(
+        any(push_config.get(key) for key in item) if isinstance(item, tuple) else push_config.get(item)
+        for item in required
+    )
 
 
 def add_notify_function():
-    notify_function = []
-    if push_config.get("BARK_PUSH"):
-        notify_function.append(bark)
-    if push_config.get("CONSOLE"):
-        notify_function.append(console)
-    if push_config.get("DD_BOT_TOKEN") and push_config.get("DD_BOT_SECRET"):
-        notify_function.append(dingding_bot)
-    if push_config.get("FSKEY"):
-        notify_function.append(feishu_bot)
-    if push_config.get("GOBOT_URL") and push_config.get("GOBOT_QQ"):
-        notify_function.append(go_cqhttp)
-    if push_config.get("GOTIFY_URL") and push_config.get("GOTIFY_TOKEN"):
-        notify_function.append(gotify)
-    if push_config.get("IGOT_PUSH_KEY"):
-        notify_function.append(iGot)
-    if push_config.get("PUSH_KEY"):
-        notify_function.append(serverJ)
-    if push_config.get("DEER_KEY"):
-        notify_function.append(pushdeer)
-    if push_config.get("CHAT_URL") and push_config.get("CHAT_TOKEN"):
-        notify_function.append(chat)
-    if push_config.get("PUSH_PLUS_TOKEN"):
-        notify_function.append(pushplus_bot)
-    if push_config.get("WE_PLUS_BOT_TOKEN"):
-        notify_function.append(weplus_bot)
-    if push_config.get("QMSG_KEY") and push_config.get("QMSG_TYPE"):
-        notify_function.append(qmsg_bot)
-    if push_config.get("QYWX_AM"):
-        notify_function.append(wecom_app)
-    if push_config.get("QYWX_KEY"):
-        notify_function.append(wecom_bot)
-    if push_config.get("TG_BOT_TOKEN") and push_config.get("TG_USER_ID"):
-        notify_function.append(telegram_bot)
-    if (
-        push_config.get("AIBOTK_KEY")
-        and push_config.get("AIBOTK_TYPE")
-        and push_config.get("AIBOTK_NAME")
-    ):
-        notify_function.append(aibotk)
-    if (
-        push_config.get("SMTP_SERVER")
-        and push_config.get("SMTP_SSL")
-        and push_config.get("SMTP_EMAIL")
-        and push_config.get("SMTP_PASSWORD")
-        and push_config.get("SMTP_NAME")
-    ):
-        notify_function.append(smtp)
-    if push_config.get("PUSHME_KEY"):
-        notify_function.append(pushme)
-    if (
-        push_config.get("CHRONOCAT_URL")
-        and push_config.get("CHRONOCAT_QQ")
-        and push_config.get("CHRONOCAT_TOKEN")
-    ):
-        notify_function.append(chronocat)
-    if push_config.get("WEBHOOK_URL") and push_config.get("WEBHOOK_METHOD"):
-        notify_function.append(custom_notify)
-    if push_config.get("NTFY_TOPIC"):
-        notify_function.append(ntfy)
-    if push_config.get("WXPUSHER_APP_TOKEN") and (
-        push_config.get("WXPUSHER_TOPIC_IDS") or push_config.get("WXPUSHER_UIDS")
-    ):
-        notify_function.append(wxpusher_bot)
+    """
+    返回已启用的渠道函数列表。只在首次调用或相关配置变化时重新解析注册表。
+    """
+    global _resolved_channels
+    fingerprint = tuple(push_config.get(key) for key in _CHANNEL_KEYS)
+    if _resolved_channels[0] != fingerprint:
+        module = globals()
+        _resolved_channels = (
+            fingerprint,
+            [module[name] for name, required in _CHANNELS if _channel_enabled(required)],
+        )
+    notify_function = list(_resolved_channels[1])
     if not notify_function:
         print(f"无推送渠道，请检查通知变量是否正确")
     return notify_function
 
 
-def send(title: str, content: str, ignore_default_config: bool = False, **kwargs):
+# send() 返回的各渠道推送结果
+PUSH_SUCCESS = "success"
+PUSH_FAILURE = "failure"
+PUSH_TIMEOUT = "timeout"
+PUSH_SUPPRESSED = "suppressed"  # 去重窗口内的重复消息，未推送
+PUSH_THROTTLED = "throttled"  # 超出渠道限流，已放入重试队列
+
+
+def _spawn(fn, *args):
+    """
+    在守护线程中运行同步函数 fn（SMTP 和第三方的同步渠道函数），返回 concurrent.futures.Future。
+    超时被放弃的渠道线程不会阻止进程退出。
+    """
+    from concurrent.futures import Future
+
+    future = Future()
+
+    def run():
+        if not future.set_running_or_notify_cancel():
+            return
+        try:
+            future.set_result(fn(*args))
+        except BaseException as e:
+            future.set_exception(e)
+
+    threading.Thread(target=run, name=getattr(fn, "__name__", "notify"), daemon=True).start()
+    return future
+
+
+def _channel_timeout(name: str) -> float:
+    """
+    渠道的超时时间：PUSH_CHANNEL_TIMEOUTS 中单独设置的值，否则为 PUSH_TIMEOUT。
+    """
+    for item in re.split(r"[,\n]", push_config.get("PUSH_CHANNEL_TIMEOUTS") or ""):
+        key, _, value = item.partition("=")
+        if key.strip() == name and value.strip():
+            return float(value)
+    return float(push_config.get("PUSH_TIMEOUT") or 15)
+
+
+async def _run_channel(mode, title: str, content: str, timeout: float):
+    """
+    运行单个渠道：协程渠道直接在推送事件循环中等待；只有 SMTP 和第三方的同步渠道函数在守护线程中运行。
+    """
+    import asyncio
+
+    mode = getattr(mode, "coroutine", mode)  # 内置渠道的同步包装，改为等待其协程版本
+    if asyncio.iscoroutinefunction(mode):
+        coro = mode(title, content)
+    else:
+        coro = asyncio.wrap_future(_spawn(mode, title, content))
+    return await asyncio.wait_for(coro, timeout)
+
+
+async def _dispatch(jobs) -> dict:
+    """
+    并发运行所有推送任务：每个渠道有单独的超时时间，所有任务共享一个总时限。
+    jobs 为 [(key, 渠道函数, title, content), ...]，返回 {key: success / failure / timeout}。
+    """
+    import asyncio
+
+    deadline = float(push_config.get("PUSH_DEADLINE") or 60)
+    tasks = {
+        asyncio.ensure_future(_run_channel(mode, title, content, _channel_timeout(mode.__name__))): (key, mode.__name__)
+        for key, mode, title, content in jobs
+    }
+    if not tasks:
+        return {}
+    done, pending = await asyncio.wait(tasks, timeout=deadline)
+    results = {}
+    for task in pending:
+        task.cancel()
+        key, name = tasks[task]
+        print(f"{name} 推送超过总时限 {deadline} 秒，已放弃！")
+        results[key] = PUSH_TIMEOUT
+    for task in done:
+        key, name = tasks[task]
+        exc = task.exception()
+        if isinstance(exc, asyncio.TimeoutError):
+            print(f"{name} 推送超时（{_channel_timeout(name)} 秒）！")
+            results[key] = PUSH_TIMEOUT
+        elif exc is not None:
+            print(f"{name} 推送失败！{exc}")
+            results[key] = PUSH_FAILURE
+        else:
+            results[key] = PUSH_FAILURE if task.result() is False else PUSH_SUCCESS
+    return {key: results[key] for key, _ in tasks.values()}
+
+
+def _run_dispatch(jobs) -> dict:
+    # 调用方自己是否在事件循环中运行都一样：推送总是在推送事件循环中进行，调用方等待结果
+    future = _submit(_dispatch(jobs))
+    try:
+        return future.result(timeout=float(push_config.get("PUSH_DEADLINE") or 60) + 5)
+    except Exception:
+        future.cancel()
+        return {key: PUSH_TIMEOUT for key, *_ in jobs}
+
+
+# --- 失败消息的重试队列、去重和限流 ---
+# 推送失败或超时的消息按渠道保存到 SQLite，下次 send() 时与新消息一起在总时限内重试，
+# 重试间隔按指数退避增长。超时的渠道也可能其实已经送达，因此重试可能产生重复消息。
+# 同一个文件中还记录各渠道最近推送过的消息摘要（去重）和令牌桶（限流），多个进程共用。
+OUTBOX_BACKOFF = 60  # 第一次重试前等待的秒数，之后每次翻倍
+OUTBOX_BACKOFF_MAX = 6 * 3600
+
+_OUTBOX_SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    channel TEXT NOT NULL,
+    title TEXT NOT NULL,
+    content TEXT NOT NULL,
+    attempts INTEGER NOT NULL,
+    next_attempt REAL NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS recent (
+    channel TEXT NOT NULL,
+    digest TEXT NOT NULL,
+    title TEXT NOT NULL,
+    sent_at REAL NOT NULL,
+    suppressed INTEGER NOT NULL,
+    PRIMARY KEY (channel, digest)
+);
+CREATE TABLE IF NOT EXISTS buckets (
+    channel TEXT PRIMARY KEY,
+    tokens REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+"""
+
+
+def _outbox_connect():
+    import sqlite3
+
+    conn = sqlite3.connect(push_config.get("PUSH_OUTBOX"), timeout=30)
+    conn.executescript(_OUTBOX_SCHEMA)
+    return conn
+
+
+def _rate_limits() -> dict:
+    """
+    解析 PUSH_RATE_LIMITS，返回 {渠道名: (次数, 秒数)}。
+    """
+    limits = {}
+    for item in re.split(r"[,\n]", push_config.get("PUSH_RATE_LIMITS") or ""):
+        name, _, rate = item.partition("=")
+        count, _, period = rate.partition("/")
+        if name.strip() and count.strip():
+            limits[name.strip()] = (float(count), float(period or 60))
+    return limits
+
+
+def _bucket_take(conn, name: str, now: float) -> float:
+    """
+    从渠道的令牌桶中取一个令牌。成功返回 0，否则返回需要等待的秒数。
+    """
+    limit = _rate_limits().get(name)
+    if not limit:
+        return 0
+    count, period = limit
+    row = conn.execute("SELECT tokens, updated_at FROM buckets WHERE channel = ?", (name,)).fetchone()
+    tokens = count if row is None else min(count, row[0] + (now - row[1]) * count / period)
+    if tokens < 1:
+        conn.execute("INSERT OR REPLACE INTO buckets (channel, tokens, updated_at) VALUES (?, ?, ?)",
+                     (name, tokens, now))
+        return (1 - tokens) * period / count
+    conn.execute("INSERT OR REPLACE INTO buckets (channel, tokens, updated_at) VALUES (?, ?, ?)",
+                 (name, tokens - 1, now))
+    return 0
+
+
+def _gate(names, title: str, digest: str) -> dict:
+    """
+    推送前检查每个渠道的去重窗口和限流。返回 {渠道名: (动作, 附加信息)}：
+    - ("send", 摘要)：可以推送，摘要为之前被合并的重复消息说明（可能为空字符串）；
+    - ("duplicate", None)：去重窗口内已推送过相同消息；
+    - ("throttled", 等待秒数)：超出限流。
+    """
+    if not push_config.get("PUSH_OUTBOX"):
+        return {name: ("send", "") for name in names}
+    from contextlib import closing
+
+    window = float(push_config.get("PUSH_DEDUPE_WINDOW") or 0)
+    now = time.time()
+    gates = {}
+    try:
+        with closing(_outbox_connect()) as conn, conn:
+            # 检查和记录在同一个写事务中完成，避免多个进程同时推送相同消息；推送失败时由 _gate_release 撤销记录
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute("DELETE FROM recent WHERE sent_at < ? AND suppressed = 0", (now - window,))
+            for name in names:
+                if window > 0:
+                    row = conn.execute("SELECT sent_at FROM recent WHERE channel = ? AND digest = ?",
+                                       (name, digest)).fetchone()
+                    if row and row[0] >= now - window:
+                        conn.execute("UPDATE recent SET suppressed = suppressed + 1 WHERE channel = ? AND digest = ?",
+                                     (name, digest))
+                        gates[name] = ("duplicate", None)
+                        continue
+                wait = _bucket_take(conn, name, now)
+                if wait:
+                    gates[name] = ("throttled", wait)
+                    continue
+                summary = "".join(
+                    f"\n另有 {suppressed} 条重复的「{t}」消息已合并，未重复推送。"
+                    for t, suppressed in conn.execute(
+                        "SELECT title, suppressed FROM recent WHERE channel = ? AND suppressed > 0 ORDER BY sent_at",
+                        (name,))
+                )
+                conn.execute("UPDATE recent SET suppressed = 0 WHERE channel = ?", (name,))
+                if window > 0:
+                    conn.execute("INSERT OR REPLACE INTO recent (channel, digest, title, sent_at, suppressed) "
+                                 "VALUES (?, ?, ?, ?, 0)", (name, digest, title, now))
+                gates[name] = ("send", f"\n{summary}" if summary else "")
+    except Exception as e:
+        print(f"读取推送去重/限流状态时出错：{e}")
+        return {name: ("send", "") for name in names}
+    return gates
+
+
+def _gate_release(names, digest: str) -> None:
+    """
+    推送失败的渠道撤销 _gate 预先记录的去重记录，使相同消息之后仍可推送；被合并的重复消息计数保留。
+    """
+    if not names or not push_config.get("PUSH_OUTBOX") or not float(push_config.get("PUSH_DEDUPE_WINDOW") or 0):
+        return
+    from contextlib import closing
+
+    try:
+        with closing(_outbox_connect()) as conn, conn:
+            conn.executemany("UPDATE recent SET sent_at = 0 WHERE channel = ? AND digest = ?",
+                             [(name, digest) for name in names])
+    except Exception as e:
+        print(f"撤销推送去重记录时出错：{e}")
+
+
+def _outbox_backoff(attempts: int) -> float:
+    return min(OUTBOX_BACKOFF * 2 ** max(attempts - 1, 0), OUTBOX_BACKOFF_MAX)
+
+
+def _outbox_add(failed) -> None:
+    """
+    保存推送失败的消息，failed 为 [(渠道名, title, content, 等待秒数), ...]，等待秒数为 None 时按退避时间重试。
+    """
+    if not failed or not push_config.get("PUSH_OUTBOX"):
+        return
+    from contextlib import closing
+
+    now = time.time()
+    try:
+        with closing(_outbox_connect()) as conn, conn:
+            conn.executemany(
+                "INSERT INTO outbox (channel, title, content, attempts, next_attempt, created_at) VALUES (?, ?, ?, 0, ?, ?)",
+                [(name, title, content, now + (_outbox_backoff(0) if wait is None else wait), now)
+                 for name, title, content, wait in failed],
+            )
+            conn.execute(
+                "DELETE FROM outbox WHERE id NOT IN (SELECT id FROM outbox ORDER BY id DESC LIMIT ?)",
+                (int(push_config.get("PUSH_OUTBOX_MAX") or 200),),
+            )
+        print(f"{len(failed)} 条未推送的消息已保存，稍后重试。")
+    except Exception as e:
+        print(f"保存推送失败的消息时出错：{e}")
+
+
+def _outbox_claim(force: bool = False) -> list:
+    """
+    取出到期的消息并推迟其下次重试时间，避免多个进程同时重试同一条消息。
+    返回 [(id, 渠道函数, title, content), ...]；已停用的渠道的消息直接删除。
+    """
+    if not push_config.get("PUSH_OUTBOX"):
+        return []
+    from contextlib import closing
+
+    enabled = {mode.__name__: mode for mode in add_notify_function()}
+    now = time.time()
+    lease = now + float(push_config.get("PUSH_DEADLINE") or 60) + 60
+    jobs = []
+    try:
+        with closing(_outbox_connect()) as conn, conn:
+            conn.execute("BEGIN IMMEDIATE")
+            rows = conn.execute(
+                "SELECT id, channel, title, content FROM outbox WHERE next_attempt <= ? ORDER BY id",
+                (float("inf") if force else now,),
+            ).fetchall()
+            for row_id, name, title, content in rows:
+                if name not in enabled:
+                    conn.execute("DELETE FROM outbox WHERE id = ?", (row_id,))
+                    continue
+                wait = _bucket_take(conn, name, now)
+                if wait:  # 超出限流，等有令牌时再重试
+                    conn.execute("UPDATE outbox SET next_attempt = ? WHERE id = ?", (now + wait, row_id))
+                    continue
+                conn.execute("UPDATE outbox SET next_attempt = ? WHERE id = ?", (lease, row_id))
+                jobs.append((row_id, enabled[name], title, content))
+    except Exception as e:
+        print(f"读取待重试消息时出错：{e}")
+    return jobs
+
+
+def _outbox_settle(results: dict) -> None:
+    """
+    根据重试结果更新队列：成功的删除，失败的按指数退避推迟，超过重试次数的丢弃。
+    """
+    if not results:
+        return
+    from contextlib import closing
+
+    max_attempts = int(push_config.get("PUSH_OUTBOX_ATTEMPTS") or 8)
+    now = time.time()
+    try:
+        with closing(_outbox_connect()) as conn, conn:
+            for row_id, status in results.items():
+                if status == PUSH_SUCCESS:
+                    conn.execute("DELETE FROM outbox WHERE id = ?", (row_id,))
+                    continue
+                row = conn.execute("SELECT attempts, channel FROM outbox WHERE id = ?", (row_id,)).fetchone()
+                if not row:
+                    continue
+                attempts = row[0] + 1
+                if attempts >= max_attempts:
+                    print(f"{row[1]} 的一条消息重试 {attempts} 次仍失败，已丢弃。")
+                    conn.execute("DELETE FROM outbox WHERE id = ?", (row_id,))
+                else:
+                    conn.execute(
+                        "UPDATE outbox SET attempts = ?, next_attempt = ? WHERE id = ?",
+                        (attempts, now + _outbox_backoff(attempts), row_id),
+                    )
+    except Exception as e:
+        print(f"更新待重试消息的状态时出错（这些消息将在租约到期后再次重试）：{e}")
+    succeeded = sum(1 for status in results.values() if status == PUSH_SUCCESS)
+    print(f"重试之前失败的消息：成功 {succeeded}/{len(results)}")
+
+
+def flush_outbox(force: bool = False) -> dict:
+    """
+    立即重试队列中到期的消息（force=True 时忽略退避时间重试全部消息），返回 {id: 结果}。
+    """
+    retries = _outbox_claim(force)
+    if not retries:
+        print("没有待重试的消息。")
+        return {}
+    results = _run_dispatch([(("outbox", row_id), mode, title, content) for row_id, mode, title, content in retries])
+    results = {key[1]: status for key, status in results.items()}
+    _outbox_settle(results)
+    return results
+
+
+def send(title: str, content: str, ignore_default_config: bool = False, **kwargs) -> dict:
+    """
+    推送到所有已启用的渠道，最多等待 PUSH_DEADLINE 秒。
+    返回 {渠道名: success / failure / timeout}，超时的渠道在后台被放弃，不会阻止进程退出。
+    """
     if kwargs:
         global push_config
         if ignore_default_config:
@@ -1063,28 +1915,184 @@ def send(title: str, content: str, ignore_default_config: bool = False, **kwargs
 
     if not content:
         print(f"{title} 推送内容为空！")
-        return
+        return {}
 
     # 根据标题跳过一些消息推送，环境变量：SKIP_PUSH_TITLE 用回车分隔
     skipTitle = os.getenv("SKIP_PUSH_TITLE")
     if skipTitle:
         if title in re.split("\n", skipTitle):
             print(f"{title} 在SKIP_PUSH_TITLE环境变量内，跳过推送！")
-            return
+            return {}
+
+    # 去重按不含一言的原始内容计算
+    digest = hashlib.sha256(f"{title}\0{content}".encode("utf-8")).hexdigest()
+    hitokoto = push_config.get("HITOKOTO") != "false"
+    hitokoto_future = prefetch_one() if hitokoto else None  # 与渠道初始化同时获取一言
+
+    notify_function = add_notify_function()
+    if hitokoto:
+        quote = one(hitokoto_future)
+        content += "\n\n" + quote if quote else ""
+    # 之前失败的消息与本次消息一起推送，共享同一个总时限，不额外等待
+    retries = _outbox_claim()
+    gates = _gate([mode.__name__ for mode in notify_function], title, digest)
+    jobs, results, deferred = [], {}, []
+    for mode in notify_function:
+        name = mode.__name__
+        action, extra = gates.get(name, ("send", ""))
+        if action == "duplicate":
+            print(f"{name} 在去重窗口内已推送过相同消息，已合并。")
+            results[name] = PUSH_SUPPRESSED
+        elif action == "throttled":
+            print(f"{name} 超出限流，{extra:.0f} 秒后重试。")
+            results[name] = PUSH_THROTTLED
+            deferred.append((name, title, content, extra))
+        else:
+            jobs.append((name, mode, title, content + extra))
+    jobs_content = {name: c for name, _, _, c in jobs}
+    jobs += [(("outbox", row_id), mode, t, c) for row_id, mode, t, c in retries]
+    statuses = _run_dispatch(jobs)
+
+    for key, status in statuses.items():
+        if not isinstance(key, tuple):
+            results[key] = status
+            if status != PUSH_SUCCESS:
+                deferred.append((key, title, jobs_content[key], None))
+    _gate_release([key for key, status in statuses.items() if not isinstance(key, tuple) and status != PUSH_SUCCESS],
+                  digest)
+    _outbox_add(deferred)
+    if retries:
+        _outbox_settle({key[1]: status for key, status in statuses.items() if isinstance(key, tuple)})
+    return {mode.__name__: results[mode.__name__] for mode in notify_function}
+
+
+# 批量推送时可合并消息的渠道：{渠道名: (单条消息长度上限, 计算长度的函数)}，未列出的渠道按默认上限合并
+_utf8_len = lambda text: len(text.encode("utf-8"))
+_MERGE_LIMITS = {
+    "telegram_bot": (4000, len),
+    "wecom_app": (2000, _utf8_len),
+    "wecom_bot": (2000, _utf8_len),
+}
+_MERGE_LIMIT_DEFAULT = (4000, len)
+
+
+def _merge_messages(messages, limit: int, measure=len) -> list:
+    """
+    把多条消息合并为尽量少的几条，每条 "标题\n\n内容" 的长度不超过 limit。
+    标题都相同时保留该标题，否则每段内容前加上各自的标题。
+    """
+    titles = {title for title, _ in messages}
+    same_title = len(titles) == 1
+    blocks = [content if same_title else f"【{title}】\n{content}" for title, content in messages]
+
+    def merged_title(count):
+        if same_title:
+            return messages[0][0] if count == 1 else f"{messages[0][0]}（{count} 条）"
+        return f"共 {count} 条通知" if count > 1 else "通知"
+
+    chunks, current = [], []
+    for block in blocks:
+        candidate = current + [block]
+        if current and measure(f"{merged_title(len(candidate))}\n\n" + "\n\n".join(candidate)) > limit:
+            chunks.append(current)
+            candidate = [block]
+        while measure(f"{merged_title(1)}\n\n{candidate[0]}") > limit and len(candidate[0]) > 1:
+            # 单段内容本身超出上限时按字符硬拆分
+            head = candidate[0]
+            cut = len(head)
+            while cut > 1 and measure(f"{merged_title(1)}\n\n{head[:cut]}") > limit:
+                cut = cut * 3 // 4
+            chunks.append([head[:cut]])
+            candidate = [head[cut:]]
+        current = candidate
+    if current:
+        chunks.append(current)
+    return [(merged_title(len(chunk)), "\n\n".join(chunk)) for chunk in chunks]
+
+
+def _batch_channel(name: str, call, *args):
+    """
+    包装批量推送函数，使其可以像普通渠道一样调度（名字用于超时设置和日志）。
+    协程函数包装为协程渠道，同步函数包装为同步渠道。
+    """
+    import asyncio
 
-    hitokoto = push_config.get("HITOKOTO")
-    content += "\n\n" + one() if hitokoto != "false" else ""
+    call = getattr(call, "coroutine", call)
+    if asyncio.iscoroutinefunction(call):
+        async def run(title, content):
+            return await call(*args)
+    else:
+        def run(title, content):
+            return call(*args)
 
+    run.__name__ = name
+    return run
+
+
+def send_many(messages) -> dict:
+    """
+    批量推送多条消息，messages 为 [(title, content), ...]。
+    各渠道按自身能力合并：Telegram、企业微信等把多条消息拼接到长度上限内一次发送，
+    SMTP 复用同一个会话发送多封邮件，自定义通知在 WEBHOOK_BATCH=true 时以 JSON 数组一次发送。
+    批量消息不做去重和限流，失败的消息会进入重试队列：合并消息按合并后的消息重试，
+    SMTP 和批量自定义通知把未确认送达的消息逐条放入重试队列。
+    返回 {渠道名: success / failure / timeout}，一个渠道的任意一次请求失败即为 failure。
+    """
+    messages = [(title, content) for title, content in messages if content]
+    if not messages:
+        print("批量推送内容为空！")
+        return {}
+    skipTitle = os.getenv("SKIP_PUSH_TITLE")
+    if skipTitle:
+        skipped = set(re.split("\n", skipTitle))
+        messages = [(title, content) for title, content in messages if title not in skipped]
+
+    hitokoto = push_config.get("HITOKOTO") != "false"
+    hitokoto_future = prefetch_one() if hitokoto else None
     notify_function = add_notify_function()
-    ts = [
-        threading.Thread(target=mode, args=(title, content), name=mode.__name__)
-        for mode in notify_function
-    ]
-    [t.start() for t in ts]
-    [t.join() for t in ts]
+    quote = one(hitokoto_future) if hitokoto else ""
+    suffix = f"\n\n{quote}" if quote else ""
+
+    jobs = []
+    unconfirmed = {}  # 批量任务 -> 失败时逐条放入重试队列的消息
+    for mode in notify_function:
+        name = mode.__name__
+        if name == "smtp":
+            batch = [(title, content + suffix) for title, content in messages]
+            unconfirmed[(name, 0)] = pending = list(batch)
+            jobs.append(((name, 0), _batch_channel(
+                name, lambda batch=batch, pending=pending: smtp_batch(batch, pending) == len(batch) or False
+            ), "", ""))
+        elif name == "custom_notify" and custom_notify_batchable():
+            batch = [(title, content + suffix) for title, content in messages]
+            unconfirmed[(name, 0)] = batch
+            jobs.append(((name, 0), _batch_channel(name, custom_notify_many, batch), "", ""))
+        else:
+            limit, measure = _MERGE_LIMITS.get(name, _MERGE_LIMIT_DEFAULT)
+            for index, (title, content) in enumerate(_merge_messages(messages, limit - measure(suffix), measure)):
+                jobs.append(((name, index), mode, title, content + suffix))
+
+    statuses = _run_dispatch(jobs)
+    results, failed = {}, []
+    for (key, mode, title, content) in jobs:
+        name, status = key[0], statuses.get(key, PUSH_TIMEOUT)
+        if results.get(name, PUSH_SUCCESS) == PUSH_SUCCESS:
+            results[name] = status
+        if status == PUSH_SUCCESS:
+            continue
+        if key in unconfirmed:
+            failed += [(name, t, c, None) for t, c in list(unconfirmed[key])]
+        else:
+            failed.append((name, title, content, None))
+    _outbox_add(failed)
+    return {mode.__name__: results.get(mode.__name__, PUSH_SUCCESS) for mode in notify_function}
 
 
 def main():
+    # python notify.py flush [--force]：立即重试之前推送失败的消息
+    if sys.argv[1:2] == ["flush"]:
+        flush_outbox(force="--force" in sys.argv[2:])
+        return
     send("title", "content")
 
 
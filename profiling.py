@@ -0,0 +1,230 @@
+import os
+import sys
+import time
+import threading
+import functools
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager, nullcontext
+
+# --- 运行时性能分析 ---
+# 设置 DAYSIGN_PROFILE 后，用 profiled() 包装的 main 会在生产任务中直接收集性能数据：
+# - cpu：后台线程定时采样所有线程的调用栈，写出 collapsed stack 文件（flamegraph.pl / speedscope 可直接打开）；
+# - mem：用 tracemalloc 统计 parse / reply / punch / notify 各阶段新增内存最多的代码位置。
+# 未设置时 profiled() 和 phase() 都不做任何事。
+PROFILE_MODE = os.getenv("DAYSIGN_PROFILE", "").strip().lower()
+PROFILE_DIR = os.getenv("DAYSIGN_PROFILE_DIR",
+                        os.path.join(os.path.dirname(os.path.abspath(__file__)), ".profile"))
+PROFILE_INTERVAL = float(os.getenv("DAYSIGN_PROFILE_INTERVAL_MS", 5)) / 1000  # cpu 模式的采样间隔
+MEM_TOP_SITES = 10  # mem 模式每个阶段报告的代码位置数
+MEM_FRAMES = int(os.getenv("DAYSIGN_PROFILE_MEM_FRAMES", 10))  # tracemalloc 为每次分配保存的调用栈深度，越深开销越大
+MEM_SNAPSHOTS_PER_PHASE = int(os.getenv("DAYSIGN_PROFILE_MEM_SNAPSHOTS", 3))  # 每个阶段取快照统计代码位置的次数
+
+_REPO_DIR = os.path.dirname(os.path.abspath(__file__)) + os.sep
+_IGNORED_FILES = (tracemalloc.__file__, __file__)
+
+_NO_PHASE = nullcontext()
+
+
+def _output_path(script: str, suffix: str) -> str:
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    return os.path.join(PROFILE_DIR, f"{script}-{time.strftime('%Y%m%d-%H%M%S')}{suffix}")
+
+
+def _frame_name(frame) -> str:
+    code = frame.f_code
+    name = getattr(code, 'co_qualname', code.co_name)
+    return f"{name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class StackSampler:
+    """
+    定时采样除自身以外所有线程的调用栈，按 "线程;最外层函数;...;最内层函数" 计数。
+    asyncio 事件循环空闲（等待网络或 sleep）时，栈顶是 select/epoll，从火焰图中可以直接看出等待占了多少。
+    """
+
+    def __init__(self, interval: float = PROFILE_INTERVAL):
+        self.interval = interval
+        self.stacks = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='profiling-sampler', daemon=True)
+
+    def _run(self) -> None:
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_name(frame))
+                    frame = frame.f_back
+                stack.append(names.get(ident, f"thread-{ident}"))
+                self.stacks[';'.join(reversed(stack))] += 1
+            self.samples += 1
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def write(self, path: str) -> None:
+        with open(path, 'w', encoding='utf-8') as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+    def top_functions(self, limit: int = 10) -> list[tuple[str, int]]:
+        """
+        按栈顶（自身耗时）统计采样次数最多的函数。
+        """
+        leaves = Counter()
+        for stack, count in self.stacks.items():
+            leaves[stack.rsplit(';', 1)[-1]] += count
+        return leaves.most_common(limit)
+
+
+class PhaseAllocations:
+    """
+    mem 模式下按阶段统计内存：每次进入阶段都记录净增内存和阶段内的峰值（开销很小）；
+    每个阶段的前 MEM_SNAPSHOTS_PER_PHASE 次进入还会在进入和退出时各取一次 tracemalloc 快照，
+    用 Snapshot.compare_to 按代码位置汇总退出时的净增分配（快照和比较的开销与存活的分配数成正比，不能每次都取）。
+    代码位置取调用栈中最内层的本仓库代码，找不到时取最内层的一帧；性能分析代码自身的分配不计入。
+    多账号并发时各账号的阶段会重叠，阶段也可以嵌套（外层阶段包含内层阶段的分配），结果只作为定位问题的线索。
+    """
+
+    def __init__(self):
+        self.sites: dict[str, Counter] = {}  # 阶段 -> {代码位置: 新增字节数}
+        self.counts: dict[str, Counter] = {}  # 阶段 -> {代码位置: 新增分配次数}
+        self.entries = Counter()  # 阶段 -> 进入次数
+        self.net = Counter()  # 阶段 -> 净增字节数之和
+        self.peak = Counter()  # 阶段 -> 单次进入期间比进入时多出的最大字节数
+        self.overall_peak = 0  # 各阶段会重置 tracemalloc 的峰值，整次运行的峰值在这里累计
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _added(after: tracemalloc.Snapshot,
+               before: tracemalloc.Snapshot) -> list[tuple[tracemalloc.Traceback, int, int]]:
+        """
+        返回 after 相对 before 按调用栈净增的分配，汇总为 [(调用栈, 字节数, 次数), ...]，只保留净增为正的调用栈。
+        compare_to 的开销与存活的分配数成正比，采样次数由 MEM_SNAPSHOTS_PER_PHASE（DAYSIGN_PROFILE_MEM_SNAPSHOTS）控制。
+        """
+        return [(stat.traceback, stat.size_diff, max(stat.count_diff, 0))
+                for stat in after.compare_to(before, 'traceback') if stat.size_diff > 0]
+
+    @staticmethod
+    def _site(traceback: tracemalloc.Traceback) -> str | None:
+        if any(frame.filename in _IGNORED_FILES for frame in traceback):
+            return None
+        # tracemalloc.Traceback 按从最外层到最内层的顺序排列
+        frame = next((frame for frame in reversed(traceback) if frame.filename.startswith(_REPO_DIR)), traceback[-1])
+        return f"{frame.filename}:{frame.lineno}"
+
+    def reset_peak(self) -> None:
+        self.overall_peak = max(self.overall_peak, tracemalloc.get_traced_memory()[1])
+        tracemalloc.reset_peak()
+
+    @contextmanager
+    def phase(self, name: str):
+        with self._lock:
+            sampled = self.entries[name] < MEM_SNAPSHOTS_PER_PHASE
+            self.entries[name] += 1
+        before = tracemalloc.take_snapshot() if sampled else None
+        start = tracemalloc.get_traced_memory()[0]
+        with self._lock:
+            self.reset_peak()
+        try:
+            yield
+        finally:
+            current, peak = tracemalloc.get_traced_memory()
+            with self._lock:
+                self.net[name] += current - start
+                self.peak[name] = max(self.peak[name], peak - start)
+            if sampled:
+                added = self._added(tracemalloc.take_snapshot(), before)
+                with self._lock:
+                    sites = self.sites.setdefault(name, Counter())
+                    counts = self.counts.setdefault(name, Counter())
+                    for traceback, size, count in added:
+                        site = self._site(traceback)
+                        if site:
+                            sites[site] += size
+                            counts[site] += count
+
+    def report(self) -> str:
+        lines = []
+        for name in sorted(self.entries):
+            lines.append(f"== {name}：进入 {self.entries[name]} 次，净增 {self.net[name] / 1024:.1f} KiB，"
+                         f"单次峰值 {self.peak[name] / 1024:.1f} KiB ==")
+            sampled = min(self.entries[name], MEM_SNAPSHOTS_PER_PHASE)
+            lines.append(f"  前 {sampled} 次进入按代码位置的净增内存：")
+            for site, size in self.sites.get(name, Counter()).most_common(MEM_TOP_SITES):
+                lines.append(f"  {size / 1024:10.1f} KiB  {self.counts[name][site]:8d} 次  {site}")
+        return '\n'.join(lines) + '\n'
+
+
+_allocations: PhaseAllocations | None = None
+
+
+def phase(name: str):
+    """
+    标记一个阶段（parse、reply、punch、notify），mem 模式下统计该阶段新增的内存，其它情况下不做任何事。
+    同步和异步代码中都用 with 语句。
+    """
+    return _allocations.phase(name) if _allocations is not None else _NO_PHASE
+
+
+def _profile_cpu(script: str, main, *args, **kwargs):
+    sampler = StackSampler()
+    sampler.start()
+    try:
+        return main(*args, **kwargs)
+    finally:
+        sampler.stop()
+        path = _output_path(script, '.collapsed')
+        sampler.write(path)
+        print(f"📈 CPU 采样 {sampler.samples} 次（间隔 {sampler.interval * 1000:g} ms），调用栈已写入 {path}")
+        for name, count in sampler.top_functions():
+            print(f"    {count / max(sampler.samples, 1):6.1%}  {name}")
+
+
+def _profile_mem(script: str, main, *args, **kwargs):
+    global _allocations
+    tracemalloc.start(MEM_FRAMES)
+    _allocations = PhaseAllocations()
+    try:
+        return main(*args, **kwargs)
+    finally:
+        allocations, _allocations = _allocations, None
+        allocations.reset_peak()
+        current = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        report = f"当前 {current / 1024:.1f} KiB，峰值 {allocations.overall_peak / 1024:.1f} KiB\n" + allocations.report()
+        path = _output_path(script, '.mem.txt')
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(report)
+        print(f"📈 各阶段内存分配已写入 {path}\n{report}")
+
+
+def profiled(script: str):
+    """
+    包装脚本的 main：按 DAYSIGN_PROFILE 选择 cpu / mem 分析，输出文件名以 script 开头。
+    """
+
+    def decorate(main):
+        @functools.wraps(main)
+        def wrapper(*args, **kwargs):
+            if PROFILE_MODE == 'cpu':
+                return _profile_cpu(script, main, *args, **kwargs)
+            if PROFILE_MODE == 'mem':
+                return _profile_mem(script, main, *args, **kwargs)
+            if PROFILE_MODE:
+                print(f"⚠️ 未知的 DAYSIGN_PROFILE={PROFILE_MODE}（可选 cpu、mem），不进行性能分析。")
+            return main(*args, **kwargs)
+
+        return wrapper
+
+    return decorate
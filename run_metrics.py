@@ -0,0 +1,306 @@
+import os
+import json
+import time
+import threading
+from dataclasses import dataclass, asdict
+
+import httpx
+
+# --- 请求耗时统计 ---
+# 记录每次论坛请求（包括每次重试）的连接/TLS/首字节/正文耗时、收发字节数、状态码，以及发出请求的逻辑步骤
+# （punch、reply、forum_list、user_center）和账号。运行结束时写出 JSON 报告和 Prometheus textfile
+# （node_exporter 的 textfile collector 可直接读取），用来查看一次运行的时间花在哪里。
+METRICS_DIR = os.getenv("DAYSIGN_METRICS_DIR")  # 不设置时只在内存中统计，不写文件
+
+# 直方图的桶上限（秒）
+BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+PHASES = ('connect', 'tls', 'ttfb', 'body')
+
+
+@dataclass
+class RequestSpan:
+    script: str
+    account: str
+    step: str
+    method: str
+    url: str
+    attempt: int  # 第几次尝试，0 为第一次
+    started: float  # Unix 时间戳
+    total: float  # 整个请求的耗时（秒），包括读取正文
+    connect: float | None  # 建立 TCP 连接（包括 DNS 解析，httpcore 不单独报告 DNS）；复用连接时为 None
+    tls: float | None  # TLS 握手；复用连接时为 None
+    ttfb: float | None  # 从开始发送请求头到收到响应头
+    body: float | None  # 读取响应正文
+    bytes_out: int
+    bytes_in: int
+    status: int | None  # 请求出错时为 None
+    error: str | None = None
+
+
+class SpanTimer:
+    """
+    作为 httpx 请求的 extensions={'trace': ...} 使用，记录 httpcore 各阶段的开始和结束时间。
+    同步客户端使用 trace，异步客户端使用 atrace。
+    """
+
+    def __init__(self):
+        self.wall_start = time.time()
+        self.start = time.perf_counter()
+        self._marks: dict[str, float] = {}
+
+    def trace(self, event: str, info: dict) -> None:
+        # 事件名形如 'connection.connect_tcp.started'、'http11.receive_response_body.complete'
+        name, _, stage = event.rpartition('.')
+        name = name.split('.', 1)[-1]
+        if stage == 'started':
+            self._marks.setdefault(f"{name}.started", time.perf_counter())
+        elif stage == 'complete':
+            self._marks[f"{name}.complete"] = time.perf_counter()
+
+    async def atrace(self, event: str, info: dict) -> None:
+        self.trace(event, info)
+
+    def _between(self, start: str, end: str) -> float | None:
+        if start in self._marks and end in self._marks:
+            return self._marks[end] - self._marks[start]
+        return None
+
+    def phases(self) -> dict:
+        return {
+            'connect': self._between('connect_tcp.started', 'connect_tcp.complete'),
+            'tls': self._between('start_tls.started', 'start_tls.complete'),
+            'ttfb': self._between('send_request_headers.started', 'receive_response_headers.complete'),
+            'body': self._between('receive_response_body.started', 'receive_response_body.complete'),
+        }
+
+
+def _headers_size(headers: httpx.Headers) -> int:
+    return sum(len(name) + len(value) + 4 for name, value in headers.raw)
+
+
+def _histogram() -> dict:
+    return {'buckets': [0] * len(BUCKETS), 'sum': 0.0, 'count': 0}
+
+
+def _observe(histogram: dict, value: float) -> None:
+    for i, bound in enumerate(BUCKETS):
+        if value <= bound:
+            histogram['buckets'][i] += 1
+    histogram['sum'] += value
+    histogram['count'] += 1
+
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(**labels) -> str:
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + '}'
+
+
+def _request_size(request: httpx.Request) -> int:
+    size = len(request.method) + len(request.url.raw_path) + _headers_size(request.headers)
+    try:
+        return size + len(request.content)
+    except httpx.RequestNotRead:  # 流式请求体，无法得知长度
+        return size
+
+
+def _percentile(values: list[float], q: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+class RunMetrics:
+    """
+    一次运行中所有请求的统计，可在多个线程/协程中同时记录。
+    """
+
+    def __init__(self, script: str = 'daysign'):
+        self._lock = threading.Lock()
+        self.start(script)
+
+    def start(self, script: str) -> None:
+        """
+        开始新的一次运行，清空之前的记录。
+        """
+        with self._lock:
+            self.script = script
+            self.started = time.time()
+            self.spans: list[RequestSpan] = []
+            self.accounts: dict[str, dict] = {}
+
+    def record(self, timer: SpanTimer, step: str, account: str, method: str, url, attempt: int,
+               response: httpx.Response | None = None, error: Exception | None = None) -> RequestSpan:
+        """
+        记录一次请求尝试；response 需要已读取完正文。
+        """
+        request = response.request if response is not None else None
+        if request is None and isinstance(error, httpx.RequestError):
+            try:
+                request = error.request
+            except RuntimeError:
+                pass
+        bytes_out = _request_size(request) if request is not None else 0
+        bytes_in = _headers_size(response.headers) + response.num_bytes_downloaded if response is not None else 0
+        span = RequestSpan(
+            script=self.script, account=account, step=step or 'other', method=method.upper(), url=str(url),
+            attempt=attempt, started=timer.wall_start, total=time.perf_counter() - timer.start, **timer.phases(),
+            bytes_out=bytes_out, bytes_in=bytes_in, status=response.status_code if response is not None else None,
+            error=f"{type(error).__name__}: {error}" if error is not None else None,
+        )
+        with self._lock:
+            self.spans.append(span)
+        return span
+
+    def record_account(self, account: str, seconds: float, success: bool) -> None:
+        """
+        记录一个账号完整签到流程的耗时（包括回帖之间的等待），与请求耗时对比可以看出等待占了多少。
+        """
+        with self._lock:
+            self.accounts[account] = {'seconds': seconds, 'success': success}
+
+    def report(self) -> dict:
+        """
+        JSON 报告：按步骤和按账号汇总，以及全部请求明细。
+        """
+        with self._lock:
+            spans = list(self.spans)
+            accounts = dict(self.accounts)
+
+        def summary(group: list[RequestSpan]) -> dict:
+            totals = [span.total for span in group]
+            result = {
+                'requests': len(group),
+                'errors': sum(1 for span in group if span.status is None or span.status >= 400),
+                'retries': sum(1 for span in group if span.attempt),
+                'seconds': sum(totals),
+                'p50_seconds': _percentile(totals, 0.5),
+                'p95_seconds': _percentile(totals, 0.95),
+                'max_seconds': max(totals),
+                'bytes_out': sum(span.bytes_out for span in group),
+                'bytes_in': sum(span.bytes_in for span in group),
+            }
+            for phase in PHASES:
+                values = [getattr(span, phase) for span in group if getattr(span, phase) is not None]
+                result[f'{phase}_seconds'] = sum(values)
+            return result
+
+        by_step, by_account = {}, {}
+        for span in spans:
+            by_step.setdefault(span.step, []).append(span)
+            by_account.setdefault(span.account, []).append(span)
+        account_report = {account: summary(group) for account, group in by_account.items()}
+        for account, run in accounts.items():
+            account_report.setdefault(account, {}).update(run_seconds=run['seconds'], success=run['success'])
+
+        return {
+            'script': self.script,
+            'started': self.started,
+            'duration_seconds': time.time() - self.started,
+            'steps': {step: summary(group) for step, group in sorted(by_step.items())},
+            'accounts': account_report,
+            'requests': [asdict(span) for span in spans],
+        }
+
+    def prometheus(self) -> str:
+        """
+        Prometheus 文本格式：按步骤和按账号的请求耗时直方图、各阶段耗时、请求数和字节数。
+        """
+        with self._lock:
+            spans = list(self.spans)
+            accounts = dict(self.accounts)
+        script = self.script
+
+        step_hist, account_hist, phases, requests, traffic = {}, {}, {}, {}, {}
+        for span in spans:
+            _observe(step_hist.setdefault((span.step, span.method), _histogram()), span.total)
+            _observe(account_hist.setdefault(span.account, _histogram()), span.total)
+            for phase in PHASES:
+                value = getattr(span, phase)
+                if value is not None:
+                    entry = phases.setdefault((span.step, phase), [0.0, 0])
+                    entry[0] += value
+                    entry[1] += 1
+            status = str(span.status) if span.status is not None else 'error'
+            requests[(span.step, status)] = requests.get((span.step, status), 0) + 1
+            for direction, size in (('out', span.bytes_out), ('in', span.bytes_in)):
+                traffic[(span.step, direction)] = traffic.get((span.step, direction), 0) + size
+
+        lines = []
+
+        def histogram(name: str, help_text: str, series: dict, label_names: tuple) -> None:
+            lines.extend((f"# HELP {name} {help_text}", f"# TYPE {name} histogram"))
+            for key, hist in sorted(series.items()):
+                labels = dict(script=script, **dict(zip(label_names, key if isinstance(key, tuple) else (key,))))
+                for bound, count in zip(BUCKETS, hist['buckets']):
+                    lines.append(f"{name}_bucket{_labels(**labels, le=bound)} {count}")
+                lines.append(f"{name}_bucket{_labels(**labels, le='+Inf')} {hist['count']}")
+                lines.append(f"{name}_sum{_labels(**labels)} {hist['sum']:.6f}")
+                lines.append(f"{name}_count{_labels(**labels)} {hist['count']}")
+
+        histogram('daysign_request_duration_seconds', '论坛请求耗时（按步骤）', step_hist, ('step', 'method'))
+        histogram('daysign_account_request_duration_seconds', '论坛请求耗时（按账号）', account_hist, ('account',))
+
+        lines.extend(("# HELP daysign_request_phase_seconds 请求各阶段耗时（connect 包括 DNS 解析）",
+                      "# TYPE daysign_request_phase_seconds summary"))
+        for (step, phase), (total, count) in sorted(phases.items()):
+            lines.append(f"daysign_request_phase_seconds_sum{_labels(script=script, step=step, phase=phase)} {total:.6f}")
+            lines.append(f"daysign_request_phase_seconds_count{_labels(script=script, step=step, phase=phase)} {count}")
+
+        lines.extend(("# HELP daysign_requests_total 论坛请求数（按步骤和状态码）", "# TYPE daysign_requests_total counter"))
+        for (step, status), count in sorted(requests.items()):
+            lines.append(f"daysign_requests_total{_labels(script=script, step=step, status=status)} {count}")
+
+        lines.extend(("# HELP daysign_request_bytes_total 论坛请求收发字节数", "# TYPE daysign_request_bytes_total counter"))
+        for (step, direction), size in sorted(traffic.items()):
+            lines.append(f"daysign_request_bytes_total{_labels(script=script, step=step, direction=direction)} {size}")
+
+        lines.extend(("# HELP daysign_account_run_seconds 账号完整签到流程的耗时", "# TYPE daysign_account_run_seconds gauge"))
+        for account, run in sorted(accounts.items()):
+            lines.append(f"daysign_account_run_seconds{_labels(script=script, account=account)} {run['seconds']:.3f}")
+        lines.extend(("# HELP daysign_account_success 账号签到是否成功", "# TYPE daysign_account_success gauge"))
+        for account, run in sorted(accounts.items()):
+            lines.append(f"daysign_account_success{_labels(script=script, account=account)} {int(run['success'])}")
+
+        lines.extend(("# HELP daysign_run_duration_seconds 整次运行的耗时", "# TYPE daysign_run_duration_seconds gauge",
+                      f"daysign_run_duration_seconds{_labels(script=script)} {time.time() - self.started:.3f}",
+                      "# HELP daysign_run_last_timestamp_seconds 最近一次运行结束的时间",
+                      "# TYPE daysign_run_last_timestamp_seconds gauge",
+                      f"daysign_run_last_timestamp_seconds{_labels(script=script)} {time.time():.0f}"))
+        return '\n'.join(lines) + '\n'
+
+    def write(self, directory: str | None = METRICS_DIR) -> tuple[str, str] | None:
+        """
+        写出 <script>-<时间>.json 报告，并覆盖 <script>.prom（先写临时文件再替换，避免被读到一半的文件）。
+        directory 为空时不写文件，返回 None。
+        """
+        if not directory:
+            return None
+        os.makedirs(directory, exist_ok=True)
+        stamp = time.strftime('%Y%m%d-%H%M%S', time.localtime(self.started))
+        json_path = os.path.join(directory, f"{self.script}-{stamp}.json")
+        with open(json_path, 'w', encoding='utf-8') as f:
+            json.dump(self.report(), f, ensure_ascii=False, indent=2)
+        prom_path = os.path.join(directory, f"{self.script}.prom")
+        with open(prom_path + '.tmp', 'w', encoding='utf-8') as f:
+            f.write(self.prometheus())
+        os.replace(prom_path + '.tmp', prom_path)
+        return json_path, prom_path
+
+
+# 当前运行的统计，由 site_client 的 _request 记录
+metrics = RunMetrics()
+
+
+def finish() -> None:
+    """
+    运行结束时调用：设置了 DAYSIGN_METRICS_DIR 时写出报告，写文件失败不影响签到结果。
+    """
+    try:
+        paths = metrics.write()
+    except OSError as e:
+        print(f"⚠️ 写入请求统计失败: {e}")
+        return
+    if paths:
+        print(f"📊 请求统计已写入 {paths[0]} 和 {paths[1]}")
@@ -0,0 +1,475 @@
+import os
+import time
+import random
+import asyncio
+import atexit
+import threading
+from contextlib import contextmanager, asynccontextmanager
+
+import httpx, h2
+
+import profiling
+import run_metrics
+from http_cache import HttpCache
+
+# --- 共享的站点客户端 ---
+# 两个签到脚本共用的请求头、超时、连接池和 Telegram 通知连接。
+DEFAULT_USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/138.0.0.0 Safari/537.36 Edg/138.0.0.0'
+DEFAULT_ACCEPT_LANGUAGE = 'en-US,en;q=0.9,zh-CN;q=0.8,zh;q=0.7'
+
+DEFAULT_TIMEOUT = httpx.Timeout(float(os.getenv('DAYSIGN_HTTP_TIMEOUT', 30)))  # 论坛请求的默认超时时间
+HTTP_RETRIES = int(os.getenv('DAYSIGN_HTTP_RETRIES', 2))  # 请求失败（连接错误、超时、5xx、429）后的最多重试次数
+HTTP_BACKOFF = float(os.getenv('DAYSIGN_HTTP_BACKOFF', 1))  # 第一次重试前等待的秒数，之后每次翻倍
+HTTP_BACKOFF_MAX = 30  # 单次重试等待（包括服务器 Retry-After 要求的时间）的上限
+NOTIFY_TIMEOUT = httpx.Timeout(10)  # 通知请求的超时时间，避免通知发送卡住
+NOTIFY_COALESCE_SECONDS = float(os.getenv('NOTIFY_COALESCE_SECONDS', 300))  # 通知合并窗口，窗口内的消息合并为一条摘要
+NOTIFY_FLUSH_DEADLINE = float(os.getenv('NOTIFY_FLUSH_DEADLINE', 20))  # 运行结束/进程退出时等待通知发送的最长时间
+TELEGRAM_MAX_LENGTH = 4000  # Telegram 单条消息上限为 4096 字符，留出标题的余量
+
+# 测试用：设置后所有论坛请求都改发到该地址（例如 bench/fake_phpwind.py 启动的本地服务器），Host 请求头保持不变
+DAYSIGN_UPSTREAM = os.getenv('DAYSIGN_UPSTREAM')
+# 测试用：设置后用它包装每个新建的论坛传输层，参数为 (transport, 是否异步)，例如 bench/fault_transport.py 的故障注入
+transport_wrapper = None
+
+
+def default_headers(host: str, accept_language: str = DEFAULT_ACCEPT_LANGUAGE) -> dict:
+    """
+    论坛请求的默认请求头（论坛会检测请求头，需要与浏览器一致）。
+    """
+    return {
+        'user-agent': DEFAULT_USER_AGENT,
+        'x-requested-with': 'XMLHttpRequest',
+        'dnt': '1',
+        'accept': '*/*',
+        'sec-ch-ua-mobile': '?0',
+        'sec-ch-ua-platform': 'macOS',
+        'sec-fetch-site': 'same-origin',
+        'sec-fetch-mode': 'cors',
+        'sec-fetch-dest': 'empty',
+        'referer': f'https://{host}/',
+        'accept-language': accept_language,
+    }
+
+
+def _rewrite(request: httpx.Request, upstream: httpx.URL) -> None:
+    request.url = request.url.copy_with(scheme=upstream.scheme, host=upstream.host, port=upstream.port)
+
+
+class _UpstreamTransport(httpx.AsyncBaseTransport):
+    """
+    把请求改发到 DAYSIGN_UPSTREAM，用于在本地模拟服务器上测试，不访问真实论坛。
+    """
+
+    def __init__(self, transport: httpx.AsyncBaseTransport, upstream: str):
+        self._transport = transport
+        self._upstream = httpx.URL(upstream)
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        _rewrite(request, self._upstream)
+        return await self._transport.handle_async_request(request)
+
+    async def aclose(self) -> None:
+        await self._transport.aclose()
+
+
+class _SyncUpstreamTransport(httpx.BaseTransport):
+    def __init__(self, transport: httpx.BaseTransport, upstream: str):
+        self._transport = transport
+        self._upstream = httpx.URL(upstream)
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        _rewrite(request, self._upstream)
+        return self._transport.handle_request(request)
+
+    def close(self) -> None:
+        self._transport.close()
+
+
+def _async_transport() -> httpx.AsyncBaseTransport:
+    transport = httpx.AsyncHTTPTransport(http2=True)
+    if DAYSIGN_UPSTREAM:
+        transport = _UpstreamTransport(transport, DAYSIGN_UPSTREAM)
+    return transport_wrapper(transport, True) if transport_wrapper else transport
+
+
+def _sync_transport() -> httpx.BaseTransport:
+    transport = httpx.HTTPTransport(http2=True)
+    if DAYSIGN_UPSTREAM:
+        transport = _SyncUpstreamTransport(transport, DAYSIGN_UPSTREAM)
+    return transport_wrapper(transport, False) if transport_wrapper else transport
+
+
+class _SharedTransport(httpx.AsyncBaseTransport):
+    """
+    包装共享的传输层：单个账号的客户端关闭时不关闭底层连接池。
+    """
+
+    def __init__(self, transport: httpx.AsyncBaseTransport):
+        self._transport = transport
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        return await self._transport.handle_async_request(request)
+
+    async def aclose(self) -> None:
+        pass
+
+
+class HostPool:
+    """
+    按 host 保存长连接的 HTTP/2 连接池，同一次运行中的多个账号共用，避免每个账号重新握手。
+    Cookie 仍由各账号自己的客户端保存。需要在同一个事件循环中使用，用完后调用 aclose()。
+    """
+
+    def __init__(self):
+        self._transports: dict[str, httpx.AsyncBaseTransport] = {}
+
+    def transport(self, host: str) -> httpx.AsyncBaseTransport:
+        if host not in self._transports:
+            self._transports[host] = _async_transport()
+        return _SharedTransport(self._transports[host])
+
+    async def aclose(self) -> None:
+        for transport in self._transports.values():
+            await transport.aclose()
+        self._transports.clear()
+
+
+def async_client(host: str, cookies: dict, pool: HostPool | None = None,
+                 accept_language: str = DEFAULT_ACCEPT_LANGUAGE) -> httpx.AsyncClient:
+    """
+    创建已设置默认请求头和超时的异步客户端；传入 pool 时复用其中该 host 的连接池。
+    """
+    return httpx.AsyncClient(cookies=cookies, http2=True, headers=default_headers(host, accept_language),
+                             timeout=DEFAULT_TIMEOUT, transport=pool.transport(host) if pool else _async_transport())
+
+
+def client(host: str, cookies: dict, accept_language: str = DEFAULT_ACCEPT_LANGUAGE) -> httpx.Client:
+    """
+    创建已设置默认请求头和超时的同步客户端。
+    """
+    return httpx.Client(cookies=cookies, http2=True, headers=default_headers(host, accept_language),
+                        timeout=DEFAULT_TIMEOUT, transport=_sync_transport())
+
+
+# 请求一定没有到达服务器的错误，非 GET 请求也可以安全重试
+_NOT_SENT_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+
+
+def _retry_delay(method: str, attempt: int, response: httpx.Response | None = None,
+                 error: Exception | None = None) -> float | None:
+    """
+    判断第 attempt 次（从 0 开始）请求失败后是否重试，返回等待的秒数，不重试时返回 None。
+    GET 请求在传输错误、5xx 和 429 时重试；其它请求只在请求没有发出（连接失败）或 429 时重试，避免重复回帖/打卡。
+    """
+    if attempt >= HTTP_RETRIES:
+        return None
+    idempotent = method.upper() in ('GET', 'HEAD')
+    if error is not None:
+        if not (idempotent and isinstance(error, httpx.TransportError) or isinstance(error, _NOT_SENT_ERRORS)):
+            return None
+    elif response.status_code == 429 or idempotent and response.status_code >= 500:
+        retry_after = response.headers.get('retry-after', '')
+        if retry_after.isdigit():
+            return min(float(retry_after), HTTP_BACKOFF_MAX)
+    else:
+        return None
+    return min(HTTP_BACKOFF * 2 ** attempt, HTTP_BACKOFF_MAX) * random.uniform(0.5, 1)
+
+
+def _retry_reason(response: httpx.Response | None, error: Exception | None) -> str:
+    return f"{type(error).__name__}: {error}" if error is not None else f"HTTP {response.status_code}"
+
+
+def _send_with_retry(client: httpx.Client, method: str, url, step: str = '', account: str = '',
+                     **kwargs) -> httpx.Response:
+    """
+    发送请求，失败时按 _retry_delay 重试；每次尝试都记录到 run_metrics（step 为发出请求的逻辑步骤）。
+    """
+    attempt = 0
+    while True:
+        response = error = None
+        timer = run_metrics.SpanTimer()
+        try:
+            response = client.request(method=method, url=url, extensions={'trace': timer.trace}, **kwargs)
+            run_metrics.metrics.record(timer, step, account, method, url, attempt, response=response)
+            delay = _retry_delay(method, attempt, response=response)
+        except httpx.RequestError as exc:
+            run_metrics.metrics.record(timer, step, account, method, url, attempt, error=exc)
+            delay = _retry_delay(method, attempt, error=exc)
+            if delay is None:
+                raise
+            error = exc
+        if delay is None:
+            return response
+        attempt += 1
+        print(f"⚠️ {method} {url} 失败（{_retry_reason(response, error)}），{delay:.1f} 秒后第 {attempt}/{HTTP_RETRIES} 次重试。")
+        if response is not None:
+            response.close()
+        time.sleep(delay)
+
+
+async def _send_with_retry_async(client: httpx.AsyncClient, method: str, url, step: str = '', account: str = '',
+                                 **kwargs) -> httpx.Response:
+    attempt = 0
+    while True:
+        response = error = None
+        timer = run_metrics.SpanTimer()
+        try:
+            response = await client.request(method=method, url=url, extensions={'trace': timer.atrace}, **kwargs)
+            run_metrics.metrics.record(timer, step, account, method, url, attempt, response=response)
+            delay = _retry_delay(method, attempt, response=response)
+        except httpx.RequestError as exc:
+            run_metrics.metrics.record(timer, step, account, method, url, attempt, error=exc)
+            delay = _retry_delay(method, attempt, error=exc)
+            if delay is None:
+                raise
+            error = exc
+        if delay is None:
+            return response
+        attempt += 1
+        print(f"⚠️ {method} {url} 失败（{_retry_reason(response, error)}），{delay:.1f} 秒后第 {attempt}/{HTTP_RETRIES} 次重试。")
+        if response is not None:
+            await response.aclose()
+        await asyncio.sleep(delay)
+
+
+def request_context(client: httpx.Client, label: str = ''):
+    """
+    返回同步版本的 _request 上下文管理器：发送请求（失败时按 HTTP_RETRIES 重试）、检查状态码，退出时关闭响应。
+    step 参数（punch、user_center 等）和 label（账号）用于 run_metrics 的请求统计。
+    """
+
+    @contextmanager
+    def _request(method, url, step: str = '', **kwargs):
+        response = _send_with_retry(client, method, url, step=step, account=label, **kwargs)
+        try:
+            response.raise_for_status()
+            yield response
+        finally:
+            response.close()
+
+    return _request
+
+
+def async_request_context(client: httpx.AsyncClient, http_cache: HttpCache | None = None, account: str = '',
+                          on_write=None, label: str = ''):
+    """
+    返回异步版本的 _request 上下文管理器，请求失败时按 HTTP_RETRIES 重试。
+    - http_cache: 为带 cache_scope 参数的 GET 请求做条件请求缓存；
+      cache_scope='shared' 所有账号共用，'private' 按 account 区分。
+    - on_write: 每次发送非 GET 请求前调用（例如让个人中心快照失效）。
+    - label: run_metrics 请求统计中的账号名，默认为 account；每次调用的 step 参数为发出请求的逻辑步骤。
+    """
+    label = label or account
+
+    @asynccontextmanager
+    async def _request(method, url, step: str = '', **kwargs):
+        headers = dict(kwargs.pop('headers', {}))
+        cache_scope = kwargs.pop('cache_scope', None)
+
+        if method.upper() != 'GET' and on_write is not None:
+            on_write()
+
+        cache_key = cache_entry = None
+        if http_cache and cache_scope and method.upper() == 'GET':
+            cache_key = f"{account if cache_scope == 'private' else '*'} {url}"
+            # 缓存读写是阻塞的 SQLite 和文件操作，放到线程中执行，不阻塞其它账号的协程
+            cache_entry = await asyncio.to_thread(http_cache.lookup, cache_key)
+            if cache_entry:
+                headers.update(http_cache.revalidation_headers(cache_entry))
+
+        response = await _send_with_retry_async(client, method, url, step, label, headers=headers, **kwargs)
+        if cache_key:
+            if response.status_code == 304 and cache_entry:
+                cached_response = await asyncio.to_thread(http_cache.response_from_cache, cache_entry,
+                                                          response.request)
+                await response.aclose()
+                if cached_response is None:  # 本地正文已被淘汰，重新完整请求一次
+                    for name in http_cache.revalidation_headers(cache_entry):
+                        headers.pop(name)
+                    response = await _send_with_retry_async(client, method, url, step, label, headers=headers, **kwargs)
+                    await asyncio.to_thread(http_cache.store, cache_key, response)
+                else:
+                    print(f"♻️ {url} 未变化 (304)，使用本地缓存。")
+                    response = cached_response
+            else:
+                await asyncio.to_thread(http_cache.store, cache_key, response)
+        try:
+            response.raise_for_status()
+            yield response
+        finally:
+            await response.aclose()
+
+    return _request
+
+
+# --- Telegram 通知 ---
+# 整个进程共用一个 Telegram 连接，多条通知不再重复 TLS 握手，进程退出时关闭。
+_notify_client: httpx.Client | None = None
+_notify_client_lock = threading.Lock()
+
+
+def _get_notify_client() -> httpx.Client:
+    global _notify_client
+    with _notify_client_lock:
+        if _notify_client is None:
+            _notify_client = httpx.Client(http2=True, timeout=NOTIFY_TIMEOUT)
+        return _notify_client
+
+
+def push_notification(title: str, content: str) -> None:
+    """
+    发送 Telegram 通知。
+    需要设置 TG_USER_ID 和 TG_BOT_TOKEN 环境变量。
+    """
+
+    def telegram_send_message(text: str, chat_id: str, token: str, silent: bool = False) -> None:
+        try:
+            r = _get_notify_client().post(url=f'https://api.telegram.org/bot{token}/sendMessage',
+                                          json={
+                                              'chat_id': chat_id,
+                                              'text': text,
+                                              'disable_notification': silent,
+                                              'disable_web_page_preview': True,
+                                          })
+            r.raise_for_status()
+            print(f"✅ Telegram 通知已发送：{title}")
+        except httpx.RequestError as exc:
+            print(f"❌ 发送 Telegram 通知时发生请求错误: {exc}")
+        except httpx.HTTPStatusError as exc:
+            print(f"❌ 发送 Telegram 通知失败，HTTP 状态码: {exc.response.status_code}, 响应: {exc.response.text}")
+        except Exception as e:
+            print(f"❌ 发送 Telegram 通知过程中发生未知错误: {e}")
+
+    chat_id = os.getenv('TG_USER_ID')
+    bot_token = os.getenv('TG_BOT_TOKEN')
+
+    if chat_id and bot_token:
+        telegram_send_message(f'{title}\n\n{content}', chat_id, bot_token)
+    else:
+        print("⚠️ 未设置 TG_USER_ID 或 TG_BOT_TOKEN，跳过 Telegram 通知。")
+
+
+# --- 后台通知队列 ---
+# 签到流程中的通知只放入队列立即返回，由后台线程按标题合并为摘要后再发送，
+# 回帖和打卡不再等待 Telegram 的网络请求。
+def _digest_chunks(contents: list[str], limit: int = TELEGRAM_MAX_LENGTH) -> list[str]:
+    """
+    把同一标题的多条消息合并为摘要，超过单条消息长度上限时按消息边界拆分。
+    """
+    if len(contents) == 1:
+        items = contents
+    else:
+        items = [f"共 {len(contents)} 条消息："] + [f"{index}. {content}" for index, content in
+                                                   enumerate(contents, start=1)]
+    chunks, current = [], ''
+    for item in items:
+        while len(item) > limit:  # 单条消息本身过长时硬拆分
+            if current:
+                chunks.append(current)
+                current = ''
+            chunks.append(item[:limit])
+            item = item[limit:]
+        if current and len(current) + 2 + len(item) > limit:
+            chunks.append(current)
+            current = ''
+        current = f"{current}\n\n{item}" if current else item
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+class NotificationQueue:
+    """
+    线程安全的通知队列：put() 立即返回；后台线程在合并窗口结束或调用 flush() 时，
+    把同一标题的消息合并为一条摘要发送。
+    """
+
+    def __init__(self, send=push_notification, window: float = NOTIFY_COALESCE_SECONDS):
+        self._send = send
+        self._window = window
+        self._cond = threading.Condition()
+        self._pending: dict[str, list[str]] = {}
+        self._first_at: float | None = None
+        self._flushing = False
+        self._busy = False
+        self._thread: threading.Thread | None = None
+
+    def put(self, title: str, content: str) -> None:
+        with self._cond:
+            self._pending.setdefault(title, []).append(content)
+            if self._first_at is None:
+                self._first_at = time.monotonic()
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._worker, name='notify-queue', daemon=True)
+                self._thread.start()
+            self._cond.notify_all()
+
+    def flush(self, timeout: float = NOTIFY_FLUSH_DEADLINE) -> bool:
+        """
+        立即发送队列中的所有消息，最多等待 timeout 秒。全部发送完成时返回 True。
+        """
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            if self._pending:
+                self._flushing = True
+                self._cond.notify_all()
+            while self._pending or self._busy:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    print(f"⚠️ 等待通知发送超过 {timeout} 秒，放弃剩余通知。")
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    def _worker(self) -> None:
+        while True:
+            with self._cond:
+                while True:
+                    if self._pending:
+                        remaining = self._window - (time.monotonic() - self._first_at)
+                        if self._flushing or remaining <= 0:
+                            break
+                        self._cond.wait(remaining)
+                    else:
+                        self._flushing = False
+                        self._cond.wait()
+                batch, self._pending, self._first_at = self._pending, {}, None
+                self._busy = True
+            try:
+                for title, contents in batch.items():
+                    for text in _digest_chunks(contents):
+                        self._send(title, text)
+            except Exception as e:
+                print(f"❌ 发送通知摘要时发生未知错误: {e}")
+            finally:
+                with self._cond:
+                    self._busy = False
+                    self._cond.notify_all()
+
+
+_notification_queue = NotificationQueue()
+
+
+def queue_notification(title: str, content: str) -> None:
+    """
+    把通知放入后台队列后立即返回，不阻塞调用方。
+    """
+    _notification_queue.put(title, content)
+
+
+def flush_notifications(timeout: float = NOTIFY_FLUSH_DEADLINE) -> bool:
+    """
+    运行结束时调用：把队列中的通知合并发送，最多等待 timeout 秒。
+    """
+    with profiling.phase('notify'):
+        return _notification_queue.flush(timeout)
+
+
+@atexit.register
+def _shutdown_notifications() -> None:
+    # 进程退出时先发送剩余通知，再关闭 Telegram 连接
+    _notification_queue.flush()
+    with _notify_client_lock:
+        if _notify_client is not None:
+            _notify_client.close()